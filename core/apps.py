@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        from . import replicas, signals  # noqa: F401
+
+        # refuses replicas without a shared cache for the pins at startup
+        replicas.get_replicas()
@@ -0,0 +1,106 @@
+"""Async job list and detail views for ASGI deployments.
+
+They answer like JobView's list and retrieve actions (same JSON, response
+cache, ETags, keyset cursors and replica routing) but run on the event
+loop: the ORM is used through its async API, and no worker thread is held
+while a slow client sends its request or reads the response. Sync views
+under ASGI hold a thread for the whole view.
+
+Job reads are public, so these views do not authenticate. A request with
+an Authorization header skips the cache and reads the primary, where the
+caller's own writes are.
+
+runscript bench_asgi compares them with the sync views under uvicorn.
+"""
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.views.decorators.http import require_safe
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from . import caching, replicas
+from .models import Job
+from .pagination import JobPagination
+from .serializers import JobListQuerySerializer, JobListSerializer
+from .views import with_listing_fields
+
+renderer = JSONRenderer()
+
+
+def render(data, status_code=status.HTTP_200_OK, headers=None):
+    return HttpResponse(
+        renderer.render(data), content_type='application/json', status=status_code, headers=headers
+    )
+
+
+async def read(request, build):
+    """Runs build() on a replica for anonymous requests."""
+    if not caching.is_cacheable(request) or not replicas.get_replicas():
+        return await build()
+    async with replicas.ause_replica([caching.REPLICA_PIN]):
+        return await build()
+
+
+async def cached_response(request, version_key, build):
+    """The async counterpart of CachedReadMixin.cached_response."""
+    if not caching.is_cacheable(request):
+        return render(*await read(request, build))
+
+    key, etag = caching.response_key(
+        await caching.aget_version(version_key), renderer.format, request.build_absolute_uri()
+    )
+    headers = {'ETag': etag, 'Vary': 'Accept, Authorization'}
+    if caching.is_not_modified(request, etag):
+        return HttpResponse(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    cache = caching.get_cache()
+    data = await cache.aget(key)
+    if data is not None:
+        return render(data, headers={**headers, 'X-Cache': 'hit'})
+
+    data, status_code = await read(request, build)
+    if status_code != status.HTTP_200_OK:
+        return render(data, status_code)
+    await cache.aset(key, data, caching.get_timeout())
+    return render(data, headers={**headers, 'X-Cache': 'miss'})
+
+
+@require_safe
+async def job_list(request):
+    """JobView's list, with the same query parameters."""
+
+    async def build():
+        params = JobListQuerySerializer(data=request.GET)
+        if not params.is_valid():
+            return params.errors, status.HTTP_400_BAD_REQUEST
+        queryset = JobListSerializer.values(Job.objects.all())
+        if 'min_applications' in params.validated_data:
+            queryset = queryset.filter(
+                application_count__gte=params.validated_data['min_applications']
+            )
+        paginator = JobPagination()
+        try:
+            jobs = await paginator.apaginate_queryset(queryset, Request(request))
+        except APIException as exc:
+            return {'detail': exc.detail}, exc.status_code
+        # the skills of the page are read in one more query
+        data = await sync_to_async(lambda: JobListSerializer(jobs, many=True).data)()
+        return paginator.get_paginated_response(data).data, status.HTTP_200_OK
+
+    return await cached_response(request, caching.LIST_VERSION_KEY, build)
+
+
+@require_safe
+async def job_detail(request, pk):
+    """JobView's retrieve."""
+
+    async def build():
+        try:
+            job = await with_listing_fields(Job.objects.all()).aget(pk=pk)
+        except Job.DoesNotExist:
+            return {'detail': 'No Job matches the given query.'}, status.HTTP_404_NOT_FOUND
+        return JobListSerializer(job).data, status.HTTP_200_OK
+
+    return await cached_response(request, caching.job_version_key(pk), build)
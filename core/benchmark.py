@@ -0,0 +1,262 @@
+"""In-process benchmarks of the API hot paths.
+
+Every scenario drives one endpoint through the DRF test client against the
+current database. Latency percentiles come from a plain timed pass; query
+counts and allocations come from a separate, shorter pass under
+CaptureQueriesContext and tracemalloc, so the instrumentation does not
+skew the timings. The job_list and job_detail scenarios retire the
+response cache version before every call to measure the uncached path;
+their *_cached twins measure cache hits. ``manage.py bench`` seeds a
+throwaway database and runs them; see core/management/commands/bench.py.
+"""
+import statistics
+import time
+import tracemalloc
+import uuid
+from dataclasses import dataclass
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from user.tokens import UserRefreshToken
+
+from .caching import LIST_VERSION_KEY, job_version_key, retire_versions
+from .models import Job
+
+# The debug toolbar instruments every request from INTERNAL_IPS, which
+# include the test client's default 127.0.0.1.
+CLIENT_DEFAULTS = {'REMOTE_ADDR': '10.0.0.1'}
+
+# metrics where a higher value is a regression, and whether it is compared exactly
+COMPARED_METRICS = {
+    'p95_ms': False,
+    'p99_ms': False,
+    'queries': True,
+    'alloc_peak_kib': False,
+}
+
+
+class BenchmarkError(Exception):
+    """A scenario could not run or an endpoint answered unexpectedly."""
+
+
+@dataclass
+class Fixtures:
+    """Users and jobs the scenarios run against."""
+    password: str
+    tag: str
+    candidate: object
+    employer: object
+    job_ids: list
+    active_job_ids: list
+
+    @classmethod
+    def create(cls, password='benchpass123'):
+        User = get_user_model()
+        # a fresh tag keeps repeated runs on one database from colliding
+        tag = uuid.uuid4().hex[:8]
+        candidate = User.objects.create_user(
+            email=f'bench-candidate-{tag}@bench.example',
+            password=password,
+            role=User.RoleChoice.CAN,
+            resume='uploads/bench_resume.txt',
+        )
+        employer = User.objects.create_user(
+            email=f'bench-employer-{tag}@bench.example',
+            password=password,
+            role=User.RoleChoice.EMP,
+            company='Bench Company',
+        )
+        return cls(
+            password=password,
+            tag=tag,
+            candidate=candidate,
+            employer=employer,
+            job_ids=list(Job.objects.order_by('id').values_list('id', flat=True)),
+            active_job_ids=list(
+                Job.objects.filter(is_active=True).order_by('id').values_list('id', flat=True)
+            ),
+        )
+
+
+def authenticated_client(user):
+    client = APIClient(**CLIENT_DEFAULTS)
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {UserRefreshToken.for_user(user).access_token}')
+    return client
+
+
+def register(fixtures, calls):
+    client, url = APIClient(**CLIENT_DEFAULTS), reverse('user-management')
+
+    def request(i):
+        return client.post(url, {
+            'email': f'bench-register-{fixtures.tag}-{i}@bench.example',
+            'password': fixtures.password,
+            'role': 'EMP',
+            'company': 'Bench Company',
+        }, format='json')
+
+    return request, 201
+
+
+def login(fixtures, calls):
+    client, url = APIClient(**CLIENT_DEFAULTS), reverse('login')
+    payload = {'email': fixtures.candidate.email, 'password': fixtures.password}
+    return lambda i: client.post(url, payload, format='json'), 200
+
+
+def job_list(fixtures, calls):
+    client, url = APIClient(**CLIENT_DEFAULTS), reverse('job-list')
+
+    def request(i):
+        # a fresh version makes every call a cache miss
+        retire_versions([LIST_VERSION_KEY])
+        return client.get(url)
+
+    return request, 200
+
+
+def job_list_cached(fixtures, calls):
+    client, url = APIClient(**CLIENT_DEFAULTS), reverse('job-list')
+    return lambda i: client.get(url), 200
+
+
+def job_detail(fixtures, calls):
+    if not fixtures.job_ids:
+        raise BenchmarkError('job_detail needs at least one job')
+    client, job_ids = APIClient(**CLIENT_DEFAULTS), fixtures.job_ids
+
+    def request(i):
+        job_id = job_ids[i % len(job_ids)]
+        retire_versions([job_version_key(job_id)])
+        return client.get(reverse('job-detail', args=[job_id]))
+
+    return request, 200
+
+
+def job_detail_cached(fixtures, calls):
+    if not fixtures.job_ids:
+        raise BenchmarkError('job_detail_cached needs at least one job')
+    client, url = APIClient(**CLIENT_DEFAULTS), reverse('job-detail', args=[fixtures.job_ids[0]])
+    return lambda i: client.get(url), 200
+
+
+def application_create(fixtures, calls):
+    # one candidate may apply to a job only once, so every call needs its own job
+    if len(fixtures.active_job_ids) < calls:
+        raise BenchmarkError(
+            f'application_create needs {calls} active jobs, the database has '
+            f'{len(fixtures.active_job_ids)}'
+        )
+    client, url = authenticated_client(fixtures.candidate), reverse('application-list')
+    job_ids = fixtures.active_job_ids
+
+    def request(i):
+        return client.post(url, {'job': job_ids[i], 'cover_letter': 'Benchmark'}, format='json')
+
+    return request, 201
+
+
+def token_refresh(fixtures, calls):
+    client, url = APIClient(**CLIENT_DEFAULTS), reverse('token_refresh')
+    payload = {'refresh': str(UserRefreshToken.for_user(fixtures.candidate))}
+    return lambda i: client.post(url, payload, format='json'), 200
+
+
+SCENARIOS = {
+    'register': register,
+    'login': login,
+    'job_list': job_list,
+    'job_list_cached': job_list_cached,
+    'job_detail': job_detail,
+    'job_detail_cached': job_detail_cached,
+    'application_create': application_create,
+    'token_refresh': token_refresh,
+}
+
+
+def percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, round(fraction * (len(sorted_values) - 1)))
+    return sorted_values[index]
+
+
+def measure(name, request, status, iterations, warmup=5, profile=10):
+    """Runs one scenario and returns its metrics."""
+    def call(i):
+        response = request(i)
+        if response.status_code != status:
+            raise BenchmarkError(
+                f'{name}: expected HTTP {status}, got {response.status_code}: '
+                f'{getattr(response, "data", response.content)!r}'
+            )
+
+    for i in range(warmup):
+        call(i)
+
+    timings = []
+    for i in range(warmup, warmup + iterations):
+        started = time.perf_counter()
+        call(i)
+        timings.append((time.perf_counter() - started) * 1000)
+
+    queries, peaks = [], []
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    try:
+        for i in range(warmup + iterations, warmup + iterations + profile):
+            with CaptureQueriesContext(connection) as captured:
+                tracemalloc.reset_peak()
+                baseline = tracemalloc.get_traced_memory()[0]
+                call(i)
+                peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+            queries.append(len(captured))
+    finally:
+        if not tracing:
+            tracemalloc.stop()
+
+    timings.sort()
+    return {
+        'iterations': iterations,
+        'mean_ms': round(statistics.fmean(timings), 3),
+        'p50_ms': round(percentile(timings, 0.50), 3),
+        'p95_ms': round(percentile(timings, 0.95), 3),
+        'p99_ms': round(percentile(timings, 0.99), 3),
+        'queries': round(statistics.fmean(queries), 2) if queries else None,
+        'alloc_peak_kib': round(statistics.fmean(peaks) / 1024, 1) if peaks else None,
+    }
+
+
+def run_benchmarks(names=None, iterations=50, warmup=5, profile=10, fixtures=None):
+    """Runs the named scenarios (all by default) and returns {name: metrics}."""
+    fixtures = fixtures or Fixtures.create()
+    calls = warmup + iterations + profile
+    results = {}
+    for name in names or SCENARIOS:
+        request, status = SCENARIOS[name](fixtures, calls)
+        results[name] = measure(name, request, status, iterations, warmup, profile)
+    return results
+
+
+def compare_results(results, baseline, threshold=0.2):
+    """Lists the metrics that regressed against a baseline run.
+
+    Latency and allocations may grow by ``threshold`` (a fraction) before
+    they count; query counts are deterministic and must not grow at all.
+    """
+    regressions = []
+    for name, metrics in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        for metric, exact in COMPARED_METRICS.items():
+            old, new = previous.get(metric), metrics.get(metric)
+            if old is None or new is None:
+                continue
+            limit = old if exact else old * (1 + threshold)
+            if new > limit:
+                regressions.append(f'{name}.{metric}: {old} -> {new}')
+    return regressions
@@ -0,0 +1,144 @@
+"""Response cache for anonymous job list and detail requests.
+
+Cache keys embed version tokens: one for the job list and one per job.
+Writes replace the tokens once their transaction commits (see
+core.signals and the bulk writers), which orphans every response built
+on the old data instead of hunting for keys to delete. A token that gets
+evicted is simply replaced, so a stale response can never come back.
+
+The ETag of a response is derived from the same key, so a matching
+If-None-Match is answered with 304 before any query or serialization.
+
+With LocMemCache the tokens live in one process; deployments with
+several workers need a shared backend such as FileBasedCache or
+DatabaseCache (settings.CACHES).
+"""
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+
+from . import replicas
+
+LIST_VERSION_KEY = 'jobs:version:list'
+# keeps anonymous cache misses off lagging replicas right after a write
+REPLICA_PIN = 'jobs'
+
+
+def get_cache():
+    return caches[getattr(settings, 'JOB_RESPONSE_CACHE', 'default')]
+
+
+def get_timeout():
+    return getattr(settings, 'JOB_RESPONSE_CACHE_TIMEOUT', 300)
+
+
+def job_version_key(job_id):
+    return f'jobs:version:{job_id}'
+
+
+def get_version(key):
+    cache = get_cache()
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid.uuid4().hex, None)
+        version = cache.get(key)
+    return version
+
+
+async def aget_version(key):
+    cache = get_cache()
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, uuid.uuid4().hex, None)
+        version = await cache.aget(key)
+    return version
+
+
+def response_key(version, renderer_format, url):
+    """The cache key and ETag of a response built on the given version."""
+    parts = (version, renderer_format, url)
+    digest = hashlib.blake2b('\n'.join(parts).encode(), digest_size=16).hexdigest()
+    return f'jobs:response:{digest}', f'"{digest}"'
+
+
+def is_not_modified(request, etag):
+    if_none_match = parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+    return etag in if_none_match or '*' in if_none_match
+
+
+def retire_versions(keys):
+    """Replaces the given version tokens now, orphaning the responses built on them."""
+    token = uuid.uuid4().hex
+    get_cache().set_many({key: token for key in keys}, None)
+
+
+def invalidate_jobs(job_ids=(), list_only=False):
+    """Retires the cached job list and the given jobs once the transaction commits.
+
+    Inserts can pass list_only, since no response exists yet for a new job.
+    """
+    keys = [LIST_VERSION_KEY]
+    if not list_only:
+        keys.extend(job_version_key(job_id) for job_id in job_ids)
+
+    def bump():
+        retire_versions(keys)
+        replicas.pin(REPLICA_PIN)
+
+    transaction.on_commit(bump)
+
+
+def is_cacheable(request):
+    # authenticated responses stay uncached
+    return request.method == 'GET' and 'HTTP_AUTHORIZATION' not in request.META
+
+
+class CachedReadMixin:
+    """Serves the list and retrieve actions of a viewset from the response cache."""
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(LIST_VERSION_KEY, super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            # '007' and '7' must share one version
+            job_id = int(kwargs[self.lookup_url_kwarg or self.lookup_field])
+        except ValueError:
+            raise NotFound()
+        return self.cached_response(
+            job_version_key(job_id), super().retrieve, request, *args, **kwargs
+        )
+
+    def cached_response(self, version_key, handler, request, *args, **kwargs):
+        if not is_cacheable(request):
+            return handler(request, *args, **kwargs)
+
+        # the full URL covers query parameters and the host in pagination links
+        key, etag = response_key(
+            get_version(version_key), request.accepted_renderer.format, request.build_absolute_uri()
+        )
+        headers = {'ETag': etag, 'Vary': 'Accept, Authorization'}
+        if is_not_modified(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        cache = get_cache()
+        data = cache.get(key)
+        if data is not None:
+            response = Response(data, headers=headers)
+            response['X-Cache'] = 'hit'
+            return response
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(key, response.data, get_timeout())
+            for name, value in headers.items():
+                response[name] = value
+            response['X-Cache'] = 'miss'
+        return response
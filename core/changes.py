@@ -0,0 +1,128 @@
+"""Change feed of jobs: what was created, updated or deleted after a cursor.
+
+Saved jobs are read on (updated_at, id) from job_updated_id_idx, deleted
+ones on (deleted_at, job_id) from the JobTombstone rows a post_delete
+signal writes (core.signals). Both are merged oldest first, so a client
+that keeps the last cursor syncs in time proportional to the changes
+instead of pulling the whole board. Each job appears once, at its latest
+change.
+
+updated_at is taken when a row is saved, not when its transaction
+commits, so a change may become visible with a time just before rows
+already read. The feed only returns changes older than
+CHANGE_FEED_SETTLE_SECONDS to leave such writers time to commit.
+
+Changing a job's required skills moves updated_at (core.signals).
+Changing its applications (Job.application_count) does not; the count in
+the feed is the one at the job's last change.
+
+Tombstones are pruned after JOB_TOMBSTONE_RETENTION (see the
+prune_job_tombstones command). A cursor older than that may have missed
+deletions and is refused with 410; the client starts over from a full
+export (see core.export), whose watermark can be passed as ?since=.
+"""
+import heapq
+from base64 import b64decode, b64encode
+from datetime import timedelta
+from itertools import islice
+from urllib import parse
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from .export import get_settle_time, job_values
+from .models import Job, JobTombstone
+
+
+class CursorExpired(APIException):
+    status_code = status.HTTP_410_GONE
+    default_detail = 'The cursor is older than the change feed keeps deletions; export the jobs again.'
+    default_code = 'cursor_expired'
+
+
+def get_retention():
+    return getattr(settings, 'JOB_TOMBSTONE_RETENTION', timedelta(days=30))
+
+
+def record_deletes(job_ids):
+    """Writes a tombstone for each deleted job."""
+    now = timezone.now()
+    JobTombstone.objects.bulk_create(
+        [JobTombstone(job_id=job_id, deleted_at=now) for job_id in job_ids],
+        # a fixture may bring back a deleted id, which can then be deleted again
+        update_conflicts=True, unique_fields=['job_id'], update_fields=['deleted_at'],
+    )
+
+
+def encode_cursor(position):
+    value, pk = position
+    tokens = {'v': value.isoformat()}
+    if pk is not None:
+        tokens['i'] = pk
+    return b64encode(parse.urlencode(tokens).encode('ascii')).decode('ascii')
+
+
+def decode_cursor(encoded):
+    """The (time, id) position of a cursor; raises ValueError if it is invalid."""
+    try:
+        tokens = parse.parse_qs(b64decode(encoded.encode('ascii'), validate=True).decode('ascii'))
+        value = parse_datetime(tokens['v'][0])
+        pk = int(tokens['i'][0]) if 'i' in tokens else None
+    except (KeyError, UnicodeError, ValueError) as error:
+        raise ValueError('Invalid cursor') from error
+    if value is None or timezone.is_naive(value):
+        raise ValueError('Invalid cursor')
+    return value, pk
+
+
+def after(queryset, field, id_field, position):
+    """Rows past position on (field, id_field); a position without an id is a plain watermark."""
+    value, pk = position
+    if pk is None:
+        return queryset.filter(**{f'{field}__gt': value})
+    # the >= bound lets the index range scan start at value
+    return queryset.filter(**{f'{field}__gte': value}).filter(
+        Q(**{f'{field}__gt': value}) | Q(**{f'{id_field}__gt': pk})
+    )
+
+
+def read_changes(position=None, limit=100, now=None):
+    """Up to limit changes after position, oldest first, and the position to continue from.
+
+    Changes are dicts with an 'op' of 'upsert' (with the job, in the
+    columns of core.export) or 'delete', the job 'id' and the time 'at'.
+    """
+    now = timezone.now() if now is None else now
+    if position is not None and position[0] < now - get_retention():
+        raise CursorExpired()
+    until = now - get_settle_time()
+
+    jobs = Job.objects.filter(updated_at__lte=until)
+    tombstones = JobTombstone.objects.filter(deleted_at__lte=until)
+    if position is not None:
+        jobs = after(jobs, 'updated_at', 'id', position)
+        tombstones = after(tombstones, 'deleted_at', 'job_id', position)
+
+    upserts = (
+        {'op': 'upsert', 'id': job['id'], 'at': job['updated_at'], 'job': job}
+        for job in job_values(jobs.order_by('updated_at', 'id')[:limit + 1], limit + 1)
+    )
+    deletes = (
+        {'op': 'delete', 'id': job_id, 'at': deleted_at}
+        for job_id, deleted_at in tombstones.order_by('deleted_at', 'job_id')
+        .values_list('job_id', 'deleted_at')[:limit + 1]
+    )
+    changes = list(islice(
+        heapq.merge(upserts, deletes, key=lambda change: (change['at'], change['id'])), limit + 1
+    ))
+    if len(changes) > limit:
+        changes = changes[:limit]
+        return changes, (changes[-1]['at'], changes[-1]['id']), True
+    if position is not None and position[0] >= until:
+        return changes, position, False
+    # everything up to until has been read, so an idle client's cursor keeps moving
+    return changes, (until, None), False
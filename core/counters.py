@@ -0,0 +1,38 @@
+"""Job.application_count, the denormalized number of applications per job.
+
+Every application insert and delete adjusts the counter with a single
+``UPDATE .. SET application_count = application_count ± 1`` in the same
+transaction (see core.signals), so concurrent writers never lose an
+increment. Bulk inserts send no signals; they call reconcile() for the
+jobs they touched, as does the reconcile_application_counts command for
+any drift.
+"""
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Application, Job
+
+
+def adjust(job_id, delta):
+    Job.objects.filter(pk=job_id).update(application_count=F('application_count') + delta)
+
+
+def adjust_many(job_ids, delta):
+    """adjust() for several jobs in one UPDATE."""
+    if job_ids:
+        Job.objects.filter(pk__in=job_ids).update(application_count=F('application_count') + delta)
+
+
+def reconcile(start_id, end_id):
+    """Recounts jobs with start_id <= id < end_id and returns how many had drifted.
+
+    One UPDATE compares and rewrites the counters, so an application
+    written at the same time cannot be lost in between.
+    """
+    counted = Coalesce(Subquery(
+        Application.objects.filter(job_id=OuterRef('pk')).order_by().values('job_id')
+        .annotate(count=Count('id')).values('count')
+    ), 0)
+    return Job.objects.filter(id__gte=start_id, id__lt=end_id).alias(
+        counted=counted
+    ).exclude(application_count=F('counted')).update(application_count=counted)
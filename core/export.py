@@ -0,0 +1,154 @@
+"""Streaming exports of jobs and applications as NDJSON or CSV.
+
+Rows are read with ``QuerySet.iterator(chunk_size=...)`` and written out
+as they arrive, so memory use depends on the chunk size and not on the
+number of rows. Job skills are loaded with one query per chunk.
+
+Exports are ordered by id. Given a watermark (``since``), only rows
+changed after it are exported, ordered by the watermark field and id.
+The largest value exported is the watermark of the next incremental
+export. As in the change feed (core.changes), rows changed within the
+last CHANGE_FEED_SETTLE_SECONDS are left for the next export, so a
+change committed after its timestamp is not skipped by the watermark.
+
+The job columns are the ones core.importer reads, so an export can be
+imported again; CSV skills are joined with ``|`` as there.
+"""
+import csv
+import zlib
+from datetime import timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from .importer import CSV_SKILL_SEPARATOR
+from .models import Job
+
+FORMATS = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+CHUNK_SIZE = 2000
+# bytes handed to the server at a time, instead of one write per row
+BUFFER_SIZE = 64 * 1024
+
+JOB_FIELDS = (
+    'id', 'position', 'description', 'employer', 'is_active', 'salary',
+    'application_count', 'created_at', 'updated_at',
+)
+APPLICATION_FIELDS = ('id', 'job', 'candidate', 'cover_letter', 'applied_at')
+
+encoder = DjangoJSONEncoder(separators=(',', ':'))
+
+
+def chunks(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def get_settle_time():
+    return timedelta(seconds=getattr(settings, 'CHANGE_FEED_SETTLE_SECONDS', 2))
+
+
+def changed_since(queryset, field, since):
+    queryset = queryset.filter(**{f'{field}__lte': timezone.now() - get_settle_time()})
+    if since is None:
+        return queryset.order_by('id')
+    return queryset.filter(**{f'{field}__gt': since}).order_by(field, 'id')
+
+
+def job_rows(queryset, since=None, chunk_size=CHUNK_SIZE):
+    """Yields jobs as dicts of JOB_FIELDS plus their skill names."""
+    return job_values(changed_since(queryset, 'updated_at', since), chunk_size)
+
+
+def job_values(queryset, chunk_size=CHUNK_SIZE):
+    """job_rows() for a queryset that is already ordered, or sliced."""
+    columns = [f'{name}_id' if name == 'employer' else name for name in JOB_FIELDS]
+    Through = Job.requirements.through
+    rows = queryset.values_list(*columns).iterator(chunk_size=chunk_size)
+    for chunk in chunks(rows, chunk_size):
+        skills = {row[0]: [] for row in chunk}
+        for job_id, name in Through.objects.filter(job_id__in=list(skills)).order_by(
+            'skill__name'
+        ).values_list('job_id', 'skill__name').iterator(chunk_size=chunk_size):
+            skills[job_id].append(name)
+        for row in chunk:
+            job = dict(zip(JOB_FIELDS, row))
+            job['skills'] = skills[row[0]]
+            yield job
+
+
+def application_rows(queryset, since=None, chunk_size=CHUNK_SIZE):
+    """Yields applications as dicts of APPLICATION_FIELDS."""
+    queryset = changed_since(queryset, 'applied_at', since)
+    columns = [f'{name}_id' if name in ('job', 'candidate') else name for name in APPLICATION_FIELDS]
+    for row in queryset.values_list(*columns).iterator(chunk_size=chunk_size):
+        yield dict(zip(APPLICATION_FIELDS, row))
+
+
+def to_text(value):
+    if value is None:
+        return ''
+    if isinstance(value, list):
+        return CSV_SKILL_SEPARATOR.join(value)
+    if isinstance(value, (str, int, bool)):
+        return value
+    # dates and decimals as in the NDJSON output
+    return encoder.default(value)
+
+
+class Echo:
+    """A file-like object handing back what csv.writer writes."""
+
+    def write(self, value):
+        return value
+
+
+def encode(rows, format, fields):
+    """Yields the rows as lines of text in the given format."""
+    if format == 'csv':
+        writer = csv.writer(Echo())
+        yield writer.writerow(fields)
+        for row in rows:
+            yield writer.writerow([to_text(row[name]) for name in fields])
+    else:
+        for row in rows:
+            yield encoder.encode(row) + '\n'
+
+
+def buffered(lines, size=BUFFER_SIZE):
+    """Joins lines into blocks of about size bytes."""
+    block, length = [], 0
+    for line in lines:
+        data = line.encode()
+        block.append(data)
+        length += len(data)
+        if length >= size:
+            yield b''.join(block)
+            block, length = [], 0
+    if block:
+        yield b''.join(block)
+
+
+def gzipped(blocks, level=6):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for block in blocks:
+        if data := compressor.compress(block):
+            yield data
+    yield compressor.flush()
+
+
+def stream(rows, format, fields, gzip=False):
+    """The bytes of an export, in blocks."""
+    blocks = buffered(encode(rows, format, fields))
+    return gzipped(blocks) if gzip else blocks
+
+
+def export_jobs(since=None, format='ndjson', gzip=False, chunk_size=CHUNK_SIZE, queryset=None):
+    queryset = Job.objects.all() if queryset is None else queryset
+    return stream(job_rows(queryset, since, chunk_size), format, (*JOB_FIELDS, 'skills'), gzip)
+
+
+def export_applications(queryset, since=None, format='ndjson', gzip=False, chunk_size=CHUNK_SIZE):
+    return stream(application_rows(queryset, since, chunk_size), format, APPLICATION_FIELDS, gzip)
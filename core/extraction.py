@@ -0,0 +1,193 @@
+"""Background extraction of candidate skills from resumes.
+
+Saving a user whose resume changed upserts their ResumeExtraction row back
+to pending (see core.signals); the request does nothing else. The
+``extract_resumes`` command claims pending rows in batches and reads the
+files on a process pool. Each file is tokenized and split into word
+n-grams, and the n-grams are matched against the normalized Skill names.
+The matches are stored as the sorted skill ids packed into unsigned 32-bit
+little-endian integers, so a row grows with the number of skills found,
+not with the largest Skill id.
+
+Plain text is always supported; PDFs are read when pypdf is installed.
+"""
+import re
+import struct
+import uuid
+from concurrent.futures import as_completed
+from datetime import timedelta
+from importlib.util import find_spec
+from pathlib import Path
+
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import ResumeExtraction, Skill, User
+from .skills import normalize_skill_name
+
+TERM_RE = re.compile(r'[\w+#]+(?:[.\-/][\w+#]+)*')
+# enough for any resume; the rest of a huge file is ignored
+MAX_TEXT_CHARS = 1_000_000
+MAX_ATTEMPTS = 3
+
+
+class UnsupportedResume(Exception):
+    """The resume's format cannot be read."""
+
+
+def enqueue(candidate_id, resume):
+    """Queues the candidate's resume, or forgets them when it was removed."""
+    if not resume:
+        ResumeExtraction.objects.filter(candidate_id=candidate_id).delete()
+        return
+    ResumeExtraction.objects.bulk_create(
+        [ResumeExtraction(
+            candidate_id=candidate_id,
+            resume=resume,
+            status=ResumeExtraction.Status.PENDING,
+            attempts=0,
+            claimed_by='',
+            queued_at=timezone.now(),
+        )],
+        update_conflicts=True,
+        unique_fields=['candidate'],
+        update_fields=['resume', 'status', 'attempts', 'claimed_by', 'queued_at'],
+    )
+
+
+def backfill(batch_size=1000):
+    """Queues every candidate who has a resume but no queue row yet."""
+    now = timezone.now()
+    rows = [
+        ResumeExtraction(candidate_id=candidate_id, resume=resume, queued_at=now)
+        for candidate_id, resume in User.objects.filter(
+            resume__gt='', resume_extraction__isnull=True
+        ).values_list('pk', 'resume').iterator()
+    ]
+    ResumeExtraction.objects.bulk_create(rows, batch_size=batch_size, ignore_conflicts=True)
+    return len(rows)
+
+
+def read_text(path):
+    path = Path(path)
+    if path.suffix.lower() == '.pdf':
+        if find_spec('pypdf') is None:
+            raise UnsupportedResume('PDF resumes need pypdf installed')
+        from pypdf import PdfReader
+
+        text = '\n'.join(page.extract_text() or '' for page in PdfReader(path).pages)
+        return text[:MAX_TEXT_CHARS]
+    if path.suffix.lower() in ('.txt', '.md', ''):
+        with open(path, encoding='utf-8', errors='replace') as file:
+            return file.read(MAX_TEXT_CHARS)
+    raise UnsupportedResume(f'Unsupported resume format: {path.suffix}')
+
+
+def extract_terms(path, max_words):
+    """Returns the distinct word n-grams of up to max_words words in the file.
+
+    Runs in a pool process, so it must not touch the database.
+    """
+    words = TERM_RE.findall(read_text(path).casefold())
+    terms = set()
+    for size in range(1, max_words + 1):
+        for start in range(len(words) - size + 1):
+            terms.add(' '.join(words[start:start + size]))
+    return terms
+
+
+def skill_vocabulary():
+    """Returns ({normalized name: skill id}, most words in a name)."""
+    vocabulary = {
+        normalize_skill_name(name): skill_id
+        for name, skill_id in Skill.objects.values_list('name', 'id').iterator()
+    }
+    max_words = max((name.count(' ') + 1 for name in vocabulary), default=1)
+    return vocabulary, max_words
+
+
+def encode_skill_ids(skill_ids):
+    skill_ids = sorted(set(skill_ids))
+    return struct.pack(f'<{len(skill_ids)}I', *skill_ids)
+
+
+def decode_skill_ids(data):
+    data = data or b''
+    return struct.unpack(f'<{len(data) // 4}I', data)
+
+
+def claim(batch_size, stale_after):
+    """Marks up to batch_size queued rows as running and returns them.
+
+    One UPDATE does the claiming, so concurrent workers never share a row.
+    Rows left running longer than stale_after belong to a dead worker and
+    are claimed again.
+    """
+    now, token = timezone.now(), uuid.uuid4().hex
+    claimable = ResumeExtraction.objects.filter(
+        Q(status=ResumeExtraction.Status.PENDING)
+        | Q(status=ResumeExtraction.Status.RUNNING, started_at__lt=now - stale_after)
+    ).order_by('queued_at').values('pk')[:batch_size]
+    ResumeExtraction.objects.filter(pk__in=claimable).update(
+        status=ResumeExtraction.Status.RUNNING,
+        claimed_by=token,
+        started_at=now,
+        attempts=F('attempts') + 1,
+    )
+    return list(ResumeExtraction.objects.filter(claimed_by=token, status=ResumeExtraction.Status.RUNNING))
+
+
+def finish(task, **fields):
+    """Stores a result unless the resume was replaced in the meantime."""
+    return ResumeExtraction.objects.filter(
+        pk=task.pk, claimed_by=task.claimed_by, resume=task.resume
+    ).update(finished_at=timezone.now(), claimed_by='', **fields)
+
+
+def complete(task, terms, vocabulary):
+    skill_ids = {vocabulary[term] for term in terms if term in vocabulary}
+    return finish(
+        task,
+        status=ResumeExtraction.Status.DONE,
+        skill_ids=encode_skill_ids(skill_ids),
+        skill_count=len(skill_ids),
+        error='',
+    )
+
+
+def fail(task, error):
+    # unreadable formats will not get better with another try
+    retry = task.attempts < MAX_ATTEMPTS and not isinstance(error, UnsupportedResume)
+    return finish(
+        task,
+        status=ResumeExtraction.Status.PENDING if retry else ResumeExtraction.Status.FAILED,
+        error=f'{type(error).__name__}: {error}'[:1000],
+    )
+
+
+def process_batch(executor, batch_size=50, stale_after=timedelta(minutes=10)):
+    """Claims one batch, extracts it on the executor and returns (done, failed)."""
+    tasks = claim(batch_size, stale_after)
+    if not tasks:
+        return 0, 0
+    vocabulary, max_words = skill_vocabulary()
+    storage = User._meta.get_field('resume').storage
+
+    futures, done, failed = {}, 0, 0
+    for task in tasks:
+        try:
+            futures[executor.submit(extract_terms, storage.path(task.resume), max_words)] = task
+        except Exception as error:
+            fail(task, error)
+            failed += 1
+    for future in as_completed(futures):
+        task = futures[future]
+        try:
+            terms = future.result()
+        except Exception as error:
+            fail(task, error)
+            failed += 1
+        else:
+            complete(task, terms, vocabulary)
+            done += 1
+    return done, failed
@@ -0,0 +1,73 @@
+"""Replayable create requests keyed by the Idempotency-Key header.
+
+A create sent with the header stores its response in the same
+transaction as the object it created. A retry with the same key fails on
+a unique constraint and gets the stored response back, so a storm of
+duplicate clicks costs a single write. The lookup only happens once a
+request has failed, so the first request pays no extra query. A key
+reused with a different request body is refused with 422.
+
+prune_idempotency_keys deletes keys older than IDEMPOTENCY_KEY_TTL.
+"""
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from rest_framework import exceptions, status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = IdempotencyKey._meta.get_field('key').max_length
+
+
+def get_ttl():
+    return getattr(settings, 'IDEMPOTENCY_KEY_TTL', timedelta(hours=24))
+
+
+def request_hash(request):
+    body = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha256(body.encode()).hexdigest()
+
+
+class IdempotentCreateMixin:
+    """Lets clients retry create with an Idempotency-Key header safely."""
+    idempotency_scope = None
+
+    def create(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return super().create(request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            raise exceptions.ValidationError({HEADER: f'At most {MAX_KEY_LENGTH} characters.'})
+
+        scope = self.idempotency_scope or self.basename
+        fingerprint = request_hash(request)
+        try:
+            with transaction.atomic():
+                response = super().create(request, *args, **kwargs)
+                IdempotencyKey.objects.create(
+                    user_id=request.user.pk,
+                    scope=scope,
+                    key=key,
+                    request_hash=fingerprint,
+                    status_code=response.status_code,
+                    response=response.data,
+                )
+            return response
+        except (IntegrityError, exceptions.ValidationError):
+            # a retry fails on the object or the key it already created
+            stored = IdempotencyKey.objects.filter(
+                user_id=request.user.pk, scope=scope, key=key
+            ).first()
+            if stored is None:
+                raise
+        if stored.request_hash != fingerprint:
+            return Response(
+                {"detail": f"This {HEADER} was used with a different request."},
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY
+            )
+        return Response(stored.response, status=stored.status_code, headers={'Idempotent-Replayed': 'true'})
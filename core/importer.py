@@ -0,0 +1,271 @@
+"""Streaming bulk import of jobs from NDJSON or CSV feeds.
+
+Rows are read one line at a time, validated with the field rules of
+JobCreateSerializer and written in chunks: multi-row inserts for the jobs
+and their Job.requirements rows, and one batch skill resolution per
+chunk. Memory use is bounded by the chunk size, not by the feed size.
+
+In CSV feeds the ``skills`` column holds skill names separated by ``|``.
+"""
+import csv
+import json
+from dataclasses import dataclass, field
+
+from django.db import connection, transaction
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.fields import SkipField, empty
+
+from . import caching, matching, search
+from .models import Job
+from .serializers import JobCreateSerializer
+from .skills import distinct_skill_names, normalize_skill_name, resolve_skills
+
+FORMATS = ('ndjson', 'csv')
+CONTENT_TYPES = {
+    'application/x-ndjson': 'ndjson',
+    'application/jsonl': 'ndjson',
+    'application/json-lines': 'ndjson',
+    'text/csv': 'csv',
+}
+CSV_SKILL_SEPARATOR = '|'
+# rows per INSERT statement, keeping bound parameters under SQLite's limit
+INSERT_BATCH_SIZE = 500
+
+
+class FeedError(Exception):
+    """A row that could not be parsed."""
+
+
+class Fallback(Exception):
+    """The fast path cannot vouch for a value; run the full field validation."""
+
+
+def compile_fast_path(field):
+    """Returns a quick check accepting the common valid inputs of a field, or None.
+
+    A fast path only ever accepts values the DRF field would accept and
+    returns what the field would return; anything else raises Fallback so
+    the field itself produces the value or the error.
+    """
+    if type(field) is serializers.BooleanField:
+        def check(value):
+            if value is True or value is False:
+                return value
+            raise Fallback
+
+        return check
+
+    if type(field) is serializers.CharField:
+        trim, allow_blank = field.trim_whitespace, field.allow_blank
+        max_length, min_length = field.max_length, field.min_length
+
+        def check(value):
+            # non-ASCII text goes the slow way for the surrogate checks
+            if type(value) is not str or not value.isascii() or '\x00' in value:
+                raise Fallback
+            if trim:
+                value = value.strip()
+            if not value and not allow_blank:
+                raise Fallback
+            if max_length is not None and len(value) > max_length:
+                raise Fallback
+            if min_length is not None and len(value) < min_length:
+                raise Fallback
+            return value
+
+        return check
+
+    if type(field) is serializers.ListField and not field.validators:
+        child = compile_fast_path(field.child)
+        if child is None:
+            return None
+        allow_empty, max_length = field.allow_empty, field.max_length
+
+        def check(value):
+            if type(value) is not list or (not value and not allow_empty):
+                raise Fallback
+            if max_length is not None and len(value) > max_length:
+                raise Fallback
+            return [child(item) for item in value]
+
+        return check
+
+    return None
+
+
+def iter_ndjson(lines):
+    """Yields (line number, row or FeedError) for every non-blank line."""
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            yield number, FeedError(f'Invalid JSON: {exc}')
+            continue
+        if not isinstance(row, dict):
+            yield number, FeedError('Expected a JSON object.')
+            continue
+        yield number, row
+
+
+def iter_csv(lines):
+    """Yields (line number, row) for every record after the header."""
+    reader = csv.DictReader(lines)
+    for row in reader:
+        skills = row.get('skills')
+        if skills is not None:
+            row['skills'] = [name for name in skills.split(CSV_SKILL_SEPARATOR) if name.strip()]
+        # empty cells mean "not given" rather than empty strings
+        yield reader.line_num, {key: value for key, value in row.items() if value not in ('', None)}
+
+
+def iter_feed(lines, format):
+    if format == 'csv':
+        return iter_csv(lines)
+    return iter_ndjson(lines)
+
+
+@dataclass
+class ImportResult:
+    created: int = 0
+    rejected: int = 0
+    errors: list = field(default_factory=list)
+
+    def as_dict(self):
+        return {'created': self.created, 'rejected': self.rejected, 'errors': self.errors}
+
+
+class JobImporter:
+    """Validates and bulk inserts feed rows as jobs of one employer."""
+
+    def __init__(self, employer, chunk_size=5000, max_reported_errors=1000):
+        self.employer = employer
+        self.chunk_size = chunk_size
+        self.max_reported_errors = max_reported_errors
+        # the same field objects, and so the same rules, as the create endpoint
+        fields = JobCreateSerializer(context={'request': None}).fields
+        self.fields = [
+            (name, field, compile_fast_path(field)) for name, field in fields.items()
+            if not field.read_only and name != 'requirements'
+        ]
+
+    def validate(self, row):
+        data, errors = {}, {}
+        for name, field, fast_path in self.fields:
+            value = row.get(name, empty)
+            if fast_path is not None and value is not empty:
+                try:
+                    data[name] = fast_path(value)
+                    continue
+                except Fallback:
+                    pass
+            try:
+                data[name] = field.run_validation(value)
+            except SkipField:
+                pass
+            except serializers.ValidationError as exc:
+                errors[name] = exc.detail
+        if errors:
+            raise serializers.ValidationError(errors)
+        return data
+
+    def reject(self, result, line, errors):
+        result.rejected += 1
+        if len(result.errors) < self.max_reported_errors:
+            result.errors.append({'line': line, 'errors': errors})
+
+    def run(self, rows):
+        """Imports (line number, row) pairs and returns an ImportResult."""
+        result = ImportResult()
+        chunk = []
+        for line, row in rows:
+            if isinstance(row, FeedError):
+                self.reject(result, line, {'non_field_errors': [str(row)]})
+                continue
+            try:
+                chunk.append(self.validate(row))
+            except serializers.ValidationError as exc:
+                self.reject(result, line, exc.detail)
+                continue
+            if len(chunk) >= self.chunk_size:
+                result.created += self.write(chunk)
+                chunk = []
+        if chunk:
+            result.created += self.write(chunk)
+        return result
+
+    def write(self, chunk):
+        skill_names = [distinct_skill_names(data.pop('skills', None) or ()) for data in chunk]
+        with transaction.atomic():
+            skill_ids = resolve_skills(name for names in skill_names for name in names)
+            job_ids = self.insert_jobs(chunk)
+            self.insert_requirements(
+                (job_id, skill_ids[normalize_skill_name(name)])
+                for job_id, names in zip(job_ids, skill_names) for name in names
+            )
+
+            # bulk inserts send no signals, so feed the indexes directly
+            search.add_documents(
+                (job_id, data['position'], data.get('description') or '', ' '.join(names))
+                for job_id, data, names in zip(job_ids, chunk, skill_names)
+            )
+            matching.refresh_jobs(
+                job_id for job_id, data in zip(job_ids, chunk) if data.get('is_active')
+            )
+            caching.invalidate_jobs(list_only=True)
+        return len(job_ids)
+
+    def insert_jobs(self, chunk):
+        """Inserts the validated rows and returns their ids in order."""
+        if connection.vendor != 'sqlite':
+            jobs = Job.objects.bulk_create(
+                [Job(employer_id=self.employer.pk, **data) for data in chunk]
+            )
+            return [job.pk for job in jobs]
+
+        # Model.save() machinery costs more than the insert itself at feed
+        # volumes, so SQLite gets plain multi-row INSERT ... RETURNING statements.
+        names = [name for name, _, _ in self.fields if name != 'skills']
+        opts = Job._meta
+        defaults = [opts.get_field(name).get_default() for name in names]
+        now = connection.ops.adapt_datetimefield_value(timezone.now())
+        columns = [opts.get_field(name).column for name in names] + [
+            opts.get_field('employer').column,
+            opts.get_field('created_at').column,
+            opts.get_field('updated_at').column,
+            opts.get_field('application_count').column,
+        ]
+        tail = (self.employer.pk, now, now, 0)
+        rows = [
+            tuple(data.get(name, default) for name, default in zip(names, defaults)) + tail
+            for data in chunk
+        ]
+
+        row_sql = '(' + ', '.join(['%s'] * len(columns)) + ')'
+        ids = []
+        with connection.cursor() as cursor:
+            for start in range(0, len(rows), INSERT_BATCH_SIZE):
+                batch = rows[start:start + INSERT_BATCH_SIZE]
+                cursor.execute(
+                    f"INSERT INTO {opts.db_table} ({', '.join(columns)}) "
+                    f"VALUES {', '.join([row_sql] * len(batch))} RETURNING id",
+                    [value for row in batch for value in row],
+                )
+                # SQLite returns rows in insertion order, as bulk_create also assumes
+                ids.extend(row[0] for row in cursor.fetchall())
+        return ids
+
+    def insert_requirements(self, pairs):
+        Through = Job.requirements.through
+        if connection.vendor != 'sqlite':
+            Through.objects.bulk_create(
+                Through(job_id=job_id, skill_id=skill_id) for job_id, skill_id in pairs
+            )
+            return
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {Through._meta.db_table} (job_id, skill_id) VALUES (%s, %s)",
+                list(pairs),
+            )
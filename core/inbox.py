@@ -0,0 +1,91 @@
+"""Queries behind the employer applicant inbox.
+
+The inbox lists applications to all of an employer's jobs, newest first.
+The query can be planned in two ways:
+
+* Take the employer's applications job by job from the (job, applied_at)
+  index and sort them. The cost grows with the employer's application
+  count.
+* Walk the global (applied_at, id) index newest first and keep the rows
+  whose job belongs to the employer. The cost grows with how many other
+  employers' rows lie in between.
+
+For an employer with N of the table's T applications, a page of L rows
+costs about N with the first plan and L * T / N with the second. The
+second plan is chosen when N * N > L * T. Only the order of magnitude
+matters, so N is the sum of the employer's Job.application_count
+counters and T the largest application id, both read from an index
+instead of counting rows. The choice is cached per employer for a few
+minutes.
+Both plans select ids only; the page rows are loaded by primary key
+afterwards.
+"""
+from django.db.models import Count, ExpressionWrapper, F, IntegerField, Max, Sum
+
+from .caching import get_cache
+from .models import Application, Job
+
+PLAN_TIMEOUT = 300
+
+
+def plan_key(employer_id):
+    return f'inbox:ordered-scan:{employer_id}'
+
+
+def use_ordered_scan(employer_id, page_size):
+    cache = get_cache()
+    ordered = cache.get(plan_key(employer_id))
+    if ordered is None:
+        mine = Job.objects.filter(employer_id=employer_id).aggregate(
+            total=Sum('application_count')
+        )['total'] or 0
+        # deleted rows leave gaps, so this overestimates a little
+        total = Application.objects.order_by('-id').values_list('id', flat=True).first() or 0
+        ordered = mine * mine > page_size * total
+        cache.set(plan_key(employer_id), ordered, PLAN_TIMEOUT)
+    return ordered
+
+
+def inbox_keys(employer_id, page_size, job_id=None):
+    """The employer's applications as (id, applied_at) rows for keyset paging."""
+    if job_id is not None:
+        # one range scan of the (job, applied_at) index
+        return Application.objects.filter(
+            job_id=job_id, job__employer_id=employer_id
+        ).only('id', 'applied_at')
+    job_ids = Job.objects.filter(employer_id=employer_id).values('id')
+    if use_ordered_scan(employer_id, page_size):
+        # job_id + 0 keeps the planner off the job index, so it reads
+        # (applied_at, id) in order and stops after one page
+        return Application.objects.alias(
+            inbox_job_id=ExpressionWrapper(F('job_id') + 0, output_field=IntegerField())
+        ).filter(inbox_job_id__in=job_ids).only('id', 'applied_at')
+    return Application.objects.filter(job_id__in=job_ids).only('id', 'applied_at')
+
+
+def load_page(keys):
+    """Loads the full rows of a page of keys, keeping their order."""
+    rows = Application.objects.select_related('job', 'candidate').only(
+        'job_id', 'candidate_id', 'cover_letter', 'applied_at',
+        'job__position', 'candidate__username', 'candidate__email',
+    ).in_bulk([key.pk for key in keys])
+    return [rows[key.pk] for key in keys if key.pk in rows]
+
+
+def job_counts(jobs):
+    """Application counts of the given jobs, in one grouped query.
+
+    ``jobs`` maps job id to position.
+    """
+    counts = Application.objects.filter(job_id__in=list(jobs)).values('job_id').annotate(
+        applications=Count('id'), latest_applied_at=Max('applied_at'),
+    ).order_by('-latest_applied_at')
+    return [
+        {
+            'job': row['job_id'],
+            'position': jobs[row['job_id']],
+            'applications': row['applications'],
+            'latest_applied_at': row['latest_applied_at'],
+        }
+        for row in counts
+    ]
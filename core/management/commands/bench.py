@@ -0,0 +1,123 @@
+"""Benchmark the API hot paths against a freshly seeded throwaway database.
+
+    manage.py bench --jobs 5000 --output bench.json
+    manage.py bench --baseline bench.json --threshold 20
+
+The database is the test database of the configured backend (in memory
+on SQLite), seeded through ``populate`` and destroyed afterwards. Results
+are printed and optionally written as JSON; with ``--baseline`` the
+command exits non-zero when a metric regressed past the threshold.
+"""
+
+import json
+import platform
+import time
+from io import StringIO
+
+import django
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from core.benchmark import SCENARIOS, BenchmarkError, Fixtures, compare_results, run_benchmarks
+
+
+class Command(BaseCommand):
+    help = "Measure latency, queries and allocations per request of the main API endpoints"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--employers", type=int, default=20)
+        parser.add_argument("--candidates", type=int, default=500)
+        parser.add_argument("--jobs", type=int, default=2000)
+        parser.add_argument("--applications-per-job", default="poisson:2", metavar="DIST")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--scenario", action="append", choices=list(SCENARIOS), dest="scenarios",
+            help="Scenario to run; repeat for several (default: all)",
+        )
+        parser.add_argument("--iterations", type=int, default=50, help="Timed requests per scenario")
+        parser.add_argument("--warmup", type=int, default=5)
+        parser.add_argument(
+            "--profile-iterations", type=int, default=10,
+            help="Requests per scenario traced for queries and allocations",
+        )
+        parser.add_argument("--output", help="Write the results to this JSON file")
+        parser.add_argument("--baseline", help="JSON file of an earlier run to compare against")
+        parser.add_argument(
+            "--threshold", type=float, default=20,
+            help="Allowed growth of latency and allocations over the baseline, in percent",
+        )
+
+    def handle(self, *args, **options):
+        if options["iterations"] < 1:
+            raise CommandError("--iterations must be at least 1")
+        baseline = None
+        if options["baseline"]:
+            with open(options["baseline"]) as f:
+                baseline = json.load(f)
+
+        setup_test_environment()
+        old_name = connection.settings_dict["NAME"]
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            started = time.perf_counter()
+            call_command(
+                "populate",
+                "--employers", str(options["employers"]),
+                "--candidates", str(options["candidates"]),
+                "--jobs", str(options["jobs"]),
+                "--applications-per-job", options["applications_per_job"],
+                "--seed", str(options["seed"]),
+                stdout=StringIO(),
+            )
+            self.stdout.write(f"Seeded database in {time.perf_counter() - started:.1f}s")
+            results = run_benchmarks(
+                options["scenarios"],
+                iterations=options["iterations"],
+                warmup=options["warmup"],
+                profile=options["profile_iterations"],
+                fixtures=Fixtures.create(),
+            )
+        except BenchmarkError as exc:
+            raise CommandError(str(exc))
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        self.write_table(results)
+        report = {
+            "meta": {
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                "python": platform.python_version(),
+                "django": django.get_version(),
+                "database": connection.vendor,
+                **{
+                    name: options[name]
+                    for name in ("employers", "candidates", "jobs", "applications_per_job", "seed")
+                },
+            },
+            "scenarios": results,
+        }
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+
+        if baseline is not None:
+            regressions = compare_results(
+                results, baseline.get("scenarios", {}), options["threshold"] / 100
+            )
+            if regressions:
+                raise CommandError("Regressions against the baseline:\n  " + "\n  ".join(regressions))
+            self.stdout.write(self.style.SUCCESS("No regressions against the baseline."))
+
+    def write_table(self, results):
+        self.stdout.write(
+            f"{'scenario':20} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'queries':>8} {'alloc KiB':>10}"
+        )
+        for name, metrics in results.items():
+            self.stdout.write(
+                f"{name:20} {metrics['p50_ms']:9.2f} {metrics['p95_ms']:9.2f} {metrics['p99_ms']:9.2f} "
+                f"{metrics['queries']!s:>8} {metrics['alloc_peak_kib']!s:>10}"
+            )
@@ -0,0 +1,44 @@
+"""Extract skills from queued candidate resumes on a local process pool."""
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+
+from django.db import connections
+from django.core.management.base import BaseCommand
+
+from core.extraction import backfill, process_batch
+
+
+class Command(BaseCommand):
+    help = "Work through the resume extraction queue, polling for new entries unless --once is given"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+        parser.add_argument("--batch-size", type=int, default=50)
+        parser.add_argument("--poll", type=float, default=5.0, help="Seconds to sleep when the queue is empty")
+        parser.add_argument("--stale-minutes", type=float, default=10.0,
+                            help="Reclaim entries left running this long by a dead worker")
+        parser.add_argument("--once", action="store_true", help="Exit when the queue is empty")
+        parser.add_argument("--backfill", action="store_true",
+                            help="First queue candidates whose resume was never extracted")
+
+    def handle(self, *args, **options):
+        stale_after = timedelta(minutes=options["stale_minutes"])
+        if options["backfill"]:
+            self.stdout.write(f"queued {backfill()} resumes")
+        # pool processes are forked and must not share the database connections
+        connections.close_all()
+        done = failed = 0
+        with ProcessPoolExecutor(options["workers"]) as executor:
+            while True:
+                batch_done, batch_failed = process_batch(executor, options["batch_size"], stale_after)
+                done, failed = done + batch_done, failed + batch_failed
+                if batch_done or batch_failed:
+                    self.stdout.write(f"extracted {done}, failed {failed}")
+                    continue
+                if options["once"]:
+                    break
+                time.sleep(options["poll"])
+        self.stdout.write(self.style.SUCCESS(f"Extracted {done} resumes, {failed} failed."))
@@ -0,0 +1,46 @@
+"""Import jobs for one employer from an NDJSON or CSV feed."""
+
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.importer import FORMATS, JobImporter, iter_feed
+from user.models import User
+
+
+class Command(BaseCommand):
+    help = "Stream jobs from an NDJSON or CSV file (or '-' for stdin) into the database"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Feed file, or '-' to read stdin")
+        parser.add_argument("--employer", required=True, help="Email of the employer owning the jobs")
+        parser.add_argument("--format", choices=FORMATS, help="Defaults to the file extension")
+        parser.add_argument("--chunk-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        format = options["format"] or ("csv" if path.endswith(".csv") else "ndjson")
+
+        employer = User.objects.filter(email__iexact=options["employer"]).first()
+        if employer is None or employer.role != User.RoleChoice.EMP:
+            raise CommandError(f"No employer with email {options['employer']}")
+
+        importer = JobImporter(employer, chunk_size=options["chunk_size"])
+        started = time.perf_counter()
+        if path == "-":
+            result = importer.run(iter_feed(sys.stdin, format))
+        else:
+            with open(path, encoding="utf-8", newline="") as feed:
+                result = importer.run(iter_feed(feed, format))
+        elapsed = time.perf_counter() - started
+
+        for error in result.errors:
+            self.stderr.write(f"line {error['line']}: {error['errors']}")
+        if result.rejected > len(result.errors):
+            self.stderr.write(f"... {result.rejected - len(result.errors)} more rejected rows not shown")
+        rate = result.created / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {result.created} jobs, rejected {result.rejected} "
+            f"in {elapsed:.1f}s ({rate:,.0f} jobs/s)"
+        ))
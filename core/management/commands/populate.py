@@ -1,19 +1,231 @@
-"""Populate the database with sample users, jobs, skills, and applications."""
+"""Populate the database with sample users, jobs, skills, and applications.
 
+Without options a small deterministic sample is created. With
+``--employers``, ``--candidates`` or ``--jobs`` the command instead
+generates reproducible synthetic data in batches, for load testing:
+
+    manage.py populate --employers 10000 --candidates 500000 --jobs 1000000 \
+        --applications-per-job poisson:4 --seed 1
+"""
+
+import math
+import random
+import time
 from decimal import Decimal
 
+from django.contrib.auth.hashers import make_password
 from django.core.files.base import ContentFile
-from django.core.management.base import BaseCommand
-from django.db import transaction
+from django.core.management.base import BaseCommand, CommandError
+from django.db import reset_queries, transaction
 
+from core import caching, counters, matching, search
 from core.models import Application, CompanyProfile, Job, Skill
+from core.skills import distinct_skill_names, resolve_skill_ids
 from user.models import User
 
+SKILL_NAMES = [
+    "python", "django", "flask", "fastapi", "javascript", "typescript", "react", "vue",
+    "angular", "node.js", "sql", "postgresql", "mysql", "sqlite", "redis", "kafka",
+    "aws", "gcp", "azure", "docker", "kubernetes", "terraform", "linux", "go", "rust",
+    "java", "kotlin", "swift", "c++", "c#", "graphql", "rest", "pandas", "pytorch",
+    "machine learning", "data analysis", "spark", "airflow", "figma", "seo",
+]
+LEVELS = ["Junior", "Mid-level", "Senior", "Lead", "Principal"]
+ROLES = [
+    "Backend Developer", "Frontend Developer", "Full Stack Engineer", "Data Engineer",
+    "Data Scientist", "DevOps Engineer", "Mobile Developer", "QA Engineer",
+    "Product Designer", "Site Reliability Engineer",
+]
+
+
+def parse_distribution(value):
+    """Parses N, uniform:A-B or poisson:MEAN into a function of a Random."""
+    kind, _, args = value.partition(":")
+    try:
+        if not args:
+            count = int(kind)
+            return lambda rng: count
+        if kind == "uniform":
+            low, high = (int(part) for part in args.split("-"))
+            return lambda rng: rng.randint(low, high)
+        if kind == "poisson":
+            mean = float(args)
+            return lambda rng: poisson(rng, mean)
+    except ValueError:
+        pass
+    raise ValueError(f"Invalid distribution: {value}")
+
+
+def poisson(rng, mean):
+    if mean > 30:
+        return max(0, round(rng.gauss(mean, math.sqrt(mean))))
+    # Knuth's method is exact and cheap for small means
+    limit, count, product = math.exp(-mean), 0, rng.random()
+    while product > limit:
+        count += 1
+        product *= rng.random()
+    return count
+
+
+class SyntheticData:
+    """Generates users, jobs and applications in batched bulk inserts."""
+
+    def __init__(self, command, options):
+        self.command = command
+        self.stdout = command.stdout
+        self.style = command.style
+        self.options = options
+        self.seed = options["seed"]
+        self.batch_size = options["batch_size"]
+        self.rng = random.Random(self.seed)
+
+    def generate(self):
+        if User.objects.filter(email__endswith=f"@seed{self.seed}.synthetic.example").exists():
+            raise CommandError(f"Synthetic data for seed {self.seed} already exists; pick another --seed")
+
+        started = time.perf_counter()
+        # hashing once and sharing the result is what makes millions of users cheap
+        self.password = make_password(self.options["password"])
+        self.skill_ids = resolve_skill_ids(SKILL_NAMES)
+        self.skill_names = dict(zip(self.skill_ids, distinct_skill_names(SKILL_NAMES)))
+
+        employer_ids = self.create_users(User.RoleChoice.EMP, self.options["employers"])
+        candidate_ids = self.create_users(User.RoleChoice.CAN, self.options["candidates"])
+        if self.options["jobs"] and not employer_ids:
+            raise CommandError("--jobs needs at least one employer")
+        self.create_jobs(employer_ids, candidate_ids, self.options["jobs"])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Synthetic data generated in {time.perf_counter() - started:.1f}s."
+        ))
+
+    def batches(self, total):
+        for start in range(0, total, self.batch_size):
+            yield start, min(start + self.batch_size, total)
+
+    def report(self, label, done, total, started):
+        elapsed = time.perf_counter() - started
+        rate = done / elapsed if elapsed else 0
+        self.stdout.write(f"{label}: {done}/{total} ({rate:,.0f} rows/s)")
+        # DEBUG keeps every statement; bulk inserts would pile them up
+        reset_queries()
+
+    def create_users(self, role, total):
+        label = "employers" if role == User.RoleChoice.EMP else "candidates"
+        prefix = "employer" if role == User.RoleChoice.EMP else "candidate"
+        ids, started = [], time.perf_counter()
+        for start, end in self.batches(total):
+            users = []
+            for i in range(start, end):
+                user = User(
+                    email=f"{prefix}{i}@seed{self.seed}.synthetic.example",
+                    username=f"{prefix}_{self.seed}_{i}",
+                    role=role,
+                    password=self.password,
+                )
+                if role == User.RoleChoice.EMP:
+                    user.company = f"Company {self.seed}-{i}"
+                else:
+                    user.resume = "uploads/synthetic_resume.txt"
+                users.append(user)
+
+            with transaction.atomic():
+                users = User.objects.bulk_create(users)
+                if role == User.RoleChoice.EMP:
+                    CompanyProfile.objects.bulk_create(
+                        CompanyProfile(
+                            user_id=user.pk,
+                            description=f"{user.company} is hiring.",
+                            website=f"https://{prefix}{user.pk}.synthetic.example",
+                        )
+                        for user in users
+                    )
+                else:
+                    Through = Skill.candidates.through
+                    Through.objects.bulk_create(
+                        Through(user_id=user.pk, skill_id=skill_id)
+                        for user in users
+                        for skill_id in self.rng.sample(self.skill_ids, self.rng.randint(2, 8))
+                    )
+            ids.extend(user.pk for user in users)
+            self.report(label, end, total, started)
+        return ids
+
+    def create_jobs(self, employer_ids, candidate_ids, total):
+        applications_per_job = self.options["applications_per_job"]
+        rng, started, applications = self.rng, time.perf_counter(), 0
+        for start, end in self.batches(total):
+            jobs, requirements = [], []
+            for i in range(start, end):
+                position = f"{rng.choice(LEVELS)} {rng.choice(ROLES)}"
+                skills = rng.sample(self.skill_ids, rng.randint(3, 8))
+                jobs.append(Job(
+                    position=position,
+                    description=f"{position} position #{i} (seed {self.seed}).",
+                    employer_id=rng.choice(employer_ids),
+                    is_active=rng.random() < 0.8,
+                    salary=Decimal(rng.randrange(20_000, 250_000)),
+                ))
+                requirements.append(skills)
+
+            with transaction.atomic():
+                jobs = Job.objects.bulk_create(jobs)
+                Through = Job.requirements.through
+                Through.objects.bulk_create(
+                    Through(job_id=job.pk, skill_id=skill_id)
+                    for job, skills in zip(jobs, requirements)
+                    for skill_id in skills
+                )
+
+                batch = []
+                for job in jobs:
+                    count = min(applications_per_job(rng), len(candidate_ids))
+                    batch.extend(
+                        Application(job_id=job.pk, candidate_id=candidate_id, cover_letter="")
+                        for candidate_id in rng.sample(candidate_ids, count)
+                    )
+                Application.objects.bulk_create(batch)
+                applications += len(batch)
+                counters.reconcile(jobs[0].pk, jobs[-1].pk + 1)
+
+                # bulk inserts send no signals, so feed the indexes directly
+                search.add_documents(
+                    (job.pk, job.position, job.description,
+                     " ".join(self.skill_names[skill_id] for skill_id in skills))
+                    for job, skills in zip(jobs, requirements)
+                )
+                matching.refresh_jobs(job.pk for job in jobs if job.is_active)
+                caching.invalidate_jobs(list_only=True)
+            self.report("jobs", end, total, started)
+        if applications:
+            self.stdout.write(f"applications: {applications}")
+
 
 class Command(BaseCommand):
     help = "Populate the database with deterministic sample data for local testing"
 
+    def add_arguments(self, parser):
+        parser.add_argument("--employers", type=int, default=0, help="Synthetic employers to generate")
+        parser.add_argument("--candidates", type=int, default=0, help="Synthetic candidates to generate")
+        parser.add_argument("--jobs", type=int, default=0, help="Synthetic jobs to generate")
+        parser.add_argument(
+            "--applications-per-job",
+            type=parse_distribution,
+            default=parse_distribution("0"),
+            metavar="DIST",
+            help="N, uniform:A-B or poisson:MEAN (default 0)",
+        )
+        parser.add_argument("--seed", type=int, default=0, help="Random seed; also tags generated emails")
+        parser.add_argument("--batch-size", type=int, default=10_000)
+        parser.add_argument("--password", default="testpass123", help="Password of every generated user")
+
     def handle(self, *args, **options):
+        if options["employers"] or options["candidates"] or options["jobs"]:
+            SyntheticData(self, options).generate()
+        else:
+            self.populate_samples()
+
+    def populate_samples(self):
         with transaction.atomic():
             self.stdout.write("Starting data population...")
 
@@ -25,12 +237,8 @@ class Command(BaseCommand):
                 "SQL",
                 "AWS",
             ]
-            skill_objects = {}
-            for name in skills:
-                skill_obj, created = Skill.objects.get_or_create(name=name)
-                skill_objects[name] = skill_obj
-                if created:
-                    self.stdout.write(self.style.SUCCESS(f"Created skill: {name}"))
+            skill_ids = dict(zip(skills, resolve_skill_ids(skills)))
+            self.stdout.write(self.style.SUCCESS(f"Resolved {len(skill_ids)} skills"))
 
             employers_data = [
                 {
@@ -165,7 +373,7 @@ class Command(BaseCommand):
                     job.save()
 
                 job.requirements.set(
-                    [skill_objects[name] for name in job_spec["requirements"]]
+                    [skill_ids[name] for name in job_spec["requirements"]]
                 )
                 job_lookup[(job_spec["position"], job_spec["employer_email"])] = job
 
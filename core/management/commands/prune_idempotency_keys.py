@@ -0,0 +1,27 @@
+"""Delete stored Idempotency-Key responses older than IDEMPOTENCY_KEY_TTL."""
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.idempotency import get_ttl
+from core.models import IdempotencyKey
+
+
+class Command(BaseCommand):
+    help = "Prune expired idempotency keys in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - get_ttl()
+        deleted = 0
+        while True:
+            ids = list(
+                IdempotencyKey.objects.filter(created_at__lt=cutoff)
+                .order_by("id").values_list("id", flat=True)[:options["batch_size"]]
+            )
+            if not ids:
+                break
+            deleted += IdempotencyKey.objects.filter(id__in=ids).delete()[0]
+        self.stdout.write(self.style.SUCCESS(f"Pruned {deleted} expired idempotency keys."))
@@ -0,0 +1,27 @@
+"""Delete job tombstones older than JOB_TOMBSTONE_RETENTION."""
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.changes import get_retention
+from core.models import JobTombstone
+
+
+class Command(BaseCommand):
+    help = "Prune job tombstones the change feed no longer serves, in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - get_retention()
+        deleted = 0
+        while True:
+            ids = list(
+                JobTombstone.objects.filter(deleted_at__lt=cutoff)
+                .order_by("deleted_at", "job_id").values_list("job_id", flat=True)[:options["batch_size"]]
+            )
+            if not ids:
+                break
+            deleted += JobTombstone.objects.filter(job_id__in=ids).delete()[0]
+        self.stdout.write(self.style.SUCCESS(f"Pruned {deleted} job tombstones."))
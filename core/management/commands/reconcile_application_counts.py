@@ -0,0 +1,32 @@
+"""Recount Job.application_count in batches and fix the rows that drifted."""
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Max
+
+from core.counters import reconcile
+from core.models import Job
+
+
+class Command(BaseCommand):
+    help = "Recompute drifted job application counters, one primary key range at a time"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument(
+            "--pause", type=float, default=0,
+            help="Seconds to sleep between batches, to leave room for other writers",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        last_id = Job.objects.aggregate(last_id=Max("id"))["last_id"] or 0
+        drifted = 0
+        for start in range(1, last_id + 1, batch_size):
+            drifted += reconcile(start, start + batch_size)
+            self.stdout.write(f"checked up to job {min(start + batch_size - 1, last_id)}, {drifted} drifted")
+            if options["pause"]:
+                time.sleep(options["pause"])
+
+        self.stdout.write(self.style.SUCCESS(f"Fixed {drifted} drifted application counters."))
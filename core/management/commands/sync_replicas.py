@@ -0,0 +1,46 @@
+"""Copy the primary SQLite database into the local replica files.
+
+Stands in for replication when DATABASE_REPLICAS are SQLite files
+(W_FIND_SQLITE_REPLICAS). With --interval it keeps copying, so the
+replicas lag the primary by up to that many seconds.
+"""
+import sqlite3
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from core.replicas import get_replicas
+
+
+class Command(BaseCommand):
+    help = "Copy the primary SQLite database into the SQLite replicas"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--interval", type=float, default=0,
+                            help="Seconds between copies; 0 copies once.")
+
+    def handle(self, *args, **options):
+        replicas = get_replicas()
+        if not replicas:
+            raise CommandError("No DATABASE_REPLICAS are configured.")
+        for alias in [DEFAULT_DB_ALIAS, *replicas]:
+            if connections[alias].vendor != "sqlite":
+                raise CommandError(f"{alias} is not an SQLite database.")
+
+        while True:
+            primary = connections[DEFAULT_DB_ALIAS]
+            primary.ensure_connection()
+            for alias in replicas:
+                # the backup API copies a consistent snapshot page by page
+                target = sqlite3.connect(connections[alias].settings_dict["NAME"])
+                try:
+                    primary.connection.backup(target)
+                finally:
+                    target.close()
+                # drop a persistent connection still reading the old file
+                connections[alias].close()
+            self.stdout.write(self.style.SUCCESS(f"Copied {primary.settings_dict['NAME']} to {len(replicas)} replicas."))
+            if not options["interval"]:
+                break
+            time.sleep(options["interval"])
@@ -0,0 +1,196 @@
+"""Candidate to job matching on required skills.
+
+Every active job that requires at least one skill owns a slot. For each
+skill the index keeps one big integer with a bit set for every slot whose
+job requires that skill, and for each job the sorted tuple of its skill
+ids. Scoring a candidate adds the bitsets of the candidate's skills with a
+bit-sliced counter, so the per-job overlap count is computed with a few
+whole-board ``&``/``^`` operations per skill instead of a join per job.
+
+Each process holds its own index. Signals update it right away in the
+process that wrote, and before scoring, sync() re-reads the jobs whose
+updated_at (bumped by requirement changes too, see core.signals) or
+JobTombstone moved since the last sync, so every process follows writes
+made elsewhere. Like the change feed (core.changes), it looks back
+CHANGE_FEED_SETTLE_SECONDS for changes committed after their timestamp.
+"""
+import threading
+
+from django.db import transaction
+from django.utils import timezone
+
+
+class SkillMatchIndex:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        """Empties the index; it is rebuilt from the database on next use."""
+        self.built = False
+        self.synced_at = None
+        self.slots = []
+        self.slot_of = {}
+        self.free_slots = []
+        self.job_skills = {}
+        self.postings = {}
+
+    def load(self, rows):
+        """Replaces the index with the given (job_id, skill_id) pairs."""
+        job_skills = {}
+        for job_id, skill_id in rows:
+            job_skills.setdefault(job_id, set()).add(skill_id)
+        job_skills = {job_id: tuple(sorted(skills)) for job_id, skills in job_skills.items()}
+
+        slots = list(job_skills)
+        slot_of = {job_id: slot for slot, job_id in enumerate(slots)}
+        bitmaps = {}
+        for slot, job_id in enumerate(slots):
+            for skill_id in job_skills[job_id]:
+                bitmap = bitmaps.get(skill_id)
+                if bitmap is None:
+                    bitmap = bitmaps[skill_id] = bytearray((len(slots) + 7) // 8)
+                bitmap[slot >> 3] |= 1 << (slot & 7)
+
+        with self.lock:
+            self.slots = slots
+            self.slot_of = slot_of
+            self.free_slots = []
+            self.job_skills = job_skills
+            self.postings = {
+                skill_id: int.from_bytes(bitmap, 'little') for skill_id, bitmap in bitmaps.items()
+            }
+            self.built = True
+
+    def build(self):
+        from .models import Job
+
+        Through = Job.requirements.through
+        started = timezone.now()
+        self.load(
+            Through.objects.filter(job__is_active=True).values_list('job_id', 'skill_id').iterator()
+        )
+        self.synced_at = started
+
+    def sync(self):
+        """Builds the index, or re-reads the jobs changed since the last sync."""
+        from .export import get_settle_time
+        from .models import Job, JobTombstone
+
+        if not self.built:
+            self.build()
+            return self
+        started = timezone.now()
+        since = self.synced_at - get_settle_time()
+        self.refresh(Job.objects.filter(updated_at__gt=since).values_list('id', flat=True))
+        for job_id in JobTombstone.objects.filter(deleted_at__gt=since).values_list('job_id', flat=True):
+            self.remove_job(job_id)
+        self.synced_at = started
+        return self
+
+    def refresh(self, job_ids):
+        """Re-reads the skills of the given jobs from the database."""
+        from .models import Job
+
+        skills = {job_id: [] for job_id in job_ids}
+        if not skills:
+            return
+        for job_id, skill_id in Job.requirements.through.objects.filter(
+            job_id__in=skills, job__is_active=True
+        ).values_list('job_id', 'skill_id'):
+            skills[job_id].append(skill_id)
+        for job_id, skill_ids in skills.items():
+            self.set_job(job_id, skill_ids)
+
+    def set_job(self, job_id, skill_ids):
+        """Sets the skills of one job; an empty set drops the job from the index."""
+        skills = tuple(sorted(set(skill_ids)))
+
+        with self.lock:
+            old_skills = self.job_skills.get(job_id, ())
+            if old_skills == skills:
+                return
+            slot = self.slot_of.get(job_id)
+            if slot is None:
+                slot = self.free_slots.pop() if self.free_slots else len(self.slots)
+                if slot == len(self.slots):
+                    self.slots.append(job_id)
+                else:
+                    self.slots[slot] = job_id
+                self.slot_of[job_id] = slot
+            bit = 1 << slot
+
+            for skill_id in set(old_skills).difference(skills):
+                remaining = self.postings[skill_id] & ~bit
+                if remaining:
+                    self.postings[skill_id] = remaining
+                else:
+                    del self.postings[skill_id]
+            for skill_id in set(skills).difference(old_skills):
+                self.postings[skill_id] = self.postings.get(skill_id, 0) | bit
+
+            if skills:
+                self.job_skills[job_id] = skills
+            else:
+                self.job_skills.pop(job_id, None)
+                del self.slot_of[job_id]
+                self.slots[slot] = None
+                self.free_slots.append(slot)
+
+    def remove_job(self, job_id):
+        self.set_job(job_id, ())
+
+    def top_k(self, skill_ids, k=20):
+        """Returns up to k (job_id, score) pairs, highest skill overlap first."""
+        postings = self.postings
+        # counters[b] holds the slots whose overlap count has bit b set
+        counters = []
+        for skill_id in set(skill_ids):
+            carry = postings.get(skill_id, 0)
+            for position, counter in enumerate(counters):
+                if not carry:
+                    break
+                counters[position], carry = counter ^ carry, counter & carry
+            if carry:
+                counters.append(carry)
+
+        results = []
+        slots = self.slots
+        for score in range((1 << len(counters)) - 1, 0, -1):
+            mask = -1
+            for position, counter in enumerate(counters):
+                mask &= counter if score >> position & 1 else ~counter
+                if not mask:
+                    break
+            # equal scores come back in descending slot order
+            while mask and len(results) < k:
+                slot = mask.bit_length() - 1
+                mask ^= 1 << slot
+                results.append((slots[slot], score))
+            if len(results) >= k:
+                break
+        return results
+
+
+match_index = SkillMatchIndex()
+
+
+def refresh_jobs(job_ids):
+    """Re-reads the given jobs into the index once the transaction commits."""
+    job_ids = list(job_ids)
+    if not job_ids or not match_index.built:
+        return
+
+    transaction.on_commit(lambda: match_index.refresh(job_ids))
+
+
+def remove_jobs(job_ids):
+    job_ids = list(job_ids)
+    if not job_ids or not match_index.built:
+        return
+
+    def remove():
+        for job_id in job_ids:
+            match_index.remove_job(job_id)
+
+    transaction.on_commit(remove)
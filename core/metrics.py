@@ -0,0 +1,213 @@
+"""Per-request timing and SQL metrics, aggregated in process.
+
+RequestMetricsMiddleware (core.middleware) fills a RequestMetrics for
+every request: total time, time spent in the database, query count,
+queries repeated within the request and time spent producing serializer
+data. The figures are folded into fixed-bucket histograms per view, which
+/api/metrics/ exposes to admin users, together with gauges other modules
+register. Each worker process keeps its own registry.
+"""
+import re
+import threading
+from bisect import bisect_left
+from collections import Counter
+from contextvars import ContextVar
+from functools import lru_cache
+from time import perf_counter
+
+TIME_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+# distinct views and duplicate fingerprints kept, so odd traffic cannot grow memory
+MAX_VIEWS = 500
+MAX_FINGERPRINTS = 50
+
+current = ContextVar('request_metrics', default=None)
+
+STRING_RE = re.compile(r"'(?:[^']|'')*'")
+NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+IN_LIST_RE = re.compile(r'\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)')
+SPACE_RE = re.compile(r'\s+')
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(sql):
+    """Reduces a statement to its shape: literals and IN lists of any length collapse."""
+    sql = STRING_RE.sub('?', sql)
+    sql = NUMBER_RE.sub('?', sql)
+    sql = IN_LIST_RE.sub('(...)', sql)
+    return SPACE_RE.sub(' ', sql).strip()
+
+
+class RequestMetrics:
+    __slots__ = ('total', 'db_time', 'queries', 'statements', 'serializer_time', 'serializing')
+
+    def __init__(self):
+        self.total = 0.0
+        self.db_time = 0.0
+        self.queries = 0
+        self.statements = Counter()
+        self.serializer_time = 0.0
+        self.serializing = False
+
+    def execute(self, execute, sql, params, many, context):
+        """Database execute wrapper timing every statement."""
+        started = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += perf_counter() - started
+            self.queries += 1
+            self.statements[sql] += 1
+
+    def duplicates(self):
+        """Returns {fingerprint: executions} for statement shapes run more than once."""
+        counts = Counter()
+        for sql, count in self.statements.items():
+            counts[fingerprint(sql)] += count
+        return {shape: count for shape, count in counts.items() if count > 1}
+
+    def server_timing(self, duplicates):
+        return (
+            f'total;dur={self.total * 1000:.2f}, '
+            f'db;dur={self.db_time * 1000:.2f};desc="{self.queries} queries, {len(duplicates)} duplicated", '
+            f'serializer;dur={self.serializer_time * 1000:.2f}'
+        )
+
+
+class Histogram:
+    __slots__ = ('bounds', 'counts', 'count', 'sum')
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, fraction):
+        """Upper bound of the bucket holding the quantile; None above the last bound."""
+        rank, seen = fraction * self.count, 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return None
+
+    def as_dict(self):
+        buckets = {f'le_{bound}': count for bound, count in zip(self.bounds, self.counts)}
+        buckets['inf'] = self.counts[-1]
+        return {
+            'count': self.count,
+            'mean': round(self.sum / self.count, 3) if self.count else None,
+            'p50': self.quantile(0.50),
+            'p95': self.quantile(0.95),
+            'p99': self.quantile(0.99),
+            'buckets': buckets,
+        }
+
+
+class ViewStats:
+    def __init__(self):
+        self.total_ms = Histogram(TIME_BUCKETS_MS)
+        self.db_ms = Histogram(TIME_BUCKETS_MS)
+        self.serializer_ms = Histogram(TIME_BUCKETS_MS)
+        self.queries = Histogram(QUERY_BUCKETS)
+        self.requests_with_duplicates = 0
+        # fingerprint -> [requests it was repeated in, most executions in one request]
+        self.duplicates = {}
+
+    def record(self, metrics, duplicates):
+        self.total_ms.observe(metrics.total * 1000)
+        self.db_ms.observe(metrics.db_time * 1000)
+        self.serializer_ms.observe(metrics.serializer_time * 1000)
+        self.queries.observe(metrics.queries)
+        if duplicates:
+            self.requests_with_duplicates += 1
+        for shape, count in duplicates.items():
+            seen = self.duplicates.get(shape)
+            if seen is not None:
+                seen[0] += 1
+                seen[1] = max(seen[1], count)
+            elif len(self.duplicates) < MAX_FINGERPRINTS:
+                self.duplicates[shape] = [1, count]
+
+    def as_dict(self):
+        worst = sorted(self.duplicates.items(), key=lambda item: item[1], reverse=True)
+        return {
+            'total_ms': self.total_ms.as_dict(),
+            'db_ms': self.db_ms.as_dict(),
+            'serializer_ms': self.serializer_ms.as_dict(),
+            'queries': self.queries.as_dict(),
+            'requests_with_duplicates': self.requests_with_duplicates,
+            'duplicate_queries': [
+                {'sql': shape, 'requests': requests, 'max_per_request': most}
+                for shape, (requests, most) in worst
+            ],
+        }
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.views = {}
+        self.gauges = {}
+
+    def register_gauge(self, name, read):
+        """Adds a callable whose current value is reported with every snapshot."""
+        self.gauges[name] = read
+
+    def record(self, view, metrics, duplicates):
+        with self.lock:
+            stats = self.views.get(view)
+            if stats is None:
+                if len(self.views) >= MAX_VIEWS:
+                    view = 'other'
+                stats = self.views.setdefault(view, ViewStats())
+            stats.record(metrics, duplicates)
+
+    def snapshot(self):
+        with self.lock:
+            views = {view: stats.as_dict() for view, stats in sorted(self.views.items())}
+        return {
+            'views': views,
+            'gauges': {name: read() for name, read in sorted(self.gauges.items())},
+        }
+
+    def reset(self):
+        with self.lock:
+            self.views = {}
+
+
+registry = MetricsRegistry()
+
+
+def instrument_serializers():
+    """Times BaseSerializer.data, where DRF turns instances into primitives.
+
+    Only the outermost serializer is timed; queries it triggers count
+    towards both the serializer and the database time.
+    """
+    from rest_framework.serializers import BaseSerializer
+
+    original = BaseSerializer.data
+    if getattr(original.fget, 'timed', False):
+        return
+
+    def data(self):
+        metrics = current.get()
+        if metrics is None or metrics.serializing:
+            return original.fget(self)
+        metrics.serializing = True
+        started = perf_counter()
+        try:
+            return original.fget(self)
+        finally:
+            metrics.serializer_time += perf_counter() - started
+            metrics.serializing = False
+
+    data.timed = True
+    BaseSerializer.data = property(data)
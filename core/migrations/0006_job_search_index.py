@@ -0,0 +1,33 @@
+from django.db import migrations
+
+from core import search
+
+
+def create_index(apps, schema_editor):
+    if not search.is_supported(schema_editor.connection):
+        return
+    schema_editor.execute(search.CREATE_INDEX_SQL)
+    schema_editor.execute(
+        f"INSERT INTO {search.FTS_TABLE} (rowid, position, description, skills) "
+        "SELECT job.id, job.position, COALESCE(job.description, ''), "
+        "COALESCE((SELECT group_concat(skill.name, ' ') FROM core_job_requirements req "
+        "JOIN core_skill skill ON skill.id = req.skill_id WHERE req.job_id = job.id), '') "
+        "FROM core_job job"
+    )
+
+
+def drop_index(apps, schema_editor):
+    if not search.is_supported(schema_editor.connection):
+        return
+    schema_editor.execute(search.DROP_INDEX_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_job_application_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
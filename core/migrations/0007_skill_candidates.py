@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:14
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_job_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='skill',
+            name='candidates',
+            field=models.ManyToManyField(blank=True, related_name='skills', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -0,0 +1,43 @@
+from django.db import migrations
+
+
+def merge_skill_case_variants(apps, schema_editor):
+    """Merges skills whose names differ only in case or whitespace into the oldest one.
+
+    The oldest skill keeps its name, with runs of whitespace collapsed;
+    this makes room for the case-insensitive unique constraint of 0014.
+    The merged rows are not restored when migrating backwards.
+    """
+    Skill = apps.get_model('core', 'Skill')
+    Job = apps.get_model('core', 'Job')
+    Through = Job.requirements.through
+
+    canonical = {}
+    for skill in Skill.objects.order_by('id'):
+        name = ' '.join(skill.name.split())
+        keep = canonical.setdefault(name.lower(), skill)
+        if keep.pk == skill.pk:
+            continue
+        # repoint requirements and candidates of the duplicate, then drop it
+        taken = set(Through.objects.filter(skill_id=keep.pk).values_list('job_id', flat=True))
+        Through.objects.filter(skill_id=skill.pk).exclude(job_id__in=taken).update(skill_id=keep.pk)
+        keep.candidates.add(*skill.candidates.all())
+        skill.delete()
+
+    # renamed once the duplicates, which may hold the collapsed name, are gone
+    for skill in canonical.values():
+        name = ' '.join(skill.name.split())
+        if skill.name != name:
+            skill.name = name
+            skill.save(update_fields=['name'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_skill_candidates'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_skill_case_variants, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:17
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_applications(apps, schema_editor):
+    Job = apps.get_model('core', 'Job')
+    Application = apps.get_model('core', 'Application')
+    Job.objects.update(application_count=Coalesce(Subquery(
+        Application.objects.filter(job_id=OuterRef('pk')).order_by().values('job_id')
+        .annotate(count=Count('id')).values('count')
+    ), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_application_job_applied_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='application_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_applications, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['-application_count', '-id'], name='job_popularity_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:55
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_idempotencykey'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobTombstone',
+            fields=[
+                ('job_id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('deleted_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['updated_at', 'id'], name='job_updated_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='jobtombstone',
+            index=models.Index(fields=['deleted_at', 'job_id'], name='job_tombstone_deleted_idx'),
+        ),
+    ]
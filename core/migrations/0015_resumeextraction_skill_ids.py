@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:02
+
+import struct
+
+from django.conf import settings
+from django.db import migrations
+
+
+def bits_to_ids(data):
+    bits = int.from_bytes(data or b'', 'little')
+    return [index for index in range(bits.bit_length()) if bits >> index & 1]
+
+
+def pack_skill_ids(apps, schema_editor):
+    ResumeExtraction = apps.get_model('core', 'ResumeExtraction')
+    for row in ResumeExtraction.objects.exclude(skill_ids=b'').only('pk', 'skill_ids').iterator():
+        skill_ids = bits_to_ids(bytes(row.skill_ids))
+        row.skill_ids = struct.pack(f'<{len(skill_ids)}I', *skill_ids)
+        row.save(update_fields=['skill_ids'])
+
+
+def unpack_skill_ids(apps, schema_editor):
+    ResumeExtraction = apps.get_model('core', 'ResumeExtraction')
+    for row in ResumeExtraction.objects.exclude(skill_ids=b'').only('pk', 'skill_ids').iterator():
+        data = bytes(row.skill_ids)
+        bits = 0
+        for skill_id in struct.unpack(f'<{len(data) // 4}I', data):
+            bits |= 1 << skill_id
+        row.skill_ids = bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+        row.save(update_fields=['skill_ids'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_skill_name_ci_unique'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RenameField(
+            model_name='resumeextraction',
+            old_name='skill_bits',
+            new_name='skill_ids',
+        ),
+        migrations.RunPython(pack_skill_ids, unpack_skill_ids),
+    ]
@@ -1,18 +1,27 @@
 from django.db import models
 from django.contrib.auth import get_user_model
+from django.core.serializers.json import DjangoJSONEncoder
 from django.core.validators import MinValueValidator
+from django.db.models.functions import Lower
+from django.utils import timezone
 
 User = get_user_model()
 
 class Skill(models.Model):
     """Skills required for job and will have many to many relationship with Job model"""
-    name = models.CharField(max_length=50, unique=True)
+    name = models.CharField(max_length=50)
+    # skills a candidate has, used to match them against job requirements
+    candidates = models.ManyToManyField(User, blank=True, related_name='skills')
     
     def __str__(self):
         return self.name
 
     class Meta:
         ordering = ['name']
+        constraints = [
+            # names keep their case; "aws" is the same skill as "AWS" (core.skills)
+            models.UniqueConstraint(Lower('name'), name='skill_name_ci_unique'),
+        ]
     
     
 class Job(models.Model):
@@ -33,18 +42,43 @@ class Job(models.Model):
         null=True,
         validators=[MinValueValidator(0)],
     )
+    # kept exact by core.counters
+    application_count = models.PositiveIntegerField(default=0, editable=False)
     
     class Meta:
         get_latest_by = 'created_at'
         ordering = ['-created_at']
+        indexes = [
+            # keyset pagination walks (created_at, id)
+            models.Index(fields=['-created_at', '-id'], name='job_created_id_idx'),
+            # ?ordering=popular walks (application_count, id)
+            models.Index(fields=['-application_count', '-id'], name='job_popularity_idx'),
+            # the change feed walks (updated_at, id)
+            models.Index(fields=['updated_at', 'id'], name='job_updated_id_idx'),
+        ]
     
     def num_applications(self):
-        return self.applications.count()
+        return self.application_count
     
     def __str__(self):
         return f"{self.position} (Posted: {self.created_at})"
 
 
+class JobTombstone(models.Model):
+    """Marks a deleted job for the change feed (core.changes)."""
+    # the deleted job's id, which no new job is given again
+    job_id = models.BigIntegerField(primary_key=True)
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['deleted_at', 'job_id'], name='job_tombstone_deleted_idx'),
+        ]
+
+    def __str__(self):
+        return f"Job {self.job_id} (Deleted: {self.deleted_at})"
+
+
 class Application(models.Model):
     """Refers to the application sent by candidate."""
     # ForeignKey: Each application belongs to one job
@@ -61,6 +95,12 @@ class Application(models.Model):
 
     class Meta:
         ordering = ['-applied_at']
+        indexes = [
+            # keyset pagination walks (applied_at, id)
+            models.Index(fields=['-applied_at', '-id'], name='application_applied_id_idx'),
+            # an employer's inbox and per-job counts read applications job by job
+            models.Index(fields=['job', '-applied_at', '-id'], name='application_job_applied_idx'),
+        ]
         constraints = [
             models.UniqueConstraint(
                 fields=['job', 'candidate'],
@@ -75,4 +115,62 @@ class CompanyProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     description = models.TextField(blank=True, null=True)
     website = models.URLField(blank=True)
-    
\ No newline at end of file
+    
+
+class ResumeExtraction(models.Model):
+    """Queue entry and result of reading skills out of a candidate's resume.
+
+    One row per candidate: saving a new resume puts the row back to
+    pending, and the extract_resumes worker fills ``skill_ids``, the sorted
+    Skill ids packed as 32-bit little-endian integers (see core.extraction).
+    """
+
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'Pending'
+        RUNNING = 'running', 'Running'
+        DONE = 'done', 'Done'
+        FAILED = 'failed', 'Failed'
+
+    candidate = models.OneToOneField(
+        User, on_delete=models.CASCADE, primary_key=True, related_name='resume_extraction'
+    )
+    resume = models.CharField(max_length=255)
+    status = models.CharField(max_length=7, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    # identifies the worker run holding a running row
+    claimed_by = models.CharField(max_length=32, blank=True)
+    queued_at = models.DateTimeField()
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    skill_ids = models.BinaryField(default=b'')
+    skill_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            # workers claim the oldest pending rows
+            models.Index(fields=['status', 'queued_at'], name='resume_extraction_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"Resume extraction for {self.candidate_id} ({self.status})"
+
+
+class IdempotencyKey(models.Model):
+    """The response to a create request sent with an Idempotency-Key header."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    # the endpoint the key was used with
+    scope = models.CharField(max_length=50)
+    key = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField()
+    response = models.JSONField(encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'scope', 'key'], name='unique_idempotency_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.scope} {self.key} ({self.status_code})"
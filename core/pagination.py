@@ -0,0 +1,162 @@
+from base64 import b64decode, b64encode
+from collections import OrderedDict
+from urllib import parse
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """Cursor pagination on an (ordering field, id) key.
+
+    Every page is a range scan on the composite index, so deep pages cost
+    the same as the first one. Rows are returned newest first.
+    """
+    ordering_field = 'created_at'
+    page_size = 20
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_page_size(self, request):
+        page_size = self.page_size
+        if self.page_size_query_param:
+            try:
+                requested = int(request.query_params[self.page_size_query_param])
+            except (KeyError, ValueError):
+                return page_size
+            if requested > 0:
+                return min(requested, self.max_page_size)
+        return page_size
+
+    def get_ordering_field(self, request, view):
+        return self.ordering_field
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self.page_queryset(queryset, request, view)
+        return self.set_page(list(queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        queryset = self.page_queryset(queryset, request, view)
+        return self.set_page([item async for item in queryset])
+
+    def page_queryset(self, queryset, request, view=None):
+        """Narrows the queryset to the requested page plus one row."""
+        self.request = request
+        self.model = queryset.model
+        self.field = self.get_ordering_field(request, view)
+        self.limit = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            queryset = queryset.order_by(f'-{self.field}', '-id')
+        else:
+            value, pk, reverse = self.cursor
+            if reverse:
+                # walking back towards newer rows
+                queryset = queryset.filter(
+                    Q(**{f'{self.field}__gt': value}) | Q(**{self.field: value, 'id__gt': pk})
+                ).order_by(self.field, 'id')
+            else:
+                queryset = queryset.filter(
+                    Q(**{f'{self.field}__lt': value}) | Q(**{self.field: value, 'id__lt': pk})
+                ).order_by(f'-{self.field}', '-id')
+
+        # one extra row tells us whether there is a page beyond this one
+        return queryset[:self.limit + 1]
+
+    def set_page(self, results):
+        cursor = self.cursor
+        reverse = cursor is not None and cursor[2]
+        has_more = len(results) > self.limit
+        results = results[:self.limit]
+        if reverse:
+            results.reverse()
+
+        self.page = results
+        if reverse:
+            self.has_next = cursor is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = cursor is not None
+        return results
+
+    def get_key(self, item):
+        if isinstance(item, dict):
+            return item[self.field], item['id']
+        return getattr(item, self.field), item.pk
+
+    def encode_cursor(self, item, reverse):
+        value, pk = self.get_key(item)
+        value = value.isoformat() if hasattr(value, 'isoformat') else str(value)
+        tokens = {'v': value, 'i': pk}
+        if reverse:
+            tokens['r'] = 1
+        querystring = parse.urlencode(tokens, doseq=True)
+        encoded = b64encode(querystring.encode('ascii')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            querystring = b64decode(encoded.encode('ascii')).decode('ascii')
+            tokens = parse.parse_qs(querystring, keep_blank_values=True)
+            field = self.model._meta.get_field(self.field)
+            value = field.to_python(tokens['v'][0])
+            pk = int(tokens['i'][0])
+            reverse = bool(int(tokens.get('r', ['0'])[0]))
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+        return value, pk, reverse
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class JobPagination(KeysetPagination):
+    """Pages jobs on (created_at, id), or on (application_count, id) with ?ordering=popular."""
+    ordering_field = 'created_at'
+    ordering_fields = {'newest': 'created_at', 'popular': 'application_count'}
+
+    def get_ordering_field(self, request, view):
+        return self.ordering_fields.get(request.query_params.get('ordering'), self.ordering_field)
+
+
+class ApplicationPagination(KeysetPagination):
+    """Pages applications on (applied_at, id)."""
+    ordering_field = 'applied_at'
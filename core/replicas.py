@@ -0,0 +1,199 @@
+"""Read replicas for the read-only API actions.
+
+settings.DATABASE_REPLICAS names database aliases holding copies of
+'default'. ReplicaRouter sends every write to 'default', and sends reads to
+a replica only inside use_replica(), which ReplicaReadMixin enters for the
+list and retrieve actions of a viewset. Everything else, including reads
+inside a transaction or after a write in the same request, uses the
+primary.
+
+Replicas lag behind. ReplicaPinMiddleware pins a user who wrote to the
+primary for REPLICA_PIN_SECONDS, so they read their own writes on the
+following requests; core.caching pins anonymous job reads the same way
+after the job list changes. The pins live in the JOB_RESPONSE_CACHE, and
+only hold across workers if that cache is shared by them, so replicas are
+refused (ImproperlyConfigured) while it is a per-process LocMemCache or a
+DummyCache. A replica whose connection fails is skipped for
+REPLICA_RETRY_SECONDS.
+
+Locally, W_FIND_SQLITE_REPLICAS=<n> adds n SQLite files as replicas and
+``manage.py sync_replicas`` copies the primary into them.
+"""
+import random
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+from . import caching
+
+# alias reads are routed to in the current request, None for the primary
+current_replica = ContextVar('current_replica', default=None)
+# set to a list by ReplicaPinMiddleware; the router appends to it on writes
+request_writes = ContextVar('request_writes', default=None)
+# alias -> time.monotonic() after which a failed replica is tried again
+unavailable = {}
+
+
+def get_replicas():
+    replicas = list(getattr(settings, 'DATABASE_REPLICAS', ()))
+    if replicas and isinstance(caching.get_cache(), (LocMemCache, DummyCache)):
+        raise ImproperlyConfigured(
+            'DATABASE_REPLICAS need a JOB_RESPONSE_CACHE shared by all workers to hold replica pins.'
+        )
+    return replicas
+
+
+def pin_key(name):
+    return f'db:pin:{name}'
+
+
+def pin(*names):
+    """Sends reads for the given pin names to the primary for a while."""
+    if not get_replicas():
+        return
+    timeout = getattr(settings, 'REPLICA_PIN_SECONDS', 5)
+    caching.get_cache().set_many({pin_key(name): True for name in names}, timeout)
+
+
+def is_pinned(*names):
+    return bool(names) and bool(caching.get_cache().get_many([pin_key(name) for name in names]))
+
+
+def choose_replica():
+    """A replica with a working connection, or None."""
+    replicas = get_replicas()
+    random.shuffle(replicas)
+    now = time.monotonic()
+    for alias in replicas:
+        if unavailable.get(alias, 0) > now:
+            continue
+        try:
+            # a no-op for a persistent connection that passed its health check
+            connections[alias].ensure_connection()
+        except DatabaseError:
+            unavailable[alias] = now + getattr(settings, 'REPLICA_RETRY_SECONDS', 30)
+            continue
+        unavailable.pop(alias, None)
+        return alias
+    return None
+
+
+def pick_replica(pins=()):
+    return None if is_pinned(*pins) else choose_replica()
+
+
+@contextmanager
+def use_replica(pins=()):
+    """Routes the reads in the block to a replica unless a pin is set."""
+    token = current_replica.set(pick_replica(pins))
+    try:
+        yield current_replica.get()
+    finally:
+        current_replica.reset(token)
+
+
+@asynccontextmanager
+async def ause_replica(pins=()):
+    """use_replica() for async code; the ORM's threads inherit the choice."""
+    token = current_replica.set(await sync_to_async(pick_replica)(pins))
+    try:
+        yield current_replica.get()
+    finally:
+        current_replica.reset(token)
+
+
+class ReplicaRouter:
+    """Writes go to the primary; reads to the replica chosen by use_replica()."""
+
+    def db_for_read(self, model, **hints):
+        alias = current_replica.get()
+        if alias is None or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return alias
+
+    def db_for_write(self, model, **hints):
+        # later reads of this request must see the write
+        current_replica.set(None)
+        writes = request_writes.get()
+        if writes is not None:
+            writes.append(model._meta.label)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *get_replicas()}
+        return obj1._state.db in databases and obj2._state.db in databases
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # replicas receive the schema from the primary
+        return db not in get_replicas()
+
+
+class ReplicaPinMiddleware:
+    """Pins users who wrote to the database to the primary for a while."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        writes = []
+        token = request_writes.set(writes)
+        try:
+            response = self.get_response(request)
+        finally:
+            request_writes.reset(token)
+        if writes:
+            self.pin_writer(request)
+        return response
+
+    async def __acall__(self, request):
+        writes = []
+        token = request_writes.set(writes)
+        try:
+            response = await self.get_response(request)
+        finally:
+            request_writes.reset(token)
+        if writes:
+            # request.user may still be a lazy session lookup
+            await sync_to_async(self.pin_writer)(request)
+        return response
+
+    def pin_writer(self, request):
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            pin(f'user:{user.pk}')
+
+
+class ReplicaReadMixin:
+    """Serves the replica_actions of a viewset from a read replica."""
+    replica_actions = ('list', 'retrieve')
+
+    def get_replica_pins(self, request):
+        if request.user.is_authenticated:
+            return [f'user:{request.user.pk}']
+        return []
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if self.action in self.replica_actions and get_replicas():
+            self._replica = use_replica(self.get_replica_pins(request))
+            self._replica.__enter__()
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        replica = getattr(self, '_replica', None)
+        if replica is not None:
+            self._replica = None
+            replica.__exit__(None, None, None)
+        return super().finalize_response(request, response, *args, **kwargs)
@@ -0,0 +1,130 @@
+"""Load test the sync and async job views under uvicorn.
+
+Starts one uvicorn worker on the configured database and keeps C
+connections busy against each path for a few seconds:
+
+* list: anonymous job list pages with varying page sizes and orderings,
+  served mostly from the response cache.
+* detail: random jobs, mostly cache misses that hit the database.
+
+Run it against a populated database with DEBUG off, e.g. settings that
+import w_find.settings and override DEBUG and ALLOWED_HOSTS:
+
+    python manage.py runscript bench_asgi --settings=prod_settings --script-args 1000 10
+
+The arguments are the most concurrent connections and the seconds per
+run. Needs uvicorn and httpx.
+"""
+import asyncio
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from importlib.util import find_spec
+
+from core.models import Job
+
+PATHS = {
+    'sync': ('/api/jobs/', '/api/jobs/{}/'),
+    'async': ('/api/async/jobs/', '/api/async/jobs/{}/'),
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port):
+    server = subprocess.Popen(
+        [
+            sys.executable, '-m', 'uvicorn', 'w_find.asgi:application',
+            '--port', str(port), '--workers', '1', '--log-level', 'warning', '--no-access-log',
+        ],
+        env={**os.environ, 'PYTHONUNBUFFERED': '1'},
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return server
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError('uvicorn did not start')
+
+
+async def load(base_url, make_path, connections, seconds):
+    import httpx
+
+    latencies, errors = [], 0
+    limits = httpx.Limits(max_connections=connections, max_keepalive_connections=connections)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        deadline = time.perf_counter() + seconds
+
+        async def user(rng):
+            nonlocal errors
+            while (started := time.perf_counter()) < deadline:
+                try:
+                    response = await client.get(make_path(rng))
+                    ok = response.status_code == 200
+                except httpx.HTTPError:
+                    ok = False
+                if ok:
+                    latencies.append(time.perf_counter() - started)
+                else:
+                    errors += 1
+
+        await asyncio.gather(*(user(random.Random(index)) for index in range(connections)))
+    return latencies, errors
+
+
+def report(label, latencies, errors, seconds):
+    latencies.sort()
+    if not latencies:
+        print(f'{label}: no successful requests, {errors} errors')
+        return
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(
+        f'{label}: {len(latencies) / seconds:7.0f} req/s '
+        f'p50={statistics.median(latencies) * 1000:7.1f}ms p99={p99 * 1000:7.1f}ms errors={errors}'
+    )
+
+
+def run(*args):
+    if find_spec('uvicorn') is None or find_spec('httpx') is None:
+        print('bench_asgi needs uvicorn and httpx installed')
+        return
+    max_connections = int(args[0]) if args else 1000
+    seconds = float(args[1]) if len(args) > 1 else 10
+    job_ids = list(Job.objects.values_list('id', flat=True))
+    if not job_ids:
+        print('The database has no jobs; run manage.py populate first')
+        return
+
+    port = free_port()
+    server = start_server(port)
+    try:
+        for scenario in ('list', 'detail'):
+            connections = 10
+            while connections <= max_connections:
+                for kind, (list_path, detail_path) in PATHS.items():
+                    if scenario == 'list':
+                        def make_path(rng, list_path=list_path):
+                            ordering = rng.choice(('newest', 'popular'))
+                            return f'{list_path}?ordering={ordering}&page_size={rng.randint(1, 100)}'
+                    else:
+                        def make_path(rng, detail_path=detail_path):
+                            return detail_path.format(rng.choice(job_ids))
+                    latencies, errors = asyncio.run(
+                        load(f'http://127.0.0.1:{port}', make_path, connections, seconds)
+                    )
+                    report(f'{scenario:>6} {kind:>5} {connections:>5} conns', latencies, errors, seconds)
+                connections *= 10
+    finally:
+        server.terminate()
+        server.wait()
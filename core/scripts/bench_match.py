@@ -0,0 +1,55 @@
+"""Benchmark candidate to job matching.
+
+Loads N synthetic active jobs into a SkillMatchIndex and times top-K
+ranking for candidates with different numbers of skills.
+
+    python manage.py runscript bench_match --script-args 1000000
+"""
+import random
+import statistics
+import time
+from itertools import accumulate
+
+from core.matching import SkillMatchIndex
+
+SKILL_COUNT = 2_000
+
+
+def synthetic_requirements(size, rng):
+    # a few popular skills and a long tail, 3-12 skills per job
+    population = range(1, SKILL_COUNT + 1)
+    weights = list(accumulate(1 / rank for rank in population))
+    for job_id in range(1, size + 1):
+        for skill_id in set(rng.choices(population, cum_weights=weights, k=rng.randint(3, 12))):
+            yield job_id, skill_id
+
+
+def run(*args):
+    size = int(args[0]) if args else 100_000
+    repeat = int(args[1]) if len(args) > 1 else 20
+    rng = random.Random(0)
+    index = SkillMatchIndex()
+
+    started = time.perf_counter()
+    index.load(synthetic_requirements(size, rng))
+    print(f"indexed {size} jobs in {time.perf_counter() - started:.1f}s")
+
+    for skill_count in (3, 10, 30):
+        timings = []
+        for _ in range(repeat):
+            skills = rng.sample(range(1, 200), skill_count)
+            started = time.perf_counter()
+            index.top_k(skills, 20)
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        print(
+            f"{skill_count:>2} candidate skills: "
+            f"p50={statistics.median(timings):7.2f}ms max={timings[-1]:7.2f}ms"
+        )
+
+    updates = 1000
+    started = time.perf_counter()
+    for job_id in range(1, updates + 1):
+        index.set_job(job_id, rng.sample(range(1, SKILL_COUNT + 1), 5))
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    print(f"incremental update: {elapsed_ms / updates:.2f}ms per job")
@@ -0,0 +1,109 @@
+"""Benchmark the job search index.
+
+Builds the FTS5 index in a scratch in-memory database with N synthetic
+jobs and times ranked searches through the same SQL the API runs.
+Descriptions draw from a Zipf-distributed vocabulary, so queries range
+from rare words to terms matching a large share of the board; ranking
+cost grows with the number of matching rows, not with the board size.
+
+    python manage.py runscript bench_search --script-args 1000000
+"""
+import random
+import sqlite3
+import statistics
+import string
+import time
+from itertools import accumulate
+
+from core import search
+
+WORDS = [
+    'senior', 'junior', 'lead', 'staff', 'backend', 'frontend', 'full', 'stack',
+    'data', 'platform', 'mobile', 'cloud', 'security', 'machine', 'learning',
+    'engineer', 'developer', 'analyst', 'architect', 'manager', 'designer',
+    'remote', 'contract', 'startup', 'fintech', 'health', 'retail', 'gaming',
+]
+SKILLS = [
+    'python', 'django', 'flask', 'javascript', 'typescript', 'react', 'vue',
+    'angular', 'sql', 'postgresql', 'mysql', 'sqlite', 'aws', 'gcp', 'azure',
+    'docker', 'kubernetes', 'terraform', 'go', 'rust', 'java', 'kotlin', 'swift',
+    'redis', 'kafka', 'spark', 'pandas', 'pytorch', 'graphql', 'linux',
+]
+VOCABULARY_SIZE = 20_000
+
+
+def make_vocabulary(rng):
+    words = [''.join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 9)))
+             for _ in range(VOCABULARY_SIZE)]
+    weights = list(accumulate(1 / rank for rank in range(1, VOCABULARY_SIZE + 1)))
+    return words, weights
+
+
+def make_queries(vocabulary):
+    common, mid, rare = vocabulary[10], vocabulary[500], vocabulary[5000]
+    return [
+        (rare, {}),
+        (f'{mid} {rare}', {}),
+        (mid, {'is_active': True}),
+        ('rust engineer', {'is_active': True}),
+        (f'senior {mid}', {'min_salary': '50000', 'max_salary': '90000'}),
+        ('kube', {}),
+        (common, {}),
+    ]
+
+
+def build(db, size, rng, vocabulary):
+    words, weights = vocabulary
+    db.execute("CREATE TABLE core_job (id INTEGER PRIMARY KEY, is_active BOOL, salary DECIMAL)")
+    db.execute(search.CREATE_INDEX_SQL)
+    batch = 50_000
+    for start in range(1, size + 1, batch):
+        ids = range(start, min(start + batch, size + 1))
+        db.executemany(
+            "INSERT INTO core_job VALUES (?, ?, ?)",
+            ((i, rng.random() < 0.8, rng.randrange(20_000, 200_000)) for i in ids),
+        )
+        db.executemany(
+            f"INSERT INTO {search.FTS_TABLE} (rowid, position, description, skills) VALUES (?, ?, ?, ?)",
+            (
+                (
+                    i,
+                    ' '.join(rng.sample(WORDS, 3)),
+                    ' '.join(rng.choices(words, cum_weights=weights, k=40)),
+                    ' '.join(rng.sample(SKILLS, rng.randint(2, 8))),
+                )
+                for i in ids
+            ),
+        )
+    db.execute(f"INSERT INTO {search.FTS_TABLE}({search.FTS_TABLE}) VALUES ('optimize')")
+    db.commit()
+
+
+def run(*args):
+    size = int(args[0]) if args else 100_000
+    repeat = int(args[1]) if len(args) > 1 else 50
+    db = sqlite3.connect(':memory:')
+    rng = random.Random(0)
+    vocabulary = make_vocabulary(rng)
+
+    started = time.perf_counter()
+    build(db, size, rng, vocabulary)
+    print(f"indexed {size} jobs in {time.perf_counter() - started:.1f}s")
+
+    for query, filters in make_queries(vocabulary[0]):
+        sql, names = search.build_search_sql(**filters)
+        params = [search.build_match_expression(query)] + [filters[name] for name in names] + [20]
+        sql = sql.replace('%s', '?')
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            db.execute(sql, params).fetchall()
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        matches = db.execute(
+            f"SELECT count(*) FROM {search.FTS_TABLE} WHERE {search.FTS_TABLE} MATCH ?", params[:1]
+        ).fetchone()[0]
+        print(
+            f"{query!r:28} {str(filters):50} matches={matches:<8} "
+            f"p50={statistics.median(timings):8.2f}ms p95={timings[int(len(timings) * 0.95) - 1]:8.2f}ms"
+        )
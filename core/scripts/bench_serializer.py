@@ -0,0 +1,59 @@
+"""Benchmark JobListSerializer on model instances against values() rows.
+
+Serializes the newest N jobs of the configured database both ways, checks
+the rendered JSON is identical and prints the per-row cost of loading
+(the query, plus the prefetch for instances) and of serializing.
+
+    python manage.py runscript bench_serializer --script-args 10000 5
+
+The arguments are the rows per page and the runs; the best run is shown.
+Run manage.py populate first.
+"""
+import time
+
+from rest_framework.renderers import JSONRenderer
+
+from core.models import Job
+from core.serializers import JobListSerializer
+from core.views import with_listing_fields
+
+
+def timed(load):
+    started = time.perf_counter()
+    jobs = list(load())
+    loaded = time.perf_counter()
+    data = JobListSerializer(jobs, many=True).data
+    return loaded - started, time.perf_counter() - loaded, data
+
+
+def run(*args):
+    size = int(args[0]) if args else 10_000
+    repeat = int(args[1]) if len(args) > 1 else 5
+    page = Job.objects.order_by('-created_at', '-id')[:size]
+    paths = {
+        'instances': lambda: with_listing_fields(page),
+        'rows': lambda: JobListSerializer.values(page),
+    }
+    rows = len(page)
+    if not rows:
+        print('The database has no jobs; run manage.py populate first')
+        return
+
+    best, outputs = {}, {}
+    for _ in range(repeat):
+        for name, load in paths.items():
+            load_time, serialize_time, outputs[name] = timed(load)
+            if name not in best or load_time + serialize_time < sum(best[name]):
+                best[name] = (load_time, serialize_time)
+
+    renderer = JSONRenderer()
+    same = renderer.render(outputs['instances']) == renderer.render(outputs['rows'])
+    print(f'{rows} jobs, identical JSON: {same}')
+    for name, (load_time, serialize_time) in best.items():
+        print(
+            f'{name:>9}: load {load_time / rows * 1e6:6.1f}us/row '
+            f'serialize {serialize_time / rows * 1e6:6.1f}us/row '
+            f'total {(load_time + serialize_time) * 1000:7.1f}ms'
+        )
+    speedup = sum(best['instances']) / sum(best['rows'])
+    print(f'rows are {speedup:.1f}x faster per page')
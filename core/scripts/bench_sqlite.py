@@ -0,0 +1,170 @@
+"""Benchmark mixed read/write throughput of SQLite connection profiles.
+
+Seeds a scratch database file with jobs and applications, then runs
+worker processes that mostly page through jobs and sometimes submit an
+application the way the API does (read the job, insert, bump the
+counter, in one transaction). Each profile gets a fresh copy of the
+file:
+
+* default: rollback journal and deferred transactions, as Django
+  connects without options.
+* tuned: settings.SQLITE_PRAGMAS and IMMEDIATE transactions, as the
+  'default' database is configured.
+
+    python manage.py runscript bench_sqlite --script-args 16 5 0.2
+
+The arguments are the most workers, the seconds per run and the share of
+writes. "locked" counts operations that failed with "database is locked".
+"""
+import multiprocessing
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from django.conf import settings
+
+JOBS = 20_000
+APPLICATIONS = 100_000
+CANDIDATES = 1_000_000_000
+
+
+def seed(path):
+    db = sqlite3.connect(path)
+    db.executescript("""
+        CREATE TABLE job (id INTEGER PRIMARY KEY, position TEXT, application_count INTEGER);
+        CREATE TABLE application (
+            id INTEGER PRIMARY KEY, job_id INTEGER, candidate_id INTEGER, applied_at REAL,
+            UNIQUE (job_id, candidate_id)
+        );
+        CREATE INDEX application_job ON application (job_id, applied_at);
+    """)
+    rng = random.Random(0)
+    db.executemany(
+        "INSERT INTO job VALUES (?, ?, 0)", ((i, f"Job {i}") for i in range(1, JOBS + 1))
+    )
+    db.executemany(
+        "INSERT OR IGNORE INTO application (job_id, candidate_id, applied_at) VALUES (?, ?, ?)",
+        ((rng.randint(1, JOBS), rng.randrange(CANDIDATES), i) for i in range(APPLICATIONS)),
+    )
+    db.execute(
+        "UPDATE job SET application_count = "
+        "(SELECT COUNT(*) FROM application WHERE job_id = job.id)"
+    )
+    db.commit()
+    db.close()
+
+
+def connect(path, profile):
+    # autocommit; transactions are begun explicitly below
+    db = sqlite3.connect(path, timeout=5, isolation_level=None)
+    if profile == "tuned":
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            db.execute(f"PRAGMA {name}={value}")
+    return db
+
+
+def apply(db, begin, rng):
+    db.execute(begin)
+    try:
+        job_id = rng.randint(1, JOBS)
+        db.execute("SELECT id FROM job WHERE id = ?", (job_id,)).fetchone()
+        db.execute(
+            "INSERT INTO application (job_id, candidate_id, applied_at) VALUES (?, ?, ?)",
+            (job_id, rng.randrange(CANDIDATES), time.time()),
+        )
+        db.execute(
+            "UPDATE job SET application_count = application_count + 1 WHERE id = ?", (job_id,)
+        )
+        db.execute("COMMIT")
+    except BaseException:
+        db.execute("ROLLBACK")
+        raise
+
+
+def browse(db, rng):
+    start = rng.randint(1, JOBS)
+    db.execute(
+        "SELECT id, position, application_count FROM job WHERE id <= ? ORDER BY id DESC LIMIT 20",
+        (start,),
+    ).fetchall()
+    db.execute(
+        "SELECT id, applied_at FROM application WHERE job_id = ? ORDER BY applied_at DESC LIMIT 20",
+        (start,),
+    ).fetchall()
+
+
+def work(path, profile, seconds, write_share, worker, results):
+    # seeded apart from seed() so the candidates do not repeat
+    rng = random.Random(worker + 1)
+    db = connect(path, profile)
+    begin = "BEGIN IMMEDIATE" if profile == "tuned" else "BEGIN"
+    latencies, locked = [], 0
+    deadline = time.perf_counter() + seconds
+    try:
+        while (started := time.perf_counter()) < deadline:
+            try:
+                if rng.random() < write_share:
+                    apply(db, begin, rng)
+                else:
+                    browse(db, rng)
+            except sqlite3.IntegrityError:
+                # a duplicate application, answered like any other request
+                pass
+            except sqlite3.OperationalError as error:
+                if "locked" not in str(error):
+                    raise
+                locked += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+    finally:
+        # the parent waits for every worker's results
+        db.close()
+        results.put((latencies, locked))
+
+
+def measure(template, directory, profile, workers, seconds, write_share):
+    path = os.path.join(directory, f"{profile}-{workers}.sqlite3")
+    shutil.copy(template, path)
+    results = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(
+            target=work, args=(path, profile, seconds, write_share, index, results)
+        )
+        for index in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    latencies, locked = [], 0
+    for _ in processes:
+        worker_latencies, worker_locked = results.get()
+        latencies.extend(worker_latencies)
+        locked += worker_locked
+    for process in processes:
+        process.join()
+
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95)] * 1000 if latencies else float("nan")
+    print(
+        f"{profile:>7} {workers:>3} workers: {len(latencies) / seconds:9.0f} ops/s "
+        f"p50={statistics.median(latencies) * 1000 if latencies else float('nan'):6.2f}ms "
+        f"p95={p95:7.2f}ms locked={locked}"
+    )
+
+
+def run(*args):
+    max_workers = int(args[0]) if args else 16
+    seconds = float(args[1]) if len(args) > 1 else 5
+    write_share = float(args[2]) if len(args) > 2 else 0.2
+
+    with tempfile.TemporaryDirectory() as directory:
+        template = os.path.join(directory, "template.sqlite3")
+        seed(template)
+        workers = 1
+        while workers <= max_workers:
+            for profile in ("default", "tuned"):
+                measure(template, directory, profile, workers, seconds, write_share)
+            workers *= 4
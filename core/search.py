@@ -0,0 +1,172 @@
+"""Full-text search over jobs.
+
+On SQLite the index is an FTS5 virtual table keyed by job id, holding the
+position, description and space separated skill names of every job. The
+signals in core.signals keep it in sync with Job and Job.requirements.
+Other database backends fall back to plain ``icontains`` filtering.
+"""
+import re
+from itertools import islice
+
+from django.db import connection
+from django.db.models import Q
+
+FTS_TABLE = 'core_job_fts'
+
+CREATE_INDEX_SQL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+    "USING fts5(position, description, skills, prefix='2 3')"
+)
+DROP_INDEX_SQL = f"DROP TABLE IF EXISTS {FTS_TABLE}"
+
+# position matches weigh most, then skills, then description
+RANK = f"bm25({FTS_TABLE}, 10.0, 1.0, 5.0)"
+
+# keeps each statement below SQLite's bound parameter limit
+CHUNK_SIZE = 500
+
+TOKEN_RE = re.compile(r'\w+')
+
+
+def is_supported(using=connection):
+    return using.vendor == 'sqlite'
+
+
+def build_match_expression(query):
+    """Turns free text into an FTS5 query.
+
+    Every word has to match either the position or description, or be the
+    prefix of a skill name.
+    """
+    terms = []
+    for token in TOKEN_RE.findall(query.lower()):
+        terms.append(f'({{position description}}: "{token}" OR skills: "{token}"*)')
+    return ' AND '.join(terms)
+
+
+def build_search_sql(is_active=None, min_salary=None, max_salary=None):
+    """Returns the ranked search statement and the order of its filter params."""
+    where = [f"{FTS_TABLE} MATCH %s"]
+    params = []
+    if is_active is not None:
+        where.append("job.is_active = %s")
+        params.append('is_active')
+    if min_salary is not None:
+        where.append("job.salary >= %s")
+        params.append('min_salary')
+    if max_salary is not None:
+        where.append("job.salary <= %s")
+        params.append('max_salary')
+    sql = (
+        f"SELECT {FTS_TABLE}.rowid FROM {FTS_TABLE} "
+        f"JOIN core_job job ON job.id = {FTS_TABLE}.rowid "
+        f"WHERE {' AND '.join(where)} ORDER BY {RANK} LIMIT %s"
+    )
+    return sql, params
+
+
+def search_job_ids(query, is_active=None, min_salary=None, max_salary=None, limit=20):
+    """Returns ids of the best matching jobs, best match first."""
+    expression = build_match_expression(query)
+    if not expression:
+        return []
+
+    filters = {'is_active': is_active, 'min_salary': min_salary, 'max_salary': max_salary}
+    if not is_supported():
+        return _fallback_search(query, filters, limit)
+
+    sql, names = build_search_sql(is_active, min_salary, max_salary)
+    # salaries are stored as NUMERIC, so decimals bind as text and compare as numbers
+    params = [expression] + [
+        filters[name] if name == 'is_active' else str(filters[name]) for name in names
+    ] + [limit]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _fallback_search(query, filters, limit):
+    from .models import Job
+
+    queryset = Job.objects.all()
+    for token in TOKEN_RE.findall(query):
+        queryset = queryset.filter(
+            Q(position__icontains=token)
+            | Q(description__icontains=token)
+            | Q(requirements__name__istartswith=token)
+        )
+    if filters['is_active'] is not None:
+        queryset = queryset.filter(is_active=filters['is_active'])
+    if filters['min_salary'] is not None:
+        queryset = queryset.filter(salary__gte=filters['min_salary'])
+    if filters['max_salary'] is not None:
+        queryset = queryset.filter(salary__lte=filters['max_salary'])
+    return list(queryset.values_list('id', flat=True).distinct()[:limit])
+
+
+def _chunks(ids):
+    ids = iter(ids)
+    while chunk := list(islice(ids, CHUNK_SIZE)):
+        yield chunk
+
+
+def index_jobs(job_ids):
+    """(Re)indexes the given jobs, dropping ids that no longer exist."""
+    if not is_supported():
+        return
+    from .models import Job
+
+    Through = Job.requirements.through
+    for chunk in _chunks(job_ids):
+        skills = {}
+        for job_id, name in Through.objects.filter(job_id__in=chunk).values_list(
+            'job_id', 'skill__name'
+        ):
+            skills.setdefault(job_id, []).append(name)
+        rows = [
+            (job_id, position, description or '', ' '.join(skills.get(job_id, ())))
+            for job_id, position, description in Job.objects.filter(id__in=chunk).values_list(
+                'id', 'position', 'description'
+            )
+        ]
+        with connection.cursor() as cursor:
+            placeholders = ', '.join(['%s'] * len(chunk))
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})", chunk)
+        if rows:
+            add_documents(rows)
+
+
+def add_documents(rows):
+    """Indexes new jobs from (id, position, description, skills) rows.
+
+    For bulk inserts that already hold the indexed text; the ids must not
+    be in the index yet.
+    """
+    if not is_supported():
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"INSERT INTO {FTS_TABLE} (rowid, position, description, skills) "
+            "VALUES (%s, %s, %s, %s)",
+            rows,
+        )
+
+
+def remove_jobs(job_ids):
+    if not is_supported():
+        return
+    with connection.cursor() as cursor:
+        for chunk in _chunks(job_ids):
+            placeholders = ', '.join(['%s'] * len(chunk))
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})", chunk)
+
+
+def rebuild_index():
+    """Drops and repopulates the whole index."""
+    if not is_supported():
+        return
+    from .models import Job
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE}")
+    index_jobs(Job.objects.values_list('id', flat=True).iterator())
@@ -1,6 +1,13 @@
+import copy
+
 from rest_framework import serializers
 from .models import Skill,Job,Application,CompanyProfile
+from .skills import clean_skill_name, resolve_skill_ids
 from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import Value
+from django.db.models.functions import Lower
+from django.utils.encoding import smart_str
 
 from django.contrib.auth import get_user_model
 
@@ -13,15 +20,169 @@ class SkillSerializer(serializers.ModelSerializer):
         fields = ['name']
         
 
+class SkillNameField(serializers.SlugRelatedField):
+    """Refers to an existing skill by name, ignoring case and extra whitespace."""
+    def __init__(self, **kwargs):
+        kwargs.setdefault('queryset', Skill.objects.all())
+        super().__init__(slug_field='name', **kwargs)
+        
+    def to_internal_value(self, data):
+        if not isinstance(data, str):
+            return super().to_internal_value(data)
+        skill = self.get_queryset().annotate(key=Lower('name')).filter(
+            key=Lower(Value(clean_skill_name(data)))
+        ).first()
+        if skill is None:
+            self.fail('does_not_exist', slug_name=self.slug_field, value=smart_str(data))
+        return skill
+
+
+class JobRowListSerializer(serializers.ListSerializer):
+    """Serializes a list of jobs, fast when they are values() rows.
+
+    Model instances go through the child serializer one by one as usual.
+    For rows from JobListSerializer.values() the fields are compiled once
+    into (output name, column, conversion) steps and each row becomes a
+    plain dict; the skills of the whole list are read in one query. The
+    output is the same either way.
+    """
+    # child serializer class -> (columns, steps)
+    plans = {}
+    
+    @classmethod
+    def get_plan(cls, serializer_class):
+        if serializer_class not in cls.plans:
+            cls.plans[serializer_class] = cls.compile(serializer_class())
+        return cls.plans[serializer_class]
+    
+    @staticmethod
+    def compile(serializer):
+        meta = serializer.Meta
+        columns, steps = ['id'], []
+        for name, field in serializer.fields.items():
+            if field.source == 'requirements':
+                # nested skill names, or the skill ids
+                steps.append((name, None, isinstance(field, serializers.ListSerializer)))
+                continue
+            source = getattr(meta, 'column_sources', {}).get(field.source, field.source)
+            column = meta.model._meta.get_field(source).attname
+            if isinstance(field, serializers.PrimaryKeyRelatedField):
+                convert = field.pk_field.to_representation if field.pk_field is not None else None
+            elif type(field) in (serializers.IntegerField, serializers.BooleanField, serializers.CharField):
+                # the database already returns ints, bools and strs
+                convert = None
+            else:
+                convert = field.to_representation
+            if column not in columns:
+                columns.append(column)
+            steps.append((name, column, convert))
+        return columns, steps
+    
+    @staticmethod
+    def pin_timezone(convert):
+        """A datetime field's conversion with the current timezone looked up once, not per value."""
+        field = getattr(convert, '__self__', None)
+        if not isinstance(field, serializers.DateTimeField) or hasattr(field, 'timezone'):
+            return convert
+        field = copy.copy(field)
+        field.timezone = field.default_timezone()
+        return field.to_representation
+    
+    def to_representation(self, data):
+        if not (isinstance(data, list) and data and isinstance(data[0], dict)):
+            return super().to_representation(data)
+        
+        _, steps = self.get_plan(type(self.child))
+        steps = [(name, column, self.pin_timezone(convert)) for name, column, convert in steps]
+        names, ids = {row['id']: [] for row in data}, {row['id']: [] for row in data}
+        for job_id, skill_id, name in Job.requirements.through.objects.filter(
+            job_id__in=list(names)
+        ).order_by('skill__name').values_list('job_id', 'skill_id', 'skill__name'):
+            names[job_id].append({'name': name})
+            ids[job_id].append(skill_id)
+        
+        items = []
+        for row in data:
+            item = {}
+            for name, column, convert in steps:
+                if column is None:
+                    item[name] = (names if convert else ids)[row['id']]
+                    continue
+                value = row[column]
+                # like Serializer.to_representation, None is never converted
+                item[name] = value if value is None or convert is None else convert(value)
+            items.append(item)
+        return items
+
+
 class JobListSerializer(serializers.ModelSerializer):
     """Lists jobs."""
-    skills = SkillSerializer(many = True, read_only = True)
-    fields = '__all__'
+    skills = SkillSerializer(source='requirements', many = True, read_only = True)
+    application_count = serializers.IntegerField(source='num_applications', read_only=True)
+    
+    class Meta:
+        model = Job
+        fields = '__all__'
+        list_serializer_class = JobRowListSerializer
+        # model methods used as sources, and the columns they return
+        column_sources = {'num_applications': 'application_count'}
+        
     def get_fields(self):
         fields = super().get_fields()
         for field in fields.values():
             field.read_only = True
         return fields
+    
+    @classmethod
+    def values(cls, queryset):
+        """The queryset as rows JobRowListSerializer serializes without model instances."""
+        columns, _ = JobRowListSerializer.get_plan(cls)
+        return queryset.values(*columns)
+
+
+class JobSearchSerializer(serializers.Serializer):
+    """Validates job search query parameters."""
+    q = serializers.CharField(source='query', max_length=200)
+    is_active = serializers.BooleanField(required=False, allow_null=True, default=None)
+    min_salary = serializers.DecimalField(max_digits=10, decimal_places=2, required=False, default=None)
+    max_salary = serializers.DecimalField(max_digits=10, decimal_places=2, required=False, default=None)
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=20)
+
+
+class JobListQuerySerializer(serializers.Serializer):
+    """Validates job list query parameters."""
+    ordering = serializers.ChoiceField(choices=['newest', 'popular'], default='newest')
+    min_applications = serializers.IntegerField(min_value=0, required=False)
+
+
+class ExportQuerySerializer(serializers.Serializer):
+    """Validates export query parameters."""
+    output = serializers.ChoiceField(choices=['ndjson', 'csv'], default='ndjson')
+    since = serializers.DateTimeField(required=False)
+
+
+class ChangeFeedQuerySerializer(serializers.Serializer):
+    """Validates change feed query parameters."""
+    cursor = serializers.CharField(required=False)
+    # an export watermark to start from, when there is no cursor yet
+    since = serializers.DateTimeField(required=False)
+    page_size = serializers.IntegerField(min_value=1, max_value=1000, default=100)
+
+
+class JobMatchSerializer(serializers.Serializer):
+    """Validates job match query parameters."""
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=20)
+
+
+class ApplicantMatchSerializer(serializers.Serializer):
+    """Validates applicant match query parameters."""
+    min_score = serializers.IntegerField(min_value=0, default=0)
+    limit = serializers.IntegerField(min_value=1, max_value=500, default=50)
+
+
+class InboxQuerySerializer(serializers.Serializer):
+    """Validates applicant inbox query parameters."""
+    job = serializers.IntegerField(min_value=1, required=False)
 
 
 class JobCreateSerializer(serializers.ModelSerializer):
@@ -51,12 +212,7 @@ class JobCreateSerializer(serializers.ModelSerializer):
         )
         
 
-        skill_objects = []
-        for skill_name in skill_names:
-            skill, _ = Skill.objects.get_or_create(name=skill_name.strip())
-            skill_objects.append(skill)
-        
-        job.requirements.set(skill_objects)
+        job.requirements.set(resolve_skill_ids(skill_names))
         return job
     
     def update(self, instance, validated_data):
@@ -65,7 +221,7 @@ class JobCreateSerializer(serializers.ModelSerializer):
         if user.role != User.RoleChoice.EMP:
             raise ValidationError('Only employers can update jobs.')
         
-        if instance.employer != user:
+        if instance.employer_id != user.pk:
             raise ValidationError('You are not authorized to perform the action!')
         
         skill_names = validated_data.pop('skills', None)
@@ -76,11 +232,7 @@ class JobCreateSerializer(serializers.ModelSerializer):
         instance.save()
         
         if skill_names is not None:
-            skill_objects = []
-            for skill_name in skill_names:
-                skill, _ = Skill.objects.get_or_create(name=skill_name.strip())
-                skill_objects.append(skill)
-            instance.requirements.set(skill_objects)
+            instance.requirements.set(resolve_skill_ids(skill_names))
         
         return instance
     
@@ -104,22 +256,25 @@ class ApplicationSerializer(serializers.ModelSerializer):
         if user.role != User.RoleChoice.CAN:
             raise ValidationError('Only candidates can submit job applications.')
         
-        job = validated_data['job']
-        
-        # Check if the user has already applied to this job
-        if Application.objects.filter(job=job, candidate=user).exists():
-            raise ValidationError("You have already applied to this job.")
-        
-        application = Application.objects.create(
-            candidate=user,
-            **validated_data
-        )
+        # unique_application rejects a second application to the same job;
+        # the job's application_count is bumped in the same transaction
+        try:
+            with transaction.atomic():
+                application = Application.objects.create(
+                    candidate=user,
+                    **validated_data
+                )
+        except IntegrityError as error:
+            # any other constraint failing is a bug, not a duplicate
+            if not Application.objects.filter(candidate=user, job=validated_data['job']).exists():
+                raise
+            raise serializers.ValidationError("You have already applied to this job.") from error
         return application
     
     def update(self, instance, validated_data):
         user = self.context['request'].user
 
-        if instance.candidate != user:
+        if instance.candidate_id != user.pk:
             raise ValidationError("You are not authorized to perform this action.")
         
         if user.role != User.RoleChoice.CAN:
@@ -136,3 +291,18 @@ class ApplicationSerializer(serializers.ModelSerializer):
         return instance
 
 
+
+
+class InboxApplicationSerializer(serializers.ModelSerializer):
+    """An application as its employer sees it in the inbox."""
+    job_position = serializers.CharField(source='job.position', read_only=True)
+    candidate_username = serializers.CharField(source='candidate.username', read_only=True)
+    candidate_email = serializers.EmailField(source='candidate.email', read_only=True)
+
+    class Meta:
+        model = Application
+        fields = [
+            'id', 'job', 'job_position', 'candidate', 'candidate_username',
+            'candidate_email', 'cover_letter', 'applied_at',
+        ]
+        read_only_fields = fields
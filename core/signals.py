@@ -0,0 +1,125 @@
+from django.db.models import QuerySet
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import caching, changes, counters, extraction, matching, search
+from .models import Application, Job, Skill, User
+
+
+@receiver(post_save, sender=Job)
+def index_saved_job(sender, instance, **kwargs):
+    search.index_jobs([instance.pk])
+    matching.refresh_jobs([instance.pk])
+    caching.invalidate_jobs([instance.pk])
+
+
+@receiver(post_delete, sender=Job)
+def unindex_deleted_job(sender, instance, **kwargs):
+    search.remove_jobs([instance.pk])
+    matching.remove_jobs([instance.pk])
+    caching.invalidate_jobs([instance.pk])
+
+
+@receiver(post_delete, sender=Job)
+def bury_deleted_job(sender, instance, **kwargs):
+    changes.record_deletes([instance.pk])
+
+
+def touch_jobs(job_ids):
+    """Moves updated_at of jobs whose requirements changed, for the match index and change feed."""
+    if job_ids:
+        Job.objects.filter(pk__in=job_ids).update(updated_at=timezone.now())
+
+
+@receiver(m2m_changed, sender=Job.requirements.through)
+def index_job_requirements(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        job_ids = [instance.pk]
+    elif pk_set:
+        job_ids = pk_set
+    else:
+        # skill.job_set.clear() does not report which jobs lost the skill
+        job_ids = getattr(instance, '_search_job_ids', ())
+    touch_jobs(job_ids)
+    search.index_jobs(job_ids)
+    matching.refresh_jobs(job_ids)
+    caching.invalidate_jobs(job_ids)
+
+
+@receiver(m2m_changed, sender=Job.requirements.through)
+def remember_cleared_jobs(sender, instance, action, reverse, **kwargs):
+    if action == 'pre_clear' and reverse:
+        instance._search_job_ids = list(instance.job_set.values_list('id', flat=True))
+
+
+@receiver(post_save, sender=Skill)
+def index_renamed_skill(sender, instance, created, **kwargs):
+    if not created:
+        job_ids = list(instance.job_set.values_list('id', flat=True))
+        search.index_jobs(job_ids)
+        caching.invalidate_jobs(job_ids)
+
+
+@receiver(pre_delete, sender=Skill)
+def remember_skill_jobs(sender, instance, **kwargs):
+    instance._search_job_ids = list(instance.job_set.values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=Skill)
+def index_deleted_skill(sender, instance, **kwargs):
+    job_ids = getattr(instance, '_search_job_ids', ())
+    touch_jobs(job_ids)
+    search.index_jobs(job_ids)
+    matching.refresh_jobs(job_ids)
+    caching.invalidate_jobs(job_ids)
+
+
+@receiver(post_save, sender=Application)
+def count_new_application(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.adjust(instance.job_id, 1)
+        # job responses carry the application count
+        caching.invalidate_jobs([instance.job_id])
+
+
+def deleted_with(origin, *models):
+    """Whether a delete that started at origin (an instance or queryset) is one of models."""
+    model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return issubclass(model, models)
+
+
+@receiver(post_delete, sender=Application)
+def uncount_deleted_application(sender, instance, origin=None, **kwargs):
+    # the job goes too, or uncount_candidate_applications did it in one go
+    if deleted_with(origin, Job, User):
+        return
+    counters.adjust(instance.job_id, -1)
+    caching.invalidate_jobs([instance.job_id])
+
+
+@receiver(pre_delete, sender=User)
+def uncount_candidate_applications(sender, instance, **kwargs):
+    # jobs of a deleted employer are deleted with their applications
+    job_ids = list(
+        Application.objects.filter(candidate=instance).exclude(job__employer=instance)
+        .values_list('job_id', flat=True)
+    )
+    if job_ids:
+        # a candidate applies to a job once, so each job loses one
+        counters.adjust_many(job_ids, -1)
+        caching.invalidate_jobs(job_ids)
+
+
+@receiver(post_save, sender=User)
+def queue_resume_extraction(sender, instance, created, raw=False, **kwargs):
+    if raw or 'resume' not in instance.__dict__:
+        return
+    resume = instance.resume.name or ''
+    # users loaded without the resume column have nothing to compare
+    loaded = '' if created else getattr(instance, '_loaded_resume', resume)
+    if resume != loaded:
+        extraction.enqueue(instance.pk, resume)
+        instance._loaded_resume = resume
@@ -0,0 +1,66 @@
+"""Resolves skill names to Skill ids.
+
+Skills keep the name they were first created with ("AWS", "Machine
+Learning"), with runs of whitespace collapsed. Lookups ignore case:
+"aws " finds "AWS", and the skill_name_ci_unique constraint on
+Lower('name') keeps case variants from being created. Names are fetched
+with one query on that index, and whatever is still missing is bulk
+inserted and read back. The query count does not depend on how many names
+are resolved.
+"""
+from django.db.models import Q
+from django.db.models.functions import Lower
+
+from .models import Skill
+
+
+def clean_skill_name(name):
+    """The name a new skill is stored under."""
+    return ' '.join(name.split())
+
+
+def normalize_skill_name(name):
+    """The case-insensitive key skills are looked up by."""
+    return clean_skill_name(name).lower()
+
+
+def distinct_skill_names(names):
+    """Cleaned names with blanks and case variants dropped, first spelling first."""
+    cleaned = {}
+    for name in map(clean_skill_name, names):
+        if name:
+            cleaned.setdefault(name.lower(), name)
+    return list(cleaned.values())
+
+
+def skill_ids_by_key(names):
+    """Maps the keys of the given names to the ids of the skills that exist."""
+    rows = Skill.objects.annotate(key=Lower('name')).filter(
+        # exact names catch keys the database lowers differently (non-ASCII on SQLite)
+        Q(key__in=[normalize_skill_name(name) for name in names]) | Q(name__in=names)
+    ).values_list('name', 'id')
+    return {normalize_skill_name(name): skill_id for name, skill_id in rows}
+
+
+def resolve_skills(names):
+    """Maps each distinct normalized name to its skill id, creating missing skills.
+
+    Blank names are dropped; the mapping keeps input order, and a new
+    skill is created with the first spelling of its name.
+    """
+    names = distinct_skill_names(names)
+    ids = skill_ids_by_key(names) if names else {}
+    absent = [name for name in names if normalize_skill_name(name) not in ids]
+    if absent:
+        # a concurrent request may insert the same names; conflicts are skipped
+        Skill.objects.bulk_create([Skill(name=name) for name in absent], ignore_conflicts=True)
+        ids.update(skill_ids_by_key(absent))
+    return {key: ids[key] for key in map(normalize_skill_name, names)}
+
+
+def resolve_skill_ids(names):
+    """Returns the ids of the given skills in input order, creating missing ones.
+
+    Duplicate and blank names are dropped.
+    """
+    return list(resolve_skills(names).values())
@@ -1,3 +1,1506 @@
-from django.test import TestCase
+import csv
+import gzip
+import json
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
 
-# Create your tests here.
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.base import ContentFile
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection, connections, router, transaction
+from django.db.models import Sum
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.contrib.auth import get_user_model
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from . import caching, changes, export, extraction, inbox, replicas
+from .benchmark import BenchmarkError, compare_results, run_benchmarks
+from .caching import get_cache
+from .importer import JobImporter, iter_feed
+from .matching import SkillMatchIndex, match_index
+from .metrics import RequestMetrics, fingerprint, registry
+from .models import Job, JobTombstone, Skill, Application, IdempotencyKey, ResumeExtraction
+from .search import search_job_ids
+from .serializers import JobListSerializer
+from .skills import resolve_skill_ids
+from .views import accepts_gzip, with_listing_fields
+
+
+def create_employer(email='employer@example.com'):
+    return get_user_model().objects.create_user(
+        email=email,
+        password='testpass123',
+        role='EMP',
+        company='Test Company',
+    )
+
+
+def create_candidate(email='candidate@example.com'):
+    return get_user_model().objects.create_user(
+        email=email,
+        password='testpass123',
+        role='CAN',
+        resume='uploads/resume.pdf',
+    )
+
+
+def create_jobs(employer, count, skills=(), **extra):
+    """Bulk creates active jobs, each requiring all of the given skills."""
+    jobs = Job.objects.bulk_create(
+        Job(position=f'Job {i}', employer=employer, is_active=True, **extra)
+        for i in range(count)
+    )
+    Through = Job.requirements.through
+    Through.objects.bulk_create(
+        Through(job_id=job.id, skill_id=skill.id)
+        for job in jobs for skill in skills
+    )
+    return jobs
+
+
+class JobListQueryTests(TestCase):
+    """Test the query cost of job list and retrieve."""
+
+    def setUp(self):
+        get_cache().clear()
+        self.client = APIClient()
+        self.employer = create_employer()
+        self.skills = [Skill.objects.create(name=name) for name in ('Python', 'Django', 'SQL')]
+
+    def assertListQueries(self, num):
+        # measure the uncached path
+        get_cache().clear()
+        with self.assertNumQueries(num):
+            response = self.client.get(reverse('job-list'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_list_query_count_is_constant(self):
+        """Test listing 10 and 1,000 jobs costs the same number of queries."""
+        create_jobs(self.employer, 10, self.skills)
+        self.assertListQueries(2)
+
+        create_jobs(self.employer, 990, self.skills)
+        self.assertListQueries(2)
+
+    def test_list_includes_skills_and_application_count(self):
+        """Test list output carries skill names and annotated application count."""
+        job, = create_jobs(self.employer, 1, self.skills)
+        Application.objects.create(job=job, candidate=create_candidate())
+
+        response = self.client.get(reverse('job-detail', args=[job.id]))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [skill['name'] for skill in response.data['skills']],
+            ['Django', 'Python', 'SQL'],
+        )
+        self.assertEqual(response.data['application_count'], 1)
+
+
+class JobPaginationTests(TestCase):
+    """Test keyset pagination of job listings."""
+
+    def setUp(self):
+        get_cache().clear()
+        self.client = APIClient()
+        self.employer = create_employer()
+        self.jobs = create_jobs(self.employer, 45)
+
+    def test_pages_cover_every_job_once_newest_first(self):
+        """Test walking next links returns every job once in (created_at, id) order."""
+        url, seen = reverse('job-list'), []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen.extend(job['id'] for job in response.data['results'])
+            url = response.data['next']
+
+        expected = Job.objects.order_by('-created_at', '-id').values_list('id', flat=True)
+        self.assertEqual(seen, list(expected))
+
+    def test_previous_link_returns_prior_page(self):
+        """Test the previous link of page two returns page one."""
+        first = self.client.get(reverse('job-list')).data
+        second = self.client.get(first['next']).data
+
+        back = self.client.get(second['previous']).data
+
+        self.assertEqual(back['results'], first['results'])
+        self.assertIsNone(first['previous'])
+
+    def test_deep_page_query_count(self):
+        """Test a deep page costs the same queries as the first page."""
+        url = reverse('job-list')
+        for _ in range(2):
+            url = self.client.get(url).data['next']
+
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertEqual(len(response.data['results']), 5)
+
+    def test_invalid_cursor(self):
+        """Test a malformed cursor returns 404."""
+        response = self.client.get(reverse('job-list'), {'cursor': 'garbage'})
+        self.assertEqual(response.status_code, 404)
+
+
+class JobSearchTests(TestCase):
+    """Test full-text job search."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.employer = create_employer()
+        self.python = Skill.objects.create(name='Python')
+        self.react = Skill.objects.create(name='React')
+
+    def create_job(self, position, skills=(), **extra):
+        job = Job.objects.create(position=position, employer=self.employer, is_active=True, **extra)
+        job.requirements.set(skills)
+        return job
+
+    def search(self, **params):
+        response = self.client.get(reverse('job-search'), params)
+        self.assertEqual(response.status_code, 200)
+        return [job['id'] for job in response.data]
+
+    def test_ranks_position_matches_first(self):
+        """Test a match in the position outranks a match in the description."""
+        described = self.create_job('Engineer', description='Backend work on Django')
+        titled = self.create_job('Django Developer')
+
+        self.assertEqual(self.search(q='django'), [titled.id, described.id])
+
+    def test_prefix_matches_skill_names(self):
+        """Test a skill name prefix finds jobs requiring that skill."""
+        job = self.create_job('Engineer', [self.python])
+        self.create_job('Designer', [self.react])
+
+        self.assertEqual(self.search(q='pyth'), [job.id])
+
+    def test_index_follows_skill_changes(self):
+        """Test changing a job's skills updates the index."""
+        job = self.create_job('Engineer', [self.python])
+        job.requirements.set([self.react])
+
+        self.assertEqual(self.search(q='pyth'), [])
+        self.assertEqual(self.search(q='react'), [job.id])
+
+    def test_filters_active_and_salary(self):
+        """Test is_active and salary range filters."""
+        cheap = self.create_job('Python Developer', salary=40000)
+        rich = self.create_job('Python Developer', salary=90000)
+        inactive = self.create_job('Python Developer', salary=90000)
+        inactive.is_active = False
+        inactive.save()
+
+        self.assertEqual(sorted(self.search(q='python')), sorted([cheap.id, rich.id, inactive.id]))
+        self.assertEqual(self.search(q='python', is_active='true', min_salary='50000'), [rich.id])
+        self.assertEqual(self.search(q='python', max_salary='50000'), [cheap.id])
+
+    def test_deleted_jobs_leave_the_index(self):
+        """Test deleting a job removes it from results."""
+        job = self.create_job('Python Developer')
+        job.delete()
+
+        self.assertEqual(self.search(q='python'), [])
+
+    def test_query_is_required(self):
+        """Test searching without q returns 400."""
+        response = self.client.get(reverse('job-search'))
+        self.assertEqual(response.status_code, 400)
+
+
+class SkillMatchIndexTests(SimpleTestCase):
+    """Test the skill bitset match index."""
+
+    def setUp(self):
+        self.index = SkillMatchIndex()
+        self.index.load([(1, 10), (1, 11), (1, 12), (2, 10), (3, 12), (3, 13)])
+
+    def test_ranks_by_overlap(self):
+        """Test jobs are ranked by the number of shared skills."""
+        self.assertEqual(self.index.top_k([10, 11, 12]), [(1, 3), (3, 1), (2, 1)])
+
+    def test_top_k_limits_results(self):
+        """Test only k results come back."""
+        self.assertEqual(self.index.top_k([10, 12], k=1), [(1, 2)])
+
+    def test_set_job_updates_incrementally(self):
+        """Test changing and removing a job's skills updates scores."""
+        self.index.set_job(2, [11, 12, 13])
+        self.index.remove_job(1)
+        self.index.set_job(4, [13])
+
+        results = self.index.top_k([11, 13])
+        self.assertEqual(results[0], (2, 2))
+        self.assertCountEqual(results[1:], [(4, 1), (3, 1)])
+        self.assertNotIn(1, self.index.slot_of)
+
+    def test_unknown_skills_score_nothing(self):
+        """Test skills no job requires give no matches."""
+        self.assertEqual(self.index.top_k([99]), [])
+
+
+class JobMatchViewTests(TestCase):
+    """Test the job matches endpoint."""
+
+    def setUp(self):
+        match_index.clear()
+        self.client = APIClient()
+        self.employer = create_employer()
+        self.candidate = create_candidate()
+        self.python, self.django, self.sql = (
+            Skill.objects.create(name=name) for name in ('Python', 'Django', 'SQL')
+        )
+        self.candidate.skills.set([self.python, self.django])
+        self.client.force_authenticate(self.candidate)
+
+    def matches(self):
+        response = self.client.get(reverse('job-matches'))
+        self.assertEqual(response.status_code, 200)
+        return [(job['id'], job['match_score']) for job in response.data]
+
+    def test_matches_follow_job_changes(self):
+        """Test the index picks up skill and status changes made through the API."""
+        best, = create_jobs(self.employer, 1, [self.python, self.django])
+        other, = create_jobs(self.employer, 1, [self.sql])
+        self.assertEqual(self.matches(), [(best.id, 2)])
+
+        employer_client = APIClient()
+        employer_client.force_authenticate(self.employer)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = employer_client.patch(
+                reverse('job-detail', args=[other.id]),
+                {'skills': ['Python', 'Django', 'SQL']},
+                format='json',
+            )
+        self.assertEqual(response.status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            best.is_active = False
+            best.save()
+
+        self.assertEqual(self.matches(), [(other.id, 2)])
+
+    def test_matches_follow_other_processes(self):
+        """Test changes written without this process's signals reach the index on the next sync."""
+        best, other = create_jobs(self.employer, 2, [self.sql])
+        self.assertEqual(self.matches(), [])
+
+        # queryset writes send no signals, like writes made by another worker
+        Job.requirements.through.objects.bulk_create([
+            Job.requirements.through(job_id=best.id, skill_id=self.python.id),
+            Job.requirements.through(job_id=best.id, skill_id=self.django.id),
+        ])
+        Job.objects.filter(pk=best.pk).update(updated_at=timezone.now())
+        self.assertEqual(self.matches(), [(best.id, 2)])
+
+        Job.objects.filter(pk=best.pk).update(is_active=False, updated_at=timezone.now())
+        self.assertEqual(self.matches(), [])
+
+    def test_only_candidates(self):
+        """Test employers cannot request matches."""
+        self.client.force_authenticate(self.employer)
+        response = self.client.get(reverse('job-matches'))
+        self.assertEqual(response.status_code, 403)
+
+
+class SkillResolutionTests(TestCase):
+    """Test batch skill resolution for job create and update."""
+
+    def setUp(self):
+        self.employer = create_employer()
+        self.client = APIClient()
+        self.client.force_authenticate(self.employer)
+
+    def create_job(self, skills):
+        response = self.client.post(
+            reverse('job-list'),
+            {'position': 'Engineer', 'skills': skills},
+            format='json',
+        )
+        self.assertEqual(response.status_code, 201)
+        return Job.objects.get(pk=response.data['id'])
+
+    def test_normalizes_and_dedupes_names(self):
+        """Test names are stripped and matched ignoring case, keeping their display name."""
+        existing = Skill.objects.create(name='Python')
+
+        job = self.create_job([' python ', 'PYTHON', 'Machine   Learning', 'AWS', 'aws'])
+
+        self.assertEqual(
+            sorted(job.requirements.values_list('name', flat=True)),
+            ['AWS', 'Machine Learning', 'Python'],
+        )
+        self.assertTrue(job.requirements.filter(pk=existing.pk).exists())
+
+    def test_names_are_unique_ignoring_case(self):
+        """Test the database refuses a case variant of an existing skill."""
+        Skill.objects.create(name='AWS')
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Skill.objects.create(name='aws')
+
+    def test_create_query_count_is_constant(self):
+        """Test creating jobs with 3 or 30 new skills costs the same queries."""
+        with CaptureQueriesContext(connection) as few:
+            self.create_job([f'few {i}' for i in range(3)])
+        with CaptureQueriesContext(connection) as many:
+            self.create_job([f'many {i}' for i in range(30)])
+
+        self.assertEqual(len(few), len(many))
+
+    def test_known_names_take_one_query(self):
+        """Test resolving existing names runs a single lookup."""
+        ids = resolve_skill_ids(['Go', 'Rust'])
+
+        with self.assertNumQueries(1):
+            self.assertEqual(resolve_skill_ids(['go', 'RUST']), ids)
+
+    def test_deleted_skill_is_created_again(self):
+        """Test a deleted skill resolves to a new row, never to its old id."""
+        old_id, = resolve_skill_ids(['Go'])
+        Skill.objects.get(pk=old_id).delete()
+
+        new_id, = resolve_skill_ids(['Go'])
+        self.assertNotEqual(new_id, old_id)
+
+
+class JobImportTests(TestCase):
+    """Test bulk job import."""
+
+    def setUp(self):
+        self.employer = create_employer()
+        self.client = APIClient()
+        self.client.force_authenticate(self.employer)
+
+    def post_feed(self, body, content_type):
+        return self.client.generic('POST', reverse('job-import-jobs'), body, content_type)
+
+    def test_import_ndjson_reports_rejected_lines(self):
+        """Test valid NDJSON rows are created and invalid ones reported by line."""
+        body = '\n'.join([
+            json.dumps({'position': 'Backend', 'salary': '1000.50', 'is_active': True,
+                        'skills': ['Python', 'Django']}),
+            json.dumps({'description': 'no position'}),
+            '{not json',
+            '',
+            json.dumps({'position': 'Frontend', 'salary': -5}),
+            json.dumps({'position': 'Data', 'skills': ['python']}),
+        ])
+
+        response = self.post_feed(body, 'application/x-ndjson')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual(response.data['rejected'], 3)
+        self.assertEqual([error['line'] for error in response.data['errors']], [2, 3, 5])
+        self.assertIn('position', response.data['errors'][0]['errors'])
+        self.assertIn('salary', response.data['errors'][2]['errors'])
+
+        backend = Job.objects.get(position='Backend')
+        self.assertEqual(backend.employer, self.employer)
+        self.assertEqual(sorted(backend.requirements.values_list('name', flat=True)), ['Django', 'Python'])
+        self.assertEqual(Skill.objects.filter(name__iexact='python').count(), 1)
+        self.assertEqual(search_job_ids('django'), [backend.id])
+
+    def test_import_csv(self):
+        """Test CSV feeds with pipe separated skills."""
+        body = 'position,description,salary,skills\nBackend,APIs,100,Python|SQL\n,missing,,\n'
+
+        response = self.post_feed(body, 'text/csv')
+
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual(response.data['errors'][0]['line'], 3)
+        job = Job.objects.get()
+        self.assertEqual(job.description, 'APIs')
+        self.assertEqual(sorted(job.requirements.values_list('name', flat=True)), ['Python', 'SQL'])
+
+    def test_nothing_imported_is_a_bad_request(self):
+        """Test a feed whose rows are all rejected, or that is empty, returns 400 with the report."""
+        response = self.post_feed(json.dumps({'description': 'no position'}), 'application/x-ndjson')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual((response.data['created'], response.data['rejected']), (0, 1))
+        self.assertEqual(response.data['errors'][0]['line'], 1)
+
+        self.assertEqual(self.post_feed('', 'text/csv').status_code, 400)
+        self.assertFalse(Job.objects.exists())
+
+    def test_unsupported_content_type(self):
+        """Test a JSON body is refused."""
+        response = self.post_feed('[]', 'application/json')
+        self.assertEqual(response.status_code, 415)
+
+    def test_only_employers(self):
+        """Test candidates cannot import jobs."""
+        self.client.force_authenticate(create_candidate())
+        response = self.post_feed('', 'text/csv')
+        self.assertEqual(response.status_code, 403)
+
+    def test_import_command(self):
+        """Test the import_jobs management command reads a file in chunks."""
+        with tempfile.NamedTemporaryFile('w', suffix='.ndjson', delete=False) as feed:
+            for i in range(7):
+                feed.write(json.dumps({'position': f'Job {i}', 'skills': ['Go']}) + '\n')
+        self.addCleanup(os.remove, feed.name)
+
+        out = StringIO()
+        call_command('import_jobs', feed.name, employer=self.employer.email, chunk_size=3, stdout=out)
+
+        self.assertIn('Imported 7 jobs', out.getvalue())
+        self.assertEqual(Job.objects.filter(requirements__name='Go').count(), 7)
+
+
+class PopulateCommandTests(TestCase):
+    """Test the populate management command."""
+
+    def setUp(self):
+        # the sample candidates upload resumes
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=media_root.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def populate(self, *args, **options):
+        out = StringIO()
+        call_command('populate', *args, stdout=out, **options)
+        return out.getvalue()
+
+    def test_sample_data(self):
+        """Test running without options creates the fixed sample."""
+        self.populate()
+
+        self.assertEqual(Job.objects.count(), 2)
+        self.assertEqual(Application.objects.count(), 2)
+
+    def test_synthetic_data_is_reproducible(self):
+        """Test synthetic generation honours counts and the seed."""
+        options = {
+            'employers': 3, 'candidates': 20, 'jobs': 25,
+            'applications_per_job': 'uniform:1-4', 'batch_size': 10,
+        }
+        output = self.populate('--seed', '7', *[
+            f'--{name.replace("_", "-")}={value}' for name, value in options.items()
+        ])
+
+        self.assertIn('jobs: 25/25', output)
+        self.assertEqual(get_user_model().objects.filter(role='EMP').count(), 3)
+        self.assertEqual(get_user_model().objects.filter(role='CAN').count(), 20)
+        self.assertEqual(Job.objects.count(), 25)
+        applications = Application.objects.count()
+        self.assertTrue(25 <= applications <= 100)
+        self.assertEqual(Job.objects.aggregate(total=Sum('application_count'))['total'], applications)
+        self.assertTrue(get_user_model().objects.first().check_password('testpass123'))
+        job = Job.objects.first()
+        self.assertIn(job.id, search_job_ids(job.position, limit=100))
+
+        first = list(Job.objects.order_by('id').values_list('position', 'salary', 'employer__email'))
+        Application.objects.all().delete()
+        Job.objects.all().delete()
+        get_user_model().objects.all().delete()
+        self.populate('--seed', '7', *[
+            f'--{name.replace("_", "-")}={value}' for name, value in options.items()
+        ])
+        second = list(Job.objects.order_by('id').values_list('position', 'salary', 'employer__email'))
+        self.assertEqual(first, second)
+        self.assertEqual(Application.objects.count(), applications)
+
+    def test_seed_cannot_be_reused(self):
+        """Test generating twice with one seed fails."""
+        self.populate('--employers', '1')
+        with self.assertRaises(CommandError):
+            self.populate('--employers', '1')
+
+
+class BenchmarkTests(TestCase):
+    """Test the API benchmark harness."""
+
+    def setUp(self):
+        get_cache().clear()
+
+    def test_run_benchmarks(self):
+        """Test scenarios report latency, queries and allocations."""
+        create_jobs(create_employer(), 6)
+
+        results = run_benchmarks(
+            ['job_list', 'job_list_cached', 'job_detail', 'job_detail_cached',
+             'application_create', 'token_refresh'],
+            iterations=3, warmup=1, profile=1,
+        )
+
+        self.assertEqual(Application.objects.count(), 5)
+        for metrics in results.values():
+            self.assertEqual(metrics['iterations'], 3)
+            self.assertLessEqual(metrics['p50_ms'], metrics['p99_ms'])
+            self.assertGreater(metrics['alloc_peak_kib'], 0)
+        self.assertGreater(results['application_create']['queries'], 0)
+        # the uncached scenarios miss the response cache on every call
+        self.assertGreater(results['job_list']['queries'], 0)
+        self.assertGreater(results['job_detail']['queries'], 0)
+        self.assertEqual(results['job_list_cached']['queries'], 0)
+        self.assertEqual(results['job_detail_cached']['queries'], 0)
+
+    def test_application_create_needs_enough_jobs(self):
+        """Test a scenario that would run out of jobs fails up front."""
+        create_jobs(create_employer(), 2)
+        with self.assertRaises(BenchmarkError):
+            run_benchmarks(['application_create'], iterations=3, warmup=1, profile=1)
+
+    def test_compare_results(self):
+        """Test regressions past the threshold and any added query are reported."""
+        baseline = {'job_list': {'p95_ms': 10.0, 'p99_ms': 12.0, 'queries': 2, 'alloc_peak_kib': 100}}
+        results = {'job_list': {'p95_ms': 11.5, 'p99_ms': 20.0, 'queries': 3, 'alloc_peak_kib': 110}}
+
+        self.assertEqual(
+            compare_results(results, baseline, threshold=0.2),
+            ['job_list.p99_ms: 12.0 -> 20.0', 'job_list.queries: 2 -> 3'],
+        )
+        self.assertEqual(compare_results(baseline, baseline), [])
+
+
+class RequestMetricsTests(TestCase):
+    """Test the request metrics middleware and endpoint."""
+
+    def setUp(self):
+        get_cache().clear()
+        registry.reset()
+        self.addCleanup(registry.reset)
+
+    def test_fingerprint(self):
+        """Test literals and IN lists of any length share a fingerprint."""
+        self.assertEqual(
+            fingerprint("SELECT * FROM t WHERE id IN (%s, %s, %s) AND name = 'x' LIMIT 21"),
+            fingerprint("SELECT * FROM t WHERE id IN (%s)  AND name = 'y' LIMIT 5"),
+        )
+
+    def test_duplicates(self):
+        """Test statements repeated within a request are reported."""
+        record = RequestMetrics()
+        for job_id in (1, 2, 3):
+            record.execute(lambda *args: None, f'SELECT * FROM core_job WHERE id = {job_id}', None, False, {})
+        record.execute(lambda *args: None, 'SELECT 1', None, False, {})
+
+        self.assertEqual(record.queries, 4)
+        self.assertEqual(record.duplicates(), {'SELECT * FROM core_job WHERE id = ?': 3})
+
+    def test_request_is_recorded(self):
+        """Test responses land in the registry, with Server-Timing only for internal clients."""
+        create_jobs(create_employer(), 3)
+
+        self.assertNotIn('Server-Timing', APIClient(REMOTE_ADDR='10.0.0.1').get(reverse('job-list')))
+        response = APIClient(REMOTE_ADDR='127.0.0.1').get(reverse('job-list'))
+
+        self.assertIn('db;dur=', response['Server-Timing'])
+        self.assertIn('serializer;dur=', response['Server-Timing'])
+        stats = registry.snapshot()['views']['GET job-list']
+        self.assertEqual(stats['total_ms']['count'], 2)
+        self.assertGreater(stats['queries']['mean'], 0)
+        self.assertGreater(stats['serializer_ms']['mean'], 0)
+
+    def test_metrics_endpoint_is_admin_only(self):
+        """Test only staff users can read the histograms."""
+        client = APIClient(REMOTE_ADDR='10.0.0.1')
+        client.force_authenticate(user=create_employer())
+        self.assertEqual(client.get(reverse('metrics')).status_code, 403)
+
+        admin = get_user_model().objects.create_superuser(email='admin@example.com', password='testpass123')
+        client.force_authenticate(user=admin)
+        response = client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('GET metrics', response.data['views'])
+
+
+class JobResponseCacheTests(TestCase):
+    """Test the anonymous job response cache."""
+
+    def setUp(self):
+        get_cache().clear()
+        self.client = APIClient()
+        self.employer = create_employer()
+        self.job, = create_jobs(self.employer, 1, [Skill.objects.create(name='python')])
+        self.url = reverse('job-detail', args=[self.job.id])
+
+    def test_repeated_requests_are_served_from_cache(self):
+        """Test the second identical request runs no queries."""
+        for url in (reverse('job-list'), self.url):
+            self.assertEqual(self.client.get(url)['X-Cache'], 'miss')
+            with self.assertNumQueries(0):
+                response = self.client.get(url)
+            self.assertEqual(response['X-Cache'], 'hit')
+            self.assertEqual(response.status_code, 200)
+
+        other = self.client.get(reverse('job-list'), {'page_size': 5})
+        self.assertEqual(other['X-Cache'], 'miss')
+
+    def test_padded_ids_share_the_job_version(self):
+        """Test '007' and '7' are retired together, and non-numeric ids are 404."""
+        padded = self.url.replace(f'/{self.job.id}/', f'/00{self.job.id}/')
+        self.client.get(padded)
+        self.assertEqual(self.client.get(padded)['X-Cache'], 'hit')
+        with self.captureOnCommitCallbacks(execute=True):
+            Job.objects.get(pk=self.job.pk).save()
+        self.assertEqual(self.client.get(padded)['X-Cache'], 'miss')
+
+        self.assertEqual(self.client.get(self.url.replace(f'/{self.job.id}/', '/abc/')).status_code, 404)
+
+    def test_if_none_match_returns_not_modified(self):
+        """Test a matching ETag is answered with 304 and no queries."""
+        etag = self.client.get(self.url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_writes_invalidate_on_commit(self):
+        """Test job, requirement, skill and application changes retire cached responses."""
+        def assertRefreshed(change, check):
+            etag = self.client.get(self.url)['ETag']
+            list_etag = self.client.get(reverse('job-list'))['ETag']
+            with self.captureOnCommitCallbacks(execute=True):
+                change()
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            check(response.data)
+            self.assertNotEqual(self.client.get(reverse('job-list'))['ETag'], list_etag)
+
+        def rename_job():
+            self.job.position = 'Renamed'
+            self.job.save()
+
+        assertRefreshed(rename_job, lambda data: self.assertEqual(data['position'], 'Renamed'))
+        assertRefreshed(
+            lambda: self.job.requirements.add(Skill.objects.create(name='go')),
+            lambda data: self.assertEqual(len(data['skills']), 2),
+        )
+        assertRefreshed(
+            lambda: Skill.objects.filter(name='go').get().delete(),
+            lambda data: self.assertEqual(len(data['skills']), 1),
+        )
+        assertRefreshed(
+            lambda: Application.objects.create(job=self.job, candidate=create_candidate()),
+            lambda data: self.assertEqual(data['application_count'], 1),
+        )
+
+    def test_authenticated_requests_bypass_cache(self):
+        """Test requests carrying credentials are not cached."""
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.employer.token["access"]}')
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('X-Cache', response)
+
+    def test_file_based_backend(self):
+        """Test the cache works with a file-based backend."""
+        with tempfile.TemporaryDirectory() as directory, self.settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': directory,
+        }}):
+            self.assertEqual(self.client.get(self.url)['X-Cache'], 'miss')
+            self.assertEqual(self.client.get(self.url)['X-Cache'], 'hit')
+
+
+class ResumeExtractionTests(TestCase):
+    """Test resumes are queued on change and turned into skill vectors."""
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=media_root.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.executor = ThreadPoolExecutor(2)
+        self.addCleanup(self.executor.shutdown)
+        self.skills = {
+            name: Skill.objects.create(name=name)
+            for name in ('python', 'django', 'machine learning', 'c++', 'rust')
+        }
+
+    def create_candidate(self, email, text, name='resume.txt'):
+        return get_user_model().objects.create_user(
+            email=email, role='CAN', resume=ContentFile(text.encode(), name=name),
+        )
+
+    def extraction(self, user):
+        return ResumeExtraction.objects.get(candidate=user)
+
+    def test_resume_changes_are_queued(self):
+        """Test new and replaced resumes are queued and removed ones forgotten."""
+        create_employer()
+        candidate = self.create_candidate('candidate@example.com', 'Python')
+        self.assertEqual(ResumeExtraction.objects.count(), 1)
+        self.assertEqual(self.extraction(candidate).status, ResumeExtraction.Status.PENDING)
+
+        ResumeExtraction.objects.update(status=ResumeExtraction.Status.DONE)
+        candidate = get_user_model().objects.get(pk=candidate.pk)
+        candidate.username = 'renamed'
+        candidate.save()
+        self.assertEqual(self.extraction(candidate).status, ResumeExtraction.Status.DONE)
+
+        candidate.resume = ContentFile(b'Rust', name='new.txt')
+        candidate.save()
+        self.assertEqual(self.extraction(candidate).status, ResumeExtraction.Status.PENDING)
+        self.assertEqual(self.extraction(candidate).resume, candidate.resume.name)
+
+        candidate.resume = None
+        candidate.save()
+        self.assertFalse(ResumeExtraction.objects.exists())
+
+    def test_process_batch_stores_skill_vector(self):
+        """Test extraction matches single and multi word skill names."""
+        candidate = self.create_candidate(
+            'candidate@example.com', 'Built Django apps in Python.\nMachine   Learning, C++ and COBOL.',
+        )
+        self.assertEqual(extraction.process_batch(self.executor), (1, 0))
+
+        row = self.extraction(candidate)
+        self.assertEqual(row.status, ResumeExtraction.Status.DONE)
+        self.assertEqual(row.skill_count, 4)
+        expected = sorted(
+            self.skills[name].id for name in ('python', 'django', 'machine learning', 'c++')
+        )
+        self.assertEqual(list(extraction.decode_skill_ids(row.skill_ids)), expected)
+        self.assertEqual(len(row.skill_ids), 4 * 4)
+        self.assertEqual(extraction.process_batch(self.executor), (0, 0))
+
+    def test_replaced_resume_is_not_overwritten(self):
+        """Test a result for an outdated resume is dropped."""
+        candidate = self.create_candidate('candidate@example.com', 'Python')
+        task, = extraction.claim(10, timedelta(minutes=10))
+        candidate.resume = ContentFile(b'Rust', name='new.txt')
+        candidate.save()
+
+        self.assertEqual(extraction.complete(task, {'python'}, {'python': self.skills['python'].id}), 0)
+        self.assertEqual(self.extraction(candidate).status, ResumeExtraction.Status.PENDING)
+
+    def test_unsupported_format_fails_without_retry(self):
+        """Test unreadable resumes are marked failed at once."""
+        candidate = self.create_candidate('candidate@example.com', 'Python', name='resume.docx')
+        self.assertEqual(extraction.process_batch(self.executor), (0, 1))
+        row = self.extraction(candidate)
+        self.assertEqual(row.status, ResumeExtraction.Status.FAILED)
+        self.assertIn('Unsupported resume format', row.error)
+
+    def test_stale_claims_are_reclaimed(self):
+        """Test rows left running by a dead worker are claimed again."""
+        self.create_candidate('candidate@example.com', 'Python')
+        self.assertEqual(len(extraction.claim(10, timedelta(minutes=10))), 1)
+        self.assertEqual(extraction.claim(10, timedelta(minutes=10)), [])
+        self.assertEqual(len(extraction.claim(10, timedelta(0))), 1)
+
+    def test_command_drains_queue(self):
+        """Test extract_resumes backfills and processes the queue on a process pool."""
+        candidate = self.create_candidate('candidate@example.com', 'Rust')
+        ResumeExtraction.objects.all().delete()
+        out = StringIO()
+        call_command('extract_resumes', '--once', '--backfill', '--workers', '1', stdout=out)
+        self.assertIn('Extracted 1 resumes, 0 failed', out.getvalue())
+        self.assertEqual(
+            extraction.decode_skill_ids(self.extraction(candidate).skill_ids),
+            (self.skills['rust'].id,),
+        )
+
+    def test_applicants_ranked_by_skill_match(self):
+        """Test employers see applicants ranked by the job's required skills."""
+        employer = create_employer()
+        job, = create_jobs(employer, 1, [self.skills['python'], self.skills['django']])
+        strong = self.create_candidate('strong@example.com', 'Python and Django')
+        weak = self.create_candidate('weak@example.com', 'Python')
+        unread = self.create_candidate('unread@example.com', 'Django')
+        extraction.process_batch(self.executor, batch_size=2)
+        for candidate in (strong, weak, unread):
+            Application.objects.create(job=job, candidate=candidate)
+
+        client = APIClient()
+        client.force_authenticate(employer)
+        url = reverse('job-applicants', args=[job.id])
+        response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(item['candidate'], item['match_score']) for item in response.data],
+            [(strong.id, 2), (weak.id, 1), (unread.id, 0)],
+        )
+        response = client.get(url, {'min_score': 1})
+        self.assertEqual([item['candidate'] for item in response.data], [strong.id, weak.id])
+
+        client.force_authenticate(create_employer('other@example.com'))
+        self.assertEqual(client.get(url).status_code, 403)
+
+
+class ApplicantInboxTests(TestCase):
+    """Test the employer inbox across all of an employer's jobs."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.employer = create_employer()
+        cls.jobs = create_jobs(cls.employer, 3)
+        other_job, = create_jobs(create_employer('other@example.com'), 1)
+        cls.candidates = [create_candidate(f'candidate{i}@example.com') for i in range(4)]
+        cls.applications = []
+        for candidate in cls.candidates:
+            for job in cls.jobs[:2]:
+                cls.applications.append(Application.objects.create(job=job, candidate=candidate))
+            Application.objects.create(job=other_job, candidate=candidate)
+
+    def setUp(self):
+        get_cache().clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.employer)
+        self.url = reverse('application-inbox')
+
+    def expected_ids(self, applications):
+        return [a.id for a in sorted(applications, key=lambda a: (a.applied_at, a.id), reverse=True)]
+
+    def walk(self, params=None):
+        ids, url, params = [], self.url, {'page_size': 3, **(params or {})}
+        while url:
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            ids.extend(item['id'] for item in response.data['results'])
+            url, params = response.data['next'], None
+        return ids
+
+    def test_inbox_lists_applications_newest_first(self):
+        """Test both query plans page through the same applications."""
+        expected = self.expected_ids(self.applications)
+        for ordered in (False, True):
+            with self.subTest(ordered_scan=ordered), \
+                    patch('core.inbox.use_ordered_scan', return_value=ordered):
+                self.assertEqual(self.walk(), expected)
+
+    def test_inbox_filters_by_job(self):
+        """Test the job parameter narrows the inbox to one posting."""
+        job = self.jobs[0]
+        expected = self.expected_ids([a for a in self.applications if a.job_id == job.id])
+        self.assertEqual(self.walk({'job': job.id}), expected)
+
+    def test_plan_choice_counts_no_rows(self):
+        """Test the plan is picked from the counters and the largest id, without COUNT queries."""
+        with CaptureQueriesContext(connection) as queries:
+            self.assertTrue(inbox.use_ordered_scan(self.employer.pk, 1))
+        self.assertEqual(len(queries), 2)
+        self.assertFalse(any('COUNT(' in query['sql'] for query in queries))
+
+        get_cache().clear()
+        self.assertFalse(inbox.use_ordered_scan(self.employer.pk, 20))
+
+    def test_inbox_counts_jobs_on_page(self):
+        """Test per-job counts come from one grouped query."""
+        use_ordered_scan = inbox.use_ordered_scan(self.employer.pk, 20)
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url)
+        self.assertFalse(use_ordered_scan)
+        self.assertEqual(
+            sorted((job['job'], job['applications']) for job in response.data['jobs']),
+            [(self.jobs[0].id, 4), (self.jobs[1].id, 4)],
+        )
+        self.assertEqual(response.data['results'][0]['job_position'], self.jobs[1].position)
+
+    def test_candidates_have_no_inbox(self):
+        """Test the inbox is refused to candidates."""
+        self.client.force_authenticate(self.candidates[0])
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+
+class ApplicationCounterTests(TestCase):
+    """Test Job.application_count follows application writes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.employer = create_employer()
+        cls.candidates = [create_candidate(f'candidate{i}@example.com') for i in range(3)]
+
+    def setUp(self):
+        get_cache().clear()
+        self.jobs = create_jobs(self.employer, 3)
+        self.client = APIClient()
+
+    def count(self, job):
+        job.refresh_from_db(fields=['application_count'])
+        return job.application_count
+
+    def counter_updates(self, queries):
+        return [
+            query for query in queries
+            if query['sql'].startswith('UPDATE') and 'application_count' in query['sql']
+        ]
+
+    def test_create_and_delete_adjust_counter(self):
+        """Test the API and cascading deletes keep the counter exact."""
+        job = self.jobs[0]
+        for candidate in self.candidates:
+            self.client.force_authenticate(candidate)
+            response = self.client.post(reverse('application-list'), {'job': job.id}, format='json')
+            self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.count(job), 3)
+
+        response = self.client.delete(reverse('application-detail', args=[response.data['id']]))
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.count(job), 2)
+
+        self.candidates[0].delete()
+        self.assertEqual(self.count(job), 1)
+
+    def test_cascades_adjust_once(self):
+        """Test deleting a candidate or job does not update counters per application."""
+        candidate = self.candidates[0]
+        Application.objects.bulk_create([Application(job=job, candidate=candidate) for job in self.jobs])
+        Job.objects.update(application_count=1)
+
+        with CaptureQueriesContext(connection) as queries:
+            candidate.delete()
+        self.assertEqual(len(self.counter_updates(queries)), 1)
+        self.assertEqual([self.count(job) for job in self.jobs], [0, 0, 0])
+
+        Application.objects.bulk_create(
+            [Application(job=self.jobs[0], candidate=candidate) for candidate in self.candidates[1:]]
+        )
+        with CaptureQueriesContext(connection) as queries:
+            self.jobs[0].delete()
+        self.assertEqual(self.counter_updates(queries), [])
+
+    def test_list_by_popularity(self):
+        """Test jobs can be ordered and filtered by application count."""
+        for job, applicants in zip(self.jobs, (1, 3, 2)):
+            for candidate in self.candidates[:applicants]:
+                Application.objects.create(job=job, candidate=candidate)
+
+        response = self.client.get(reverse('job-list'), {'ordering': 'popular', 'page_size': 2})
+        self.assertEqual(
+            [item['application_count'] for item in response.data['results']], [3, 2]
+        )
+        response = self.client.get(response.data['next'])
+        self.assertEqual([item['application_count'] for item in response.data['results']], [1])
+
+        response = self.client.get(reverse('job-list'), {'min_applications': 2})
+        self.assertEqual(
+            sorted(item['application_count'] for item in response.data['results']), [2, 3]
+        )
+        self.assertEqual(self.client.get(reverse('job-list'), {'ordering': 'x'}).status_code, 400)
+
+    def test_reconcile_fixes_drift(self):
+        """Test the reconcile command rewrites drifted counters only."""
+        for candidate in self.candidates:
+            Application.objects.create(job=self.jobs[0], candidate=candidate)
+        Job.objects.filter(pk=self.jobs[0].pk).update(application_count=7)
+        Job.objects.filter(pk=self.jobs[1].pk).update(application_count=2)
+
+        out = StringIO()
+        call_command('reconcile_application_counts', '--batch-size', '2', stdout=out)
+        self.assertIn('Fixed 2 drifted application counters', out.getvalue())
+        self.assertEqual([self.count(job) for job in self.jobs], [3, 0, 0])
+
+
+class ApplicationSubmissionTests(TestCase):
+    """Test application creates rely on the unique constraint and can be replayed."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.candidate = create_candidate()
+        cls.jobs = create_jobs(create_employer(), 2)
+
+    def setUp(self):
+        get_cache().clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.candidate)
+        self.url = reverse('application-list')
+
+    def apply(self, job, key=None, cover_letter=''):
+        headers = {'Idempotency-Key': key} if key else {}
+        return self.client.post(
+            self.url, {'job': job.id, 'cover_letter': cover_letter}, format='json', headers=headers
+        )
+
+    def test_create_does_not_look_for_duplicates(self):
+        """Test a submission inserts without reading applications first."""
+        with CaptureQueriesContext(connection) as captured:
+            self.assertEqual(self.apply(self.jobs[0]).status_code, 201)
+        self.assertFalse([
+            query for query in captured
+            if query['sql'].startswith('SELECT') and 'core_application' in query['sql']
+        ])
+
+    def test_duplicate_is_a_validation_error(self):
+        """Test the unique constraint surfaces as a 400, not a 500."""
+        self.apply(self.jobs[0])
+        response = self.apply(self.jobs[0])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data, ['You have already applied to this job.'])
+        self.jobs[0].refresh_from_db()
+        self.assertEqual(self.jobs[0].application_count, 1)
+
+    def test_retry_with_key_replays_response(self):
+        """Test retries with the same Idempotency-Key get the original response."""
+        first = self.apply(self.jobs[0], key='click-1')
+        self.assertEqual(first.status_code, 201)
+        for _ in range(3):
+            retry = self.apply(self.jobs[0], key='click-1')
+            self.assertEqual(retry.status_code, 201)
+            self.assertEqual(retry.json(), first.json())
+            self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(Application.objects.count(), 1)
+        self.assertEqual(IdempotencyKey.objects.count(), 1)
+
+        # a new key is a new request
+        self.assertEqual(self.apply(self.jobs[0], key='click-2').status_code, 400)
+
+    def test_key_reused_for_other_request(self):
+        """Test a key sent with a different body is refused."""
+        self.apply(self.jobs[0], key='click-1')
+        self.assertEqual(self.apply(self.jobs[1], key='click-1').status_code, 422)
+        self.assertEqual(Application.objects.count(), 1)
+
+    def test_prune_idempotency_keys(self):
+        """Test expired keys are pruned and fresh ones kept."""
+        self.apply(self.jobs[0], key='old')
+        self.apply(self.jobs[1], key='new')
+        IdempotencyKey.objects.filter(key='old').update(created_at=timezone.now() - timedelta(days=2))
+
+        out = StringIO()
+        call_command('prune_idempotency_keys', stdout=out)
+        self.assertIn('Pruned 1 expired', out.getvalue())
+        self.assertEqual(list(IdempotencyKey.objects.values_list('key', flat=True)), ['new'])
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRoutingTests(TransactionTestCase):
+    """Test list and retrieve read a replica while writers read their writes."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # an SQLite file refreshed by sync_replicas, lagging like a real replica
+        cls.directory = tempfile.TemporaryDirectory()
+        primary = connections['default'].settings_dict
+        test = {**primary['TEST'], 'MIRROR': 'default'}
+        connections.settings['replica'] = {
+            **primary, 'NAME': os.path.join(cls.directory.name, 'replica.sqlite3'), 'TEST': test,
+        }
+        connections.settings['broken_replica'] = {
+            **primary, 'NAME': os.path.join(cls.directory.name, 'missing', 'db.sqlite3'), 'TEST': test,
+        }
+        # added after the runner collected the databases it sets up
+        cls.databases = {*cls.databases, 'replica', 'broken_replica'}
+        # pins must be seen by every worker
+        cls.enterClassContext(override_settings(CACHES={
+            'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+            'shared': {
+                'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                'LOCATION': os.path.join(cls.directory.name, 'cache'),
+            },
+        }, JOB_RESPONSE_CACHE='shared'))
+
+    @classmethod
+    def tearDownClass(cls):
+        for alias in ('replica', 'broken_replica'):
+            connections[alias].close()
+            del connections[alias]
+            del connections.settings[alias]
+        cls.directory.cleanup()
+        super().tearDownClass()
+
+    def setUp(self):
+        get_cache().clear()
+        replicas.unavailable.clear()
+        self.candidate = get_user_model().objects.create(
+            username='candidate', email='candidate@example.com', role='CAN'
+        )
+        self.employer = get_user_model().objects.create(
+            username='employer', email='employer@example.com', role='EMP'
+        )
+        self.job = Job.objects.create(position='Synced', employer=self.employer, is_active=True)
+        call_command('sync_replicas', stdout=StringIO())
+        get_cache().clear()
+
+    def job_ids(self, client):
+        return [job['id'] for job in client.get(reverse('job-list')).data['results']]
+
+    def test_anonymous_list_reads_replica_until_pinned(self):
+        """Test reads hit the replica, but not right after the job list changed."""
+        client = APIClient()
+        with CaptureQueriesContext(connections['replica']) as replica_queries:
+            self.assertEqual(self.job_ids(client), [self.job.id])
+        self.assertTrue(replica_queries)
+
+        new_job = Job.objects.create(position='Fresh', employer=self.employer, is_active=True)
+        # the write pinned anonymous job reads, so the cached response is fresh
+        self.assertEqual(set(self.job_ids(client)), {self.job.id, new_job.id})
+
+        get_cache().clear()
+        self.assertEqual(self.job_ids(client), [self.job.id])
+
+    def test_writer_reads_own_writes(self):
+        """Test a user who wrote reads from the primary while pinned."""
+        client = APIClient()
+        client.force_authenticate(self.candidate)
+        response = client.post(reverse('application-list'), {'job': self.job.id}, format='json')
+        self.assertEqual(response.status_code, 201)
+
+        with CaptureQueriesContext(connections['replica']) as replica_queries:
+            self.assertEqual(len(client.get(reverse('application-list')).data['results']), 1)
+        self.assertFalse(replica_queries)
+
+        # once the pin expires the replica answers, lagging behind
+        get_cache().delete(replicas.pin_key(f'user:{self.candidate.pk}'))
+        self.assertEqual(client.get(reverse('application-list')).data['results'], [])
+
+    def test_router(self):
+        """Test reads after a write or inside a transaction use the primary."""
+        with replicas.use_replica() as alias:
+            self.assertEqual(alias, 'replica')
+            self.assertEqual(router.db_for_read(Job), 'replica')
+            with transaction.atomic():
+                self.assertEqual(router.db_for_read(Job), 'default')
+            Job.objects.filter(pk=self.job.pk).update(position='Renamed')
+            self.assertEqual(router.db_for_read(Job), 'default')
+        self.assertEqual(router.db_for_read(Job), 'default')
+        self.assertEqual(router.db_for_write(Job), 'default')
+
+    @override_settings(DATABASE_REPLICAS=['broken_replica', 'replica'])
+    def test_broken_replica_is_skipped(self):
+        """Test a replica that cannot connect is skipped for a while."""
+        # keeps the configured order, so the broken replica is tried first
+        with patch('core.replicas.random.shuffle'):
+            with replicas.use_replica() as alias:
+                self.assertEqual(alias, 'replica')
+            self.assertIn('broken_replica', replicas.unavailable)
+
+            with patch.object(connections['broken_replica'], 'ensure_connection') as connect:
+                with replicas.use_replica() as alias:
+                    self.assertEqual(alias, 'replica')
+            connect.assert_not_called()
+
+    def test_refused_without_shared_cache(self):
+        """Test replicas are refused while pins would only live in one process."""
+        with override_settings(JOB_RESPONSE_CACHE='default'):
+            with self.assertRaises(ImproperlyConfigured):
+                replicas.get_replicas()
+
+
+class SQLiteProfileTests(SimpleTestCase):
+    """Test connections are opened with the tuned SQLite profile."""
+    databases = {'default'}
+
+    def test_pragmas(self):
+        """Test the pragmas from SQLITE_PRAGMAS are set on the connection."""
+        with connection.cursor() as cursor:
+            pragma = lambda name: cursor.execute(f'PRAGMA {name}').fetchone()[0]
+            self.assertEqual(pragma('synchronous'), 1)  # NORMAL
+            self.assertEqual(pragma('busy_timeout'), settings.SQLITE_PRAGMAS['busy_timeout'])
+            self.assertEqual(pragma('cache_size'), settings.SQLITE_PRAGMAS['cache_size'])
+        self.assertEqual(connection.transaction_mode, 'IMMEDIATE')
+
+
+class AsyncJobViewTests(TestCase):
+    """Test the async job views answer like JobView's list and retrieve."""
+
+    @classmethod
+    def setUpTestData(cls):
+        employer = create_employer()
+        skills = [Skill.objects.create(name=name) for name in ('Python', 'Django')]
+        cls.jobs = create_jobs(employer, 7, skills, salary='1000.50')
+        candidate = create_candidate()
+        Application.objects.create(job=cls.jobs[2], candidate=candidate)
+
+    def setUp(self):
+        get_cache().clear()
+
+    def get_both(self, sync_url, async_url, **params):
+        expected = self.client.get(sync_url, params)
+        response = self.client.get(async_url, params)
+        self.assertEqual(response.status_code, expected.status_code)
+        # pagination links point at each view's own URL
+        body = response.content.decode().replace(async_url, sync_url)
+        self.assertEqual(json.loads(body), expected.json())
+        return response
+
+    def test_list_matches_sync_view(self):
+        """Test every page, ordering and filter returns the sync view's JSON."""
+        for params in ({}, {'ordering': 'popular'}, {'min_applications': 1}, {'ordering': 'bad'}):
+            response = self.get_both(
+                reverse('job-list'), reverse('async-job-list'), page_size=3, **params
+            )
+            while response.status_code == 200 and response.json()['next']:
+                cursor = response.json()['next'].split('cursor=')[1].split('&')[0]
+                response = self.get_both(
+                    reverse('job-list'), reverse('async-job-list'), page_size=3, cursor=cursor, **params
+                )
+        self.get_both(reverse('job-list'), reverse('async-job-list'), cursor='bad')
+
+    def test_detail_matches_sync_view(self):
+        """Test retrieve, including a missing job, returns the sync view's JSON."""
+        job = self.jobs[2]
+        self.get_both(reverse('job-detail', args=[job.id]), reverse('async-job-detail', args=[job.id]))
+        self.get_both(reverse('job-detail', args=[0]), reverse('async-job-detail', args=[0]))
+
+    def test_response_cache(self):
+        """Test the async views share the job response cache and its invalidation."""
+        url = reverse('async-job-detail', args=[self.jobs[0].id])
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'miss')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url)['X-Cache'], 'hit')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Job.objects.filter(pk=self.jobs[0].pk).update(position='Renamed')
+            caching.invalidate_jobs([self.jobs[0].pk])
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.json()['position'], 'Renamed')
+        self.assertEqual(self.client.post(url).status_code, 405)
+
+    async def test_async_request_path(self):
+        """Test the views run on the event loop with the metrics middleware counting their queries."""
+        response = await self.async_client.get(reverse('async-job-detail', args=[self.jobs[0].id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('2 queries', response['Server-Timing'])
+
+
+@override_settings(CHANGE_FEED_SETTLE_SECONDS=0)
+class ExportTests(TestCase):
+    """Test jobs and applications stream out as NDJSON or CSV."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.employer = create_employer()
+        cls.skills = [Skill.objects.create(name=name) for name in ('python', 'sql')]
+        cls.jobs = create_jobs(cls.employer, 5, cls.skills, salary='1200.50')
+        cls.candidate = create_candidate()
+        Application.objects.create(job=cls.jobs[0], candidate=cls.candidate, cover_letter='Hi, "me"')
+        other = create_employer('other@example.com')
+        create_jobs(other, 1)
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def lines(self, response):
+        return b''.join(response.streaming_content).decode().splitlines()
+
+    def test_ndjson(self):
+        """Test every job is one JSON line with its skill names."""
+        response = self.client.get(reverse('job-export'))
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in self.lines(response)]
+        self.assertEqual(len(rows), 6)
+        self.assertEqual([row['id'] for row in rows], sorted(row['id'] for row in rows))
+        self.assertEqual(rows[0]['skills'], ['python', 'sql'])
+        self.assertEqual(rows[0]['salary'], '1200.50')
+        self.assertEqual(rows[0]['employer'], self.employer.id)
+
+    def test_csv_can_be_imported(self):
+        """Test the CSV export reads back through the job importer."""
+        response = self.client.get(reverse('job-export'), {'output': 'csv'})
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="jobs.csv"')
+        lines = self.lines(response)
+        self.assertEqual(lines[0].split(','), [*export.JOB_FIELDS, 'skills'])
+        last_id = Job.objects.latest('id').id
+        result = JobImporter(self.employer).run(iter_feed(lines, 'csv'))
+        self.assertEqual((result.created, result.rejected), (6, 0))
+        imported = Job.objects.filter(id__gt=last_id).order_by('id').first()
+        self.assertEqual(str(imported.salary), '1200.50')
+        self.assertEqual(set(imported.requirements.all()), set(self.skills))
+
+    def test_reads_in_chunks(self):
+        """Test rows are fetched chunk by chunk with one skills query per chunk."""
+        with CaptureQueriesContext(connection) as queries:
+            rows = list(export.job_rows(Job.objects.all(), chunk_size=2))
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(len(queries), 1 + 3)
+
+    def test_since_watermark(self):
+        """Test ?since= exports only jobs updated after it, oldest change first."""
+        watermark = timezone.now() - timedelta(seconds=10)
+        Job.objects.update(updated_at=watermark)
+        Job.objects.filter(pk=self.jobs[3].pk).update(updated_at=watermark + timedelta(seconds=2))
+        Job.objects.filter(pk=self.jobs[1].pk).update(updated_at=watermark + timedelta(seconds=1))
+        response = self.client.get(reverse('job-export'), {'since': watermark.isoformat()})
+        ids = [json.loads(line)['id'] for line in self.lines(response)]
+        self.assertEqual(ids, [self.jobs[1].id, self.jobs[3].id])
+        self.assertEqual(self.client.get(reverse('job-export'), {'since': 'nope'}).status_code, 400)
+
+    def test_gzip(self):
+        """Test the export is compressed when the client accepts gzip."""
+        response = self.client.get(reverse('job-export'), HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        content = gzip.decompress(b''.join(response.streaming_content)).decode()
+        self.assertEqual(len(content.splitlines()), 6)
+
+        headers = [
+            ('gzip;q=0, br', False), ('*;q=0.5', True), ('gzip;q=0, *', False),
+            ('identity', False), ('GZIP ; Q=0.1', True),
+        ]
+        for header, compressed in headers:
+            with self.subTest(header=header):
+                self.assertEqual(accepts_gzip(header), compressed)
+
+    @override_settings(CHANGE_FEED_SETTLE_SECONDS=60)
+    def test_leaves_unsettled_changes(self):
+        """Test rows changed within the settle time wait for the next export."""
+        rows = list(export.job_rows(Job.objects.all(), since=timezone.now() - timedelta(days=1)))
+        self.assertEqual(rows, [])
+
+    def test_applications(self):
+        """Test employers export applications to their jobs and candidates their own."""
+        for user in (self.employer, self.candidate):
+            self.client.force_authenticate(user)
+            response = self.client.get(reverse('application-export'), {'output': 'csv'})
+            rows = list(csv.DictReader(self.lines(response)))
+            self.assertEqual(len(rows), 1)
+            self.assertEqual(rows[0]['cover_letter'], 'Hi, "me"')
+            self.assertEqual(int(rows[0]['job']), self.jobs[0].id)
+
+        self.client.force_authenticate(create_employer('third@example.com'))
+        self.assertEqual(self.lines(self.client.get(reverse('application-export'))), [])
+
+    def test_export_jobs_command(self):
+        """Test the command writes a gzipped file and reports the next watermark."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'jobs.ndjson.gz')
+            err = StringIO()
+            call_command('export_jobs', '-o', path, stderr=err)
+            with gzip.open(path, 'rt') as file:
+                rows = [json.loads(line) for line in file]
+        self.assertEqual(len(rows), 6)
+        self.assertIn('Exported 6 jobs', err.getvalue())
+        latest = max(Job.objects.values_list('updated_at', flat=True))
+        self.assertIn(f'--since {latest.isoformat()}', err.getvalue())
+
+
+class ChangeFeedTests(TestCase):
+    """Test the job change feed pages through saves and deletions."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.employer = create_employer()
+        cls.jobs = create_jobs(cls.employer, 4)
+        cls.start = timezone.now() - timedelta(hours=1)
+        for index, job in enumerate(cls.jobs):
+            # inactive jobs can be deleted
+            Job.objects.filter(pk=job.pk).update(
+                is_active=False, updated_at=cls.start + timedelta(minutes=index)
+            )
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def walk(self, params):
+        """Follows next links until the feed has no more, returning the changes and last link."""
+        seen = []
+        response = self.client.get(reverse('job-changes'), params)
+        while True:
+            self.assertEqual(response.status_code, 200)
+            seen.extend(response.data['results'])
+            if not response.data['more']:
+                return seen, response.data['next']
+            response = self.client.get(response.data['next'])
+
+    def test_pages_through_saves_and_deletes(self):
+        """Test upserts and deletes come merged oldest first, page by page."""
+        self.client.force_authenticate(self.employer)
+        self.assertEqual(self.client.delete(reverse('job-detail', args=[self.jobs[1].id])).status_code, 204)
+        JobTombstone.objects.filter(job_id=self.jobs[1].id).update(deleted_at=self.start + timedelta(minutes=5))
+
+        seen, _ = self.walk({'page_size': 2})
+        self.assertEqual(
+            [(change['op'], change['id']) for change in seen],
+            [('upsert', self.jobs[0].id), ('upsert', self.jobs[2].id),
+             ('upsert', self.jobs[3].id), ('delete', self.jobs[1].id)],
+        )
+        self.assertEqual(seen[0]['job']['position'], 'Job 0')
+        self.assertEqual(seen[0]['job']['skills'], [])
+
+    @override_settings(CHANGE_FEED_SETTLE_SECONDS=0)
+    def test_cursor_resumes_after_changes(self):
+        """Test a kept cursor returns only what changed since, and moves on when idle."""
+        _, next_url = self.walk({})
+        response = self.client.get(next_url)
+        self.assertEqual(response.data['results'], [])
+        self.assertNotEqual(response.data['next'], next_url)
+
+        self.jobs[2].position = 'Renamed'
+        self.jobs[2].save()
+        deleted_id = self.jobs[0].id
+        self.jobs[0].delete()
+        response = self.client.get(response.data['next'])
+        self.assertEqual(
+            [(change['op'], change['id']) for change in response.data['results']],
+            [('upsert', self.jobs[2].id), ('delete', deleted_id)],
+        )
+        self.assertEqual(response.data['results'][0]['job']['position'], 'Renamed')
+
+    def test_settle_window(self):
+        """Test changes younger than the settle window wait for a later read."""
+        job = Job.objects.create(position='Fresh', employer=self.employer)
+        results, position, _ = changes.read_changes()
+        self.assertNotIn(job.id, [change['id'] for change in results])
+        later, _, _ = changes.read_changes(position, now=timezone.now() + timedelta(seconds=5))
+        self.assertEqual([change['id'] for change in later], [job.id])
+
+    def test_since_watermark(self):
+        """Test ?since= starts after an export watermark."""
+        seen, _ = self.walk({'since': (self.start + timedelta(minutes=1)).isoformat()})
+        self.assertEqual([change['id'] for change in seen], [self.jobs[2].id, self.jobs[3].id])
+
+    def test_bad_cursors(self):
+        """Test invalid cursors get 404 and ones past the tombstone retention 410."""
+        self.assertEqual(self.client.get(reverse('job-changes'), {'cursor': 'nope'}).status_code, 404)
+        expired = changes.encode_cursor((timezone.now() - timedelta(days=31), None))
+        self.assertEqual(self.client.get(reverse('job-changes'), {'cursor': expired}).status_code, 410)
+
+    def test_prune_job_tombstones(self):
+        """Test the command deletes only tombstones past the retention."""
+        JobTombstone.objects.bulk_create([
+            JobTombstone(job_id=1000, deleted_at=timezone.now() - timedelta(days=40)),
+            JobTombstone(job_id=1001),
+        ])
+        out = StringIO()
+        call_command('prune_job_tombstones', stdout=out)
+        self.assertIn('Pruned 1 job tombstones', out.getvalue())
+        self.assertEqual(list(JobTombstone.objects.values_list('job_id', flat=True)), [1001])
+
+
+class JobRowListSerializerTests(TestCase):
+    """Test jobs serialized from values() rows match those from model instances."""
+
+    @classmethod
+    def setUpTestData(cls):
+        employer = create_employer()
+        skills = [Skill.objects.create(name=name) for name in ('sql', 'django', 'python')]
+        create_jobs(employer, 3, skills, salary='1200.50', description='Build things')
+        create_jobs(employer, 2, skills[:1])
+        job, = create_jobs(employer, 1)
+        Application.objects.create(job=job, candidate=create_candidate())
+
+    def assertSameOutput(self):
+        queryset = Job.objects.order_by('id')
+        rows = list(JobListSerializer.values(queryset))
+        self.assertIsInstance(rows[0], dict)
+        with self.assertNumQueries(1):
+            from_rows = JSONRenderer().render(JobListSerializer(rows, many=True).data)
+        from_instances = JobListSerializer(with_listing_fields(queryset), many=True).data
+        self.assertEqual(from_rows, JSONRenderer().render(from_instances))
+        return json.loads(from_rows)
+
+    def test_same_output(self):
+        """Test skills, ids, nulls, decimals and counts come out the same."""
+        data = self.assertSameOutput()
+        self.assertEqual([skill['name'] for skill in data[0]['skills']], ['django', 'python', 'sql'])
+        self.assertIsNone(data[-1]['salary'])
+        self.assertEqual(data[-1]['application_count'], 1)
+
+    def test_same_output_in_another_timezone(self):
+        """Test datetimes are converted to the active timezone as the field does."""
+        with timezone.override('America/New_York'):
+            data = self.assertSameOutput()
+        self.assertTrue(data[0]['created_at'].endswith(('-04:00', '-05:00')))
+
+    def test_empty(self):
+        """Test an empty list serializes without queries."""
+        with self.assertNumQueries(0):
+            self.assertEqual(JobListSerializer([], many=True).data, [])
@@ -1,5 +1,15 @@
-from django.urls import path
+from django.urls import path, include
+from rest_framework.routers import DefaultRouter
+from .views import JobView, ApplicationView, MetricsView
+from . import async_views
+
+router = DefaultRouter()
+router.register('jobs', JobView, basename='job')
+router.register('applications', ApplicationView, basename='application')
 
 urlpatterns = [
-    
-]
\ No newline at end of file
+    path('', include(router.urls)),
+    path('metrics/', MetricsView.as_view(), name='metrics'),
+    path('async/jobs/', async_views.job_list, name='async-job-list'),
+    path('async/jobs/<int:pk>/', async_views.job_detail, name='async-job-detail'),
+]
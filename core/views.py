@@ -1,24 +1,236 @@
 from .serializers import JobCreateSerializer,ApplicationSerializer,JobListSerializer
 from .models import Job,Application,Skill,CompanyProfile
+from .pagination import JobPagination, ApplicationPagination
+from . import inbox
+from . import changes, export
+from .caching import REPLICA_PIN, CachedReadMixin, is_cacheable
+from .idempotency import IdempotentCreateMixin
+from .importer import CONTENT_TYPES, JobImporter, iter_feed
+from .matching import match_index
+from .replicas import ReplicaReadMixin
+from .metrics import registry
+from .search import search_job_ids
+from .serializers import ApplicantMatchSerializer, JobSearchSerializer, JobMatchSerializer
+from .serializers import ChangeFeedQuerySerializer, ExportQuerySerializer, JobListQuerySerializer
+from .serializers import InboxApplicationSerializer, InboxQuerySerializer
+from .extraction import decode_skill_ids
 from rest_framework.response import Response
 from rest_framework import status,viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from rest_framework.views import APIView
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
+from django.db.models import Prefetch
+from django.http import StreamingHttpResponse
+from functools import partial
+import codecs
+import heapq
 
 User = get_user_model()
 
-class JobView(viewsets.ModelViewSet):
-    """Manages CRUD operation for job model."""
+
+def accepts_gzip(header):
+    """Whether an Accept-Encoding header allows gzip, honouring q-values."""
+    qualities = {}
+    for item in header.split(','):
+        coding, *params = item.split(';')
+        quality = 1.0
+        for param in params:
+            name, _, value = param.strip().partition('=')
+            if name.lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding.strip().lower()] = quality
+    # * stands for every coding not named
+    return qualities.get('gzip', qualities.get('*', 0.0)) > 0
+
+
+def with_listing_fields(queryset):
+    """Loads employer and skill names in a fixed number of queries."""
+    return queryset.select_related('employer').prefetch_related(
+        Prefetch('requirements', queryset=Skill.objects.only('name'))
+    )
+
+
+def export_response(request, name, make_stream):
+    """Streams make_stream(since, format, gzip) as a file download."""
+    params = ExportQuerySerializer(data=request.query_params)
+    params.is_valid(raise_exception=True)
+    format = params.validated_data['output']
+    gzip = accepts_gzip(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+    response = StreamingHttpResponse(
+        make_stream(params.validated_data.get('since'), format, gzip),
+        content_type=export.FORMATS[format],
+    )
+    response['Content-Disposition'] = f'attachment; filename="{name}.{format}"'
+    response['Vary'] = 'Accept-Encoding'
+    if gzip:
+        response['Content-Encoding'] = 'gzip'
+    return response
+
+
+class JobView(ReplicaReadMixin, CachedReadMixin, viewsets.ModelViewSet):
+    """Manages CRUD operation for job model.
+    
+    List and retrieve read from a replica, see core.replicas.
+    """
     queryset = Job.objects.all()
     
     #default serializer class 
     serializer_class = JobCreateSerializer
+    pagination_class = JobPagination
+    read_actions = ('list', 'retrieve', 'search', 'matches')
     
-    def get_serializer_class(self):
+    def get_queryset(self):
+        queryset = super().get_queryset()
         if self.action == 'list':
+            # plain rows, which JobListSerializer turns into dicts without model instances
+            queryset = JobListSerializer.values(queryset)
+            params = JobListQuerySerializer(data=self.request.query_params)
+            params.is_valid(raise_exception=True)
+            if 'min_applications' in params.validated_data:
+                queryset = queryset.filter(
+                    application_count__gte=params.validated_data['min_applications']
+                )
+        elif self.action in self.read_actions:
+            queryset = with_listing_fields(queryset)
+        return queryset
+    
+    def get_replica_pins(self, request):
+        pins = super().get_replica_pins(request)
+        if is_cacheable(request):
+            # a response built from a lagging replica would stay cached
+            pins.append(REPLICA_PIN)
+        return pins
+    
+    def get_serializer_class(self):
+        if self.action in self.read_actions:
             return JobListSerializer
         return self.serializer_class
     
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """Ranked full-text search over position, description and skill names."""
+        params = JobSearchSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        ids = search_job_ids(**params.validated_data)
+        jobs = self.get_queryset().in_bulk(ids)
+        serializer = self.get_serializer([jobs[pk] for pk in ids if pk in jobs], many=True)
+        return Response(serializer.data)
+    
+    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
+    def matches(self, request):
+        """Active jobs ranked by how many of the candidate's skills they require."""
+        user = request.user
+        if user.role != User.RoleChoice.CAN:
+            return Response(
+                {"detail": "Only candidates can get job matches."},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        params = JobMatchSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        
+        skill_ids = user.skills.values_list('id', flat=True)
+        ranked = match_index.sync().top_k(skill_ids, params.validated_data['limit'])
+        jobs = self.get_queryset().in_bulk([job_id for job_id, _ in ranked])
+        ranked = [(jobs[job_id], score) for job_id, score in ranked if job_id in jobs]
+        
+        serializer = self.get_serializer([job for job, _ in ranked], many=True)
+        data = serializer.data
+        for item, (_, score) in zip(data, ranked):
+            item['match_score'] = score
+        return Response(data)
+    
+    @action(detail=True, methods=['get'], permission_classes=[IsAuthenticated])
+    def applicants(self, request, pk=None):
+        """The job's applicants ranked by how many of its required skills their resume shows."""
+        job = self.get_object()
+        if job.employer_id != request.user.pk:
+            return Response(
+                {"detail": "Only the employer who posted this job can see its applicants."},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        params = ApplicantMatchSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        min_score, limit = params.validated_data['min_score'], params.validated_data['limit']
+        
+        # skill vectors come from core.extraction, no resume is opened here
+        required = set(job.requirements.values_list('id', flat=True))
+        ranked = []
+        for application in job.applications.values(
+            'id', 'candidate_id', 'candidate__username', 'applied_at',
+            'candidate__resume_extraction__skill_ids',
+        ).iterator():
+            score = len(required.intersection(
+                decode_skill_ids(application['candidate__resume_extraction__skill_ids'])
+            ))
+            if score >= min_score:
+                ranked.append({
+                    'id': application['id'],
+                    'candidate': application['candidate_id'],
+                    'candidate_username': application['candidate__username'],
+                    'applied_at': application['applied_at'],
+                    'match_score': score,
+                })
+        return Response(heapq.nlargest(
+            limit, ranked, key=lambda item: (item['match_score'], item['applied_at'])
+        ))
+    
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """All jobs, or those updated after ?since=, streamed as NDJSON or CSV (?output=)."""
+        return export_response(request, 'jobs', export.export_jobs)
+    
+    @action(detail=False, methods=['get'])
+    def changes(self, request):
+        """Jobs saved or deleted after ?cursor= (or the ?since= of an export), oldest first."""
+        params = ChangeFeedQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        position = None
+        if 'cursor' in params.validated_data:
+            try:
+                position = changes.decode_cursor(params.validated_data['cursor'])
+            except ValueError:
+                raise NotFound('Invalid cursor')
+        elif 'since' in params.validated_data:
+            position = (params.validated_data['since'], None)
+        
+        results, position, more = changes.read_changes(position, params.validated_data['page_size'])
+        url = remove_query_param(request.build_absolute_uri(), 'since')
+        return Response({
+            'next': replace_query_param(url, 'cursor', changes.encode_cursor(position)),
+            'more': more,
+            'results': results,
+        })
+    
+    @action(detail=False, methods=['post'], url_path='import', permission_classes=[IsAuthenticated])
+    def import_jobs(self, request):
+        """Bulk creates jobs from an NDJSON or CSV request body, streamed line by line."""
+        if request.user.role != User.RoleChoice.EMP:
+            return Response(
+                {"detail": "Only employers can import jobs."},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        content_type = request.content_type.split(';')[0].strip().lower()
+        format = CONTENT_TYPES.get(content_type)
+        if format is None:
+            return Response(
+                {"detail": f"Content type must be one of: {', '.join(CONTENT_TYPES)}."},
+                status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE
+            )
+        
+        lines = codecs.iterdecode(request.stream or [], 'utf-8', errors='replace')
+        result = JobImporter(request.user).run(iter_feed(lines, format))
+        # the report still lists every rejected line
+        if not result.created:
+            return Response(result.as_dict(), status=status.HTTP_400_BAD_REQUEST)
+        return Response(result.as_dict(), status=status.HTTP_201_CREATED)
+    
     def destroy(self, request, *args, **kwargs):
         job = self.get_object()
         user = request.user
@@ -29,7 +241,7 @@ class JobView(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        if job.employer != user:
+        if job.employer_id != user.pk:
             return Response(
                 {'detail':'You are not authorized to delete this job.'},
                 status = status.HTTP_403_FORBIDDEN
@@ -40,5 +252,66 @@ class JobView(viewsets.ModelViewSet):
         return super().destroy(request, *args, **kwargs)
     
     
-class ApplicationView(viewsets.ModelViewSet):
-    """Allows candidate to create, read, update and delete their application."""
\ No newline at end of file
+class ApplicationView(ReplicaReadMixin, IdempotentCreateMixin, viewsets.ModelViewSet):
+    """Allows candidate to create, read, update and delete their application.
+    
+    Creates may carry an Idempotency-Key header, see core.idempotency.
+    List and retrieve read from a replica, see core.replicas.
+    """
+    serializer_class = ApplicationSerializer
+    pagination_class = ApplicationPagination
+    permission_classes = [IsAuthenticated]
+    
+    def get_queryset(self):
+        return Application.objects.filter(candidate=self.request.user)
+    
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """The employer's received applications, or the candidate's own, streamed
+        as NDJSON or CSV; ?since= limits it to those applied after.
+        """
+        if request.user.role == User.RoleChoice.EMP:
+            queryset = Application.objects.filter(job__employer=request.user)
+        else:
+            queryset = self.get_queryset()
+        return export_response(
+            request, 'applications', partial(export.export_applications, queryset)
+        )
+    
+    @action(detail=False, methods=['get'])
+    def inbox(self, request):
+        """Applications to all of the employer's jobs, newest first, with the
+        application counts of the jobs on the page.
+        """
+        user = request.user
+        if user.role != User.RoleChoice.EMP:
+            return Response(
+                {"detail": "Only employers have an applicant inbox."},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        params = InboxQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        
+        keys = inbox.inbox_keys(
+            user.pk, self.paginator.get_page_size(request), params.validated_data.get('job')
+        )
+        applications = inbox.load_page(self.paginate_queryset(keys))
+        response = self.get_paginated_response(
+            InboxApplicationSerializer(applications, many=True).data
+        )
+        response.data['jobs'] = inbox.job_counts(
+            {application.job_id: application.job.position for application in applications}
+        )
+        return response
+
+
+class MetricsView(APIView):
+    """Request timing histograms of this worker process, for admins."""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(registry.snapshot())
+
+    def delete(self, request):
+        registry.reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,33 @@
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from .models import TokenUser
+from .tokens import ACTIVE_CLAIM, ROLE_CLAIM, is_revoked
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """JWT authentication that builds request.user from the token claims.
+
+    The user is a TokenUser holding id, role and is_active; any other
+    field is loaded from the database the first time a view reads it.
+    Tokens without the claims fall back to the usual lookup.
+    """
+
+    def get_user(self, validated_token):
+        if is_revoked(validated_token.payload):
+            raise AuthenticationFailed(_('Token has been revoked'), code='token_revoked')
+
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+            role = validated_token[ROLE_CLAIM]
+            is_active = validated_token[ACTIVE_CLAIM]
+        except KeyError:
+            if api_settings.USER_ID_CLAIM not in validated_token:
+                raise InvalidToken(_('Token contained no recognizable user identification'))
+            return super().get_user(validated_token)
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+        return TokenUser.from_claims(user_id, role, is_active)
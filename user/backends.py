@@ -0,0 +1,24 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+from . import hashing
+
+
+class PooledModelBackend(ModelBackend):
+    """ModelBackend that checks passwords on the bounded hashing pool."""
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        UserModel = get_user_model()
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            # hash anyway, so unknown emails take as long as known ones
+            hashing.make_password(password)
+            return None
+        if hashing.verify_password(user, password) and self.user_can_authenticate(user):
+            return user
+        return None
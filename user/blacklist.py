@@ -0,0 +1,152 @@
+"""Bloom filter in front of the refresh token blacklist.
+
+Every refresh and logout checks whether the token's JTI is blacklisted.
+The filter answers "definitely not" from memory for nearly every token,
+so the blacklist tables are only queried for blacklisted tokens and the
+rare false positive, and refresh cost does not grow with the blacklist.
+
+The filter is built from the unexpired blacklist rows when a server process
+starts (see w_find/wsgi.py and w_find/asgi.py), or on first use otherwise.
+A check reads the rows added since the last sync, by this or any other
+process, at most once every BLACKLIST_SYNC_INTERVAL seconds: a range scan
+on the primary key that finds nothing nearly always. Tokens blacklisted by
+this process are added at once (see user.signals), so only a row written
+by another process can go unseen, and only until the next sync. No cache
+is involved, so the filter cannot miss a row for good. Rows from the last
+SETTLE_SECONDS are read again on every sync, in case a transaction holding
+a lower id commits after a higher one was seen.
+"""
+import hashlib
+import math
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError
+from rest_framework_simplejwt.utils import aware_utcnow
+
+SETTLE_SECONDS = 5
+MIN_CAPACITY = 100_000
+ERROR_RATE = 0.01
+
+
+class BloomFilter:
+    def __init__(self, capacity, error_rate=ERROR_RATE):
+        self.capacity = capacity
+        self.size = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        # a blake2b digest holds at most 16 words
+        self.hashes = min(16, max(1, round(self.size / capacity * math.log(2))))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def positions(self, key):
+        # one digest supplies a 32-bit word per hash function
+        digest = hashlib.blake2b(key.encode(), digest_size=4 * self.hashes).digest()
+        size = self.size
+        return [word % size for word in memoryview(digest).cast('I')]
+
+    def add(self, key):
+        bits = self.bits
+        for position in self.positions(key):
+            bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        bits = self.bits
+        for position in self.positions(key):
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+
+def get_sync_interval():
+    return getattr(settings, 'BLACKLIST_SYNC_INTERVAL', 1)
+
+
+def rows_of(queryset):
+    return queryset.order_by('id').values_list('id', 'token__jti', 'blacklisted_at')
+
+
+class BlacklistFilter:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        """Drops the filter; it is rebuilt from the database on next use."""
+        self.bloom = None
+        # every row up to last_id is in the filter, as are the ids in recent
+        self.last_id = 0
+        self.recent = set()
+        self.synced_at = None
+
+    def build(self):
+        from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+        synced_at = time.monotonic()
+        rows = BlacklistedToken.objects.filter(token__expires_at__gt=aware_utcnow())
+        bloom = BloomFilter(max(MIN_CAPACITY, 2 * rows.count()))
+        recent = set()
+        last_id = self.load(bloom, 0, recent, rows_of(rows).iterator(chunk_size=10_000))
+        with self.lock:
+            self.bloom, self.last_id, self.recent = bloom, last_id, recent
+            self.synced_at = synced_at
+
+    def warm(self):
+        """Builds the filter ahead of the first check, if the database allows."""
+        try:
+            self.build()
+        except DatabaseError:
+            # e.g. started before migrate; the first check builds it instead
+            return False
+        return True
+
+    def sync(self):
+        """Loads the rows blacklisted since the last sync, unless that was a moment ago."""
+        from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+        now = time.monotonic()
+        if self.synced_at is not None and now - self.synced_at < get_sync_interval():
+            return
+        self.synced_at = now
+        rows = list(rows_of(BlacklistedToken.objects.filter(id__gt=self.last_id)))
+        if rows:
+            with self.lock:
+                self.last_id = self.load(self.bloom, self.last_id, self.recent, rows)
+
+    @staticmethod
+    def load(bloom, last_id, recent, rows):
+        """Adds the rows not yet in bloom and returns the new last_id."""
+        settled = aware_utcnow() - timedelta(seconds=SETTLE_SECONDS)
+        advancing = True
+        for row_id, jti, blacklisted_at in rows:
+            if row_id <= last_id:
+                continue
+            if row_id not in recent:
+                bloom.add(jti)
+            if advancing and blacklisted_at <= settled:
+                # no earlier row can still appear, so stop reading this one
+                last_id = row_id
+                recent.discard(row_id)
+            else:
+                advancing = False
+                recent.add(row_id)
+        return last_id
+
+    def __contains__(self, jti):
+        """False when the JTI is certainly not blacklisted."""
+        if self.bloom is None or self.bloom.count > self.bloom.capacity:
+            self.build()
+        else:
+            self.sync()
+        return jti in self.bloom
+
+    def add(self, jti):
+        """Adds a row blacklisted by this process without waiting for the next sync."""
+        if self.bloom is not None:
+            with self.lock:
+                self.bloom.add(jti)
+
+
+blacklist_filter = BlacklistFilter()
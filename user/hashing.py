@@ -0,0 +1,105 @@
+"""Password hashing policy and the bounded pool it runs on.
+
+The hashers read their cost from settings (PBKDF2_ITERATIONS,
+ARGON2_TIME_COST, ARGON2_MEMORY_COST, ARGON2_PARALLELISM). Django already
+upgrades a hash on login when its algorithm or cost differs from the
+first entry of PASSWORD_HASHERS, so changing the policy needs no data
+migration.
+
+Hashing is CPU bound and releases the GIL, so a burst of logins can
+occupy every core. make_password() and verify_password() run it on a
+pool of PASSWORD_HASHING_WORKERS threads instead. When more than
+PASSWORD_HASHING_MAX_QUEUE requests are already waiting, the caller gets
+HashingBusy (503) rather than queueing without bound. The pool's depth is
+reported under the password_hashing gauge of /api/metrics/.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import hashers
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from core.metrics import registry
+
+
+class TunedPBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    iterations = getattr(settings, 'PBKDF2_ITERATIONS', hashers.PBKDF2PasswordHasher.iterations)
+
+
+class TunedArgon2PasswordHasher(hashers.Argon2PasswordHasher):
+    time_cost = getattr(settings, 'ARGON2_TIME_COST', hashers.Argon2PasswordHasher.time_cost)
+    memory_cost = getattr(settings, 'ARGON2_MEMORY_COST', hashers.Argon2PasswordHasher.memory_cost)
+    parallelism = getattr(settings, 'ARGON2_PARALLELISM', hashers.Argon2PasswordHasher.parallelism)
+
+
+class HashingBusy(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Too many sign-ins in progress, please retry shortly.'
+    default_code = 'hashing_busy'
+
+
+class HashingPool:
+    def __init__(self, workers, max_queue):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.executor = ThreadPoolExecutor(workers, thread_name_prefix='password-hashing')
+        self.lock = threading.Lock()
+        self.depth = 0
+        self.peak_depth = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def run(self, function, *args):
+        """Runs function on the pool and returns its result, or raises HashingBusy."""
+        with self.lock:
+            if self.depth >= self.workers + self.max_queue:
+                self.rejected += 1
+                raise HashingBusy()
+            self.depth += 1
+            self.peak_depth = max(self.peak_depth, self.depth)
+        try:
+            return self.executor.submit(function, *args).result()
+        finally:
+            with self.lock:
+                self.depth -= 1
+                self.completed += 1
+
+    def stats(self):
+        with self.lock:
+            return {
+                'workers': self.workers,
+                'max_queue': self.max_queue,
+                'depth': self.depth,
+                'queued': max(0, self.depth - self.workers),
+                'peak_depth': self.peak_depth,
+                'completed': self.completed,
+                'rejected': self.rejected,
+            }
+
+
+pool = HashingPool(
+    getattr(settings, 'PASSWORD_HASHING_WORKERS', 2),
+    getattr(settings, 'PASSWORD_HASHING_MAX_QUEUE', 64),
+)
+registry.register_gauge('password_hashing', pool.stats)
+
+
+def make_password(password):
+    return pool.run(hashers.make_password, password)
+
+
+def _verify(password, encoded):
+    outdated = []
+    valid = hashers.check_password(password, encoded, setter=outdated.append)
+    return valid, bool(outdated)
+
+
+def verify_password(user, password):
+    """Checks the password on the pool, rehashing it if the policy changed."""
+    valid, outdated = pool.run(_verify, password, user.password)
+    if outdated:
+        user.password = make_password(password)
+        user.save(update_fields=['password'])
+    return valid
@@ -0,0 +1,43 @@
+"""Delete expired outstanding and blacklisted refresh tokens in batches."""
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.utils import aware_utcnow
+
+
+class Command(BaseCommand):
+    help = "Prune expired rows from the token blacklist tables without long locks"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument(
+            "--pause", type=float, default=0,
+            help="Seconds to sleep between batches, to leave room for other writers",
+        )
+
+    def handle(self, *args, **options):
+        now = aware_utcnow()
+        batch_size = options["batch_size"]
+        last_id, outstanding, blacklisted = 0, 0, 0
+        while True:
+            # walking the primary key keeps every batch an index range scan
+            ids = list(
+                OutstandingToken.objects.filter(id__gt=last_id, expires_at__lte=now)
+                .order_by("id").values_list("id", flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            with transaction.atomic():
+                blacklisted += BlacklistedToken.objects.filter(token_id__in=ids).delete()[0]
+                outstanding += OutstandingToken.objects.filter(id__in=ids).delete()[0]
+            last_id = ids[-1]
+            self.stdout.write(f"pruned {outstanding} outstanding, {blacklisted} blacklisted")
+            if options["pause"]:
+                time.sleep(options["pause"])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Pruned {outstanding} expired outstanding tokens and {blacklisted} blacklisted tokens."
+        ))
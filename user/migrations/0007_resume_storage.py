@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:06
+
+import user.resumes
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0006_user_email_ci_unique'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='user',
+            name='resume',
+            field=models.FileField(blank=True, null=True, storage=user.resumes.ResumeStorage(), upload_to='resumes/'),
+        ),
+    ]
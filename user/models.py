@@ -1,12 +1,18 @@
+import re
 import uuid
-from django.db import models
+from collections import Counter
+
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, connections, models, transaction
 from django.contrib.auth.models import (
     AbstractBaseUser, BaseUserManager, PermissionsMixin
 )
 from django.core.exceptions import ValidationError
+from django.db.models.functions import Lower
 from django.utils.text import slugify
 
-from rest_framework_simplejwt.tokens import RefreshToken
+from . import hashing
+from .resumes import resume_storage
+from .tokens import UserRefreshToken
 
 
 def generate_username_from_email(email):
@@ -23,29 +29,53 @@ def generate_username_from_email(email):
     return unique_username
 
 
+# tries before giving up on generated usernames
+USERNAME_ATTEMPTS = 5
+
+
+# SQLite names an expression index, or the columns of a table constraint
+SQLITE_UNIQUE_RE = re.compile(r"UNIQUE constraint failed: (?:index '(?P<index>[^']+)'|(?P<columns>.+))$")
+
+
+def unique_violation(error):
+    """Names the User field whose unique constraint an IntegrityError reports."""
+    # PostgreSQL names the constraint
+    name = getattr(getattr(error.__cause__, 'diag', None), 'constraint_name', None)
+    if name is None:
+        match = SQLITE_UNIQUE_RE.search(str(error))
+        name = match and (match['index'] or match['columns'])
+    return UNIQUE_FIELDS.get(name)
+
+
+def duplicate_error(field):
+    if field == 'username':
+        return ValidationError({'username': "A user with this username already exists"})
+    return ValidationError({'email': "A user with this email already exists"})
+
+
 class UserProfileManager(BaseUserManager):
-    def create_user(self, email, username=None, role=None, resume=None, company=None, password=None, **extra_fields):
+    def get_by_natural_key(self, email):
+        # emails are stored normalized; Lower() lets this use the unique index
+        return self.alias(email_lower=Lower('email')).get(email_lower=self.normalize_email(email).lower())
+
+    def build_user(self, email, username=None, role=None, resume=None, company=None, password=None, **extra_fields):
+        """Validates and returns an unsaved user with its password hashed."""
         if not email:
             raise ValidationError("User must have an email address")
-        
-        #checks if email already exists
-        if self.model.objects.filter(email__iexact=email).exists():
-            raise ValidationError("A user with this email already exists")
 
         #email normalization 
         email = self.normalize_email(email)
         email = email.lower()
 
-        if not username:
-            username = generate_username_from_email(email)
-
         User = self.model
         user = User(
             email=email, 
-            username=username, 
+            username=username or generate_username_from_email(email), 
             role=role,
             **extra_fields
         )
+        # remembered so a colliding generated username can be replaced
+        user.generated_username = not username
 
         #roles should be either CAN or EMP
         valid_roles = [choice[0] for choice in User.RoleChoice.choices]
@@ -65,10 +95,77 @@ class UserProfileManager(BaseUserManager):
         elif role == User.RoleChoice.CAN and resume:
             user.resume = resume
 
-        user.set_password(password)
-        user.save(using=self._db)
+        if password is None:
+            user.set_unusable_password()
+        else:
+            user.password = hashing.make_password(password)
         return user
 
+    def create_user(self, email, username=None, role=None, resume=None, company=None, password=None, **extra_fields):
+        """Creates a user with a single INSERT.
+
+        The unique indexes on email and username do the checking; a
+        conflict raises ValidationError and a generated username that
+        collides is replaced.
+        """
+        user = self.build_user(email, username, role, resume, company, password, **extra_fields)
+        for _ in range(USERNAME_ATTEMPTS):
+            try:
+                # inside a transaction the failed INSERT must not doom the outer one
+                if connections[self._db or DEFAULT_DB_ALIAS].in_atomic_block:
+                    with transaction.atomic(using=self._db):
+                        user.save(using=self._db)
+                else:
+                    user.save(using=self._db)
+                return user
+            except IntegrityError as error:
+                field = unique_violation(error)
+                if field is None:
+                    raise
+                if field != 'username' or not user.generated_username:
+                    raise duplicate_error(field) from error
+                user.username = generate_username_from_email(user.email)
+        raise ValidationError("Could not generate a unique username")
+
+    def create_users(self, users, batch_size=500):
+        """Creates many users in one transaction, all or none.
+
+        ``users`` is an iterable of create_user() keyword dicts. The same
+        guarantees hold as for create_user(): an email already registered,
+        or given twice, raises ValidationError naming it.
+        """
+        users = [self.build_user(**fields) for fields in users]
+        for field in ('email', 'username'):
+            seen = Counter(getattr(user, field) for user in users)
+            repeated = sorted(value for value, count in seen.items() if count > 1)
+            if repeated:
+                raise ValidationError({field: [f"Given more than once: {value}" for value in repeated]})
+
+        for _ in range(USERNAME_ATTEMPTS):
+            try:
+                with transaction.atomic(using=self._db):
+                    return self.bulk_create(users, batch_size=batch_size)
+            except IntegrityError as error:
+                field = unique_violation(error)
+                if field == 'email':
+                    taken = self.annotate(email_lower=Lower('email')).filter(
+                        email_lower__in=[user.email for user in users]
+                    ).values_list('email_lower', flat=True)
+                    raise ValidationError({'email': [
+                        f"A user with this email already exists: {email}" for email in sorted(taken)
+                    ]}) from error
+                if field != 'username':
+                    raise
+                taken = set(self.filter(
+                    username__in=[user.username for user in users]
+                ).values_list('username', flat=True))
+                for user in users:
+                    if user.username in taken:
+                        if not user.generated_username:
+                            raise duplicate_error(field) from error
+                        user.username = generate_username_from_email(user.email)
+        raise ValidationError("Could not generate unique usernames")
+
     def create_superuser(self, email, username=None, password=None, **extra_fields):
         User = self.model
         role = extra_fields.pop('role', User.RoleChoice.EMP)
@@ -95,28 +192,79 @@ class User(AbstractBaseUser, PermissionsMixin):
         EMP = 'EMP', 'Employer'  
         CAN = 'CAN', 'Candidate'
 
-    email = models.EmailField(max_length=255, unique=True)
-    username = models.CharField(max_length=255, unique=True)
+    email = models.EmailField(max_length=255)
+    username = models.CharField(max_length=255)
     role = models.CharField(max_length=3, choices=RoleChoice.choices) 
-    resume = models.FileField(upload_to='uploads/', blank=True, null=True)
+    resume = models.FileField(upload_to='resumes/', storage=resume_storage, blank=True, null=True)
     company = models.CharField(max_length=255, null=True, blank=True)
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
     is_superuser = models.BooleanField(default=False)
+    # tokens issued up to this time are refused (user.tokens)
+    tokens_valid_after = models.DateTimeField(null=True, blank=True, editable=False)
 
     objects = UserProfileManager()
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['role']
 
+    class Meta:
+        constraints = [
+            # emails are stored lower-cased; this also covers rows written around the manager
+            models.UniqueConstraint(Lower('email'), name='user_email_ci_unique'),
+            # named, so unique_violation() can tell which one a write broke
+            models.UniqueConstraint(fields=['username'], name='user_username_unique'),
+        ]
+
     def __str__(self):
         return f"{self.username} ({self.role})"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        user = super().from_db(db, field_names, values)
+        if 'resume' in user.__dict__:
+            # lets a save tell whether the resume changed
+            user._loaded_resume = user.__dict__['resume'] or ''
+        return user
     
     @property
     def token(self):
         """Allow us to get a user's token by calling `user.token`"""
-        refresh = RefreshToken.for_user(self)
+        refresh = UserRefreshToken.for_user(self)
         return {
             'refresh': str(refresh),
             'access': str(refresh.access_token),
-        }
\ No newline at end of file
+        }
+
+
+# constraint names, and the columns SQLite reports for table constraints
+UNIQUE_FIELDS = {
+    'user_email_ci_unique': 'email',
+    'user_username_unique': 'username',
+    f'{User._meta.db_table}.username': 'username',
+}
+
+
+class TokenUser(User):
+    """A user built from access token claims without a query.
+
+    Only id, role and is_active are set; reading any other field loads all
+    of them from the database at once.
+    """
+
+    class Meta:
+        proxy = True
+
+    @classmethod
+    def from_claims(cls, user_id, role, is_active):
+        # simplejwt stores the user id claim as a string
+        claims = {'id': cls._meta.pk.to_python(user_id), 'role': role, 'is_active': is_active}
+        return cls.from_db(None, list(claims), [
+            claims[field.attname] for field in cls._meta.concrete_fields if field.attname in claims
+        ])
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        deferred = self.get_deferred_fields()
+        if fields and set(fields) <= deferred:
+            fields = list(deferred)
+        super().refresh_from_db(using, fields, from_queryset)
@@ -0,0 +1,173 @@
+"""Content-addressed resume storage and the upload handler feeding it.
+
+ResumeUploadHandler streams the ``resume`` part of a multipart request in
+RESUME_UPLOAD_CHUNK_SIZE chunks into a temporary file next to its final
+location, hashing it on the way and refusing anything larger than
+RESUME_MAX_UPLOAD_SIZE. ResumeStorage then names the file after its
+SHA-256 and moves it into place with a rename, so a reader never sees a
+partial file, identical resumes are stored once and the upload is written
+to disk exactly once. Content saved any other way (ContentFile, admin) is
+streamed and hashed the same way.
+
+user.views.serve_media hands stored files to their owner and to the
+employers the candidate applied to. Files are not deleted when a user
+replaces their resume, as another user may share them.
+"""
+import hashlib
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, StopFutureHandlers
+from django.utils.deconstruct import deconstructible
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+RESUME_DIR = 'resumes'
+TEMP_DIR = os.path.join(RESUME_DIR, 'tmp')
+# room for the other form fields and multipart boundaries
+REQUEST_OVERHEAD = 64 * 1024
+
+
+def max_size():
+    return getattr(settings, 'RESUME_MAX_UPLOAD_SIZE', 10 * 1024 * 1024)
+
+
+class ResumeTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_code = 'resume_too_large'
+
+    def __init__(self):
+        super().__init__(f'Resumes may be at most {max_size() // 1024} KiB.')
+
+
+class HashingFile:
+    """A temporary file in the storage directory, hashed as it is written."""
+
+    def __init__(self, directory, limit):
+        os.makedirs(directory, exist_ok=True)
+        self.file = tempfile.NamedTemporaryFile(dir=directory, suffix='.upload', delete=False)
+        self.hash = hashlib.sha256()
+        self.size = 0
+        self.limit = limit
+
+    def write(self, data):
+        self.size += len(data)
+        if self.size > self.limit:
+            self.discard()
+            raise ResumeTooLarge()
+        self.hash.update(data)
+        self.file.write(data)
+
+    def finish(self):
+        """Flushes the file to disk and returns its path and digest."""
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        return self.file.name, self.hash.hexdigest()
+
+    def discard(self):
+        self.file.close()
+        try:
+            os.unlink(self.file.name)
+        except FileNotFoundError:
+            # already moved into place
+            pass
+
+
+class ResumeUpload(UploadedFile):
+    """An uploaded resume already on disk, with its digest."""
+
+    def __init__(self, hashing_file, name, content_type, charset, content_type_extra):
+        super().__init__(
+            hashing_file.file, name, content_type, hashing_file.size, charset, content_type_extra
+        )
+        self.hashing_file = hashing_file
+
+    def temporary_file_path(self):
+        return self.file.name
+
+    def close(self):
+        # leaves nothing behind when the upload was never saved
+        self.hashing_file.discard()
+
+
+class ResumeUploadHandler(FileUploadHandler):
+    """Streams the resume field straight into ResumeStorage's directory."""
+    resume_field = 'resume'
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.chunk_size = getattr(settings, 'RESUME_UPLOAD_CHUNK_SIZE', 64 * 1024)
+        self.hashing_file = None
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        # refuse before reading the body when the client announces its size
+        if content_length and content_length > max_size() + REQUEST_OVERHEAD:
+            raise ResumeTooLarge()
+
+    def new_file(self, field_name, *args, **kwargs):
+        super().new_file(field_name, *args, **kwargs)
+        if field_name != self.resume_field:
+            self.hashing_file = None
+            return
+        self.hashing_file = HashingFile(resume_storage.path(TEMP_DIR), max_size())
+        raise StopFutureHandlers()
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.hashing_file is None:
+            return raw_data
+        self.hashing_file.write(raw_data)
+        return None
+
+    def file_complete(self, file_size):
+        if self.hashing_file is None:
+            return None
+        self.hashing_file.file.seek(0)
+        return ResumeUpload(
+            self.hashing_file, self.file_name, self.content_type, self.charset,
+            self.content_type_extra,
+        )
+
+    def upload_interrupted(self):
+        if self.hashing_file is not None:
+            self.hashing_file.discard()
+
+
+@deconstructible(path='user.resumes.ResumeStorage')
+class ResumeStorage(FileSystemStorage):
+    """Stores each file as resumes/<2 hex digits>/<sha256><extension>."""
+
+    def get_available_name(self, name, max_length=None):
+        # the name is replaced by the digest in _save
+        return name
+
+    def _save(self, name, content):
+        if isinstance(content, ResumeUpload):
+            hashing_file = content.hashing_file
+        else:
+            hashing_file = HashingFile(self.path(TEMP_DIR), max_size())
+            try:
+                for chunk in content.chunks():
+                    hashing_file.write(chunk)
+            except BaseException:
+                hashing_file.discard()
+                raise
+        temp_path, digest = hashing_file.finish()
+
+        extension = os.path.splitext(name)[1].lower()
+        name = f'{RESUME_DIR}/{digest[:2]}/{digest}{extension}'
+        path = self.path(name)
+        if os.path.exists(path):
+            hashing_file.discard()
+            return name
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if self.file_permissions_mode is not None:
+            os.chmod(temp_path, self.file_permissions_mode)
+        os.replace(temp_path, path)
+        hashing_file.discard()
+        return name
+
+
+resume_storage = ResumeStorage()
@@ -1,14 +1,33 @@
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.utils.translation import gettext_lazy as _
 from rest_framework import serializers
-from .models import User
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from . import hashing
+from .models import User, unique_violation
+from .tokens import UserRefreshToken, is_revoked, revoke_user_tokens, set_user_claims
+from core.serializers import SkillNameField
 from django.core.exceptions import ValidationError
 
 
+def unique_error(field_name):
+    """The message DRF's UniqueValidator would have given."""
+    field = User._meta.get_field(field_name)
+    return field.error_messages['unique'] % {
+        'model_name': User._meta.verbose_name,
+        'field_label': field.verbose_name,
+    }
+
+
 class UserSerializer(serializers.ModelSerializer):
     """Serializes User inputs during login, registration."""
+    skills = SkillNameField(many=True, required=False)
     
     class Meta:
         model = User
-        fields = ['email', 'password', 'role', 'company', 'resume', 'username']
+        fields = ['email', 'password', 'role', 'company', 'resume', 'username', 'skills']
         extra_kwargs = {
             'password': {
                 'write_only': True,
@@ -16,18 +35,27 @@ class UserSerializer(serializers.ModelSerializer):
             },
             'resume': {'required': False, 'allow_null': True},
             'company': {'required': False, 'allow_null': True},
-            'username': {'required': False}, 
+            # uniqueness is left to the database indexes rather than queried first
+            'email': {'validators': []},
+            'username': {'required': False, 'validators': []},
         }
         
     def create(self, validated_data):
         """Ensures that django stores hashed password and handles username generation."""
-        password = validated_data.pop('password', None)
+        skills = validated_data.pop('skills', None)
         
-        # If username not provided, it will be generated in the manager
-        user = User.objects.create_user(**validated_data)
-        if password:
-            user.set_password(password)
-            user.save()
+        # If username not provided, it will be generated in the manager;
+        # the manager also hashes the password, exactly once
+        try:
+            user = User.objects.create_user(**validated_data)
+        except ValidationError as error:
+            if not hasattr(error, 'error_dict'):
+                raise
+            raise serializers.ValidationError(
+                {field: [unique_error(field)] for field in error.error_dict}
+            ) from error
+        if skills:
+            user.skills.set(skills)
         return user
         
     def validate(self, attrs):
@@ -48,6 +76,7 @@ class UserSerializer(serializers.ModelSerializer):
     def update(self, instance, validated_data):
         """Updates the user data partially or fully."""
         password = validated_data.pop('password', None)
+        skills = validated_data.pop('skills', None)
         role = validated_data.get('role', instance.role)
         resume = validated_data.get('resume')
         company = validated_data.get('company')
@@ -64,14 +93,27 @@ class UserSerializer(serializers.ModelSerializer):
             elif role == User.RoleChoice.EMP:
                 instance.resume = None
         
+        # tokens carry the role, so outstanding ones must go
+        if role != instance.role:
+            instance.tokens_valid_after = revoke_user_tokens(instance.pk)
+
         # Update fields
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
         
         if password:
-            instance.set_password(password)
+            instance.password = hashing.make_password(password)
         
-        instance.save()
+        try:
+            with transaction.atomic():
+                instance.save()
+        except IntegrityError as error:
+            field = unique_violation(error)
+            if field is None:
+                raise
+            raise serializers.ValidationError({field: [unique_error(field)]}) from error
+        if skills is not None:
+            instance.skills.set(skills)
         return instance
 
 
@@ -81,4 +123,48 @@ class UserLoginSerializer(serializers.Serializer):
     
     def validate(self, attrs):
         """Add any additional login validation if needed."""
-        return attrs
\ No newline at end of file
+        return attrs
+
+
+class UserTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """Issues tokens carrying the role and is_active claims."""
+    token_class = UserRefreshToken
+
+
+class UserTokenRefreshSerializer(TokenRefreshSerializer):
+    """Refreshes access tokens with the user's current claims.
+
+    Refused for revoked tokens; the role and is_active claims are taken
+    from the database rather than copied from the refresh token.
+    """
+    token_class = UserRefreshToken
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        if is_revoked(refresh.payload):
+            raise InvalidToken(_('Token has been revoked'))
+
+        user_id = refresh.payload.get(api_settings.USER_ID_CLAIM)
+        user = get_user_model().objects.filter(
+            **{api_settings.USER_ID_FIELD: user_id}
+        ).only('role', 'is_active').first()
+        if user is None or not api_settings.USER_AUTHENTICATION_RULE(user):
+            raise AuthenticationFailed(self.error_messages['no_active_account'], 'no_active_account')
+
+        access = refresh.access_token
+        set_user_claims(access, user)
+        data = {'access': str(access)}
+
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if api_settings.BLACKLIST_AFTER_ROTATION:
+                try:
+                    refresh.blacklist()
+                except AttributeError:
+                    # the blacklist app is not installed
+                    pass
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            refresh.outstand()
+            data['refresh'] = str(refresh)
+        return data
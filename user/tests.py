@@ -1,6 +1,37 @@
-from django.test import TestCase
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import make_password
+
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
+from django.db import IntegrityError, connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core.models import Application, Job
+
+from . import hashing
+from .authentication import ClaimsJWTAuthentication
+from .blacklist import SETTLE_SECONDS, BloomFilter, blacklist_filter
+from .models import unique_violation
+from .resumes import TEMP_DIR, HashingFile
+from .tokens import UserRefreshToken, get_cache as get_token_cache, revoke_user_tokens
 # Create your tests here.
 
 class ModelTests(TestCase):
@@ -130,4 +161,506 @@ class ModelTests(TestCase):
                 
 
             
-        
\ No newline at end of file
+        
+
+class TokenAuthenticationTests(TestCase):
+    """Test authentication from token claims and token revocation."""
+
+    def setUp(self):
+        get_token_cache().clear()
+        self.client = APIClient()
+        self.employer = get_user_model().objects.create_user(
+            email='employer@example.com',
+            password='testpass123',
+            role='EMP',
+            company='Test Company',
+        )
+        self.tokens = self.employer.token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.tokens["access"]}')
+
+    def test_access_token_carries_claims(self):
+        """Test tokens hold the role and is_active claims."""
+        token = AccessToken(self.tokens['access'])
+        self.assertEqual(token['role'], 'EMP')
+        self.assertTrue(token['is_active'])
+        self.assertIn('auth_time', token)
+
+    def test_authentication_needs_no_query(self):
+        """Test the request user is built from claims and loads other fields lazily."""
+        request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {self.tokens["access"]}')
+        with self.assertNumQueries(1):
+            ClaimsJWTAuthentication().authenticate(request)
+        with self.assertNumQueries(0):
+            user, _ = ClaimsJWTAuthentication().authenticate(request)
+            self.assertEqual((user.pk, user.role, user.is_active), (self.employer.pk, 'EMP', True))
+            self.assertEqual(user, self.employer)
+        with self.assertNumQueries(1):
+            self.assertEqual(user.email, 'employer@example.com')
+            self.assertEqual(user.company, 'Test Company')
+
+    def test_role_change_revokes_tokens(self):
+        """Test changing role refuses earlier tokens, including refresh."""
+        candidate = get_user_model().objects.create_user(
+            email='candidate@example.com',
+            password='testpass123',
+            role='CAN',
+            resume='uploads/resume.pdf',
+        )
+        tokens = candidate.token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {tokens["access"]}')
+        response = self.client.patch(
+            reverse('user-management'), {'role': 'EMP', 'company': 'New Company'}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(self.client.get(reverse('user-management')).status_code, 401)
+        response = APIClient().post(reverse('token_refresh'), {'refresh': tokens['refresh']})
+        self.assertEqual(response.status_code, 401)
+
+        response = APIClient().post(
+            reverse('login'), {'email': 'candidate@example.com', 'password': 'testpass123'}
+        )
+        self.assertEqual(AccessToken(response.data['access'])['role'], 'EMP')
+
+    def test_delete_revokes_tokens(self):
+        """Test deleting the account refuses its tokens."""
+        self.assertEqual(self.client.delete(reverse('user-management')).status_code, 200)
+        self.assertEqual(self.client.get(reverse('user-management')).status_code, 401)
+
+    def test_revocation_outlives_the_cache(self):
+        """Test revoked tokens stay refused once the cache is emptied, as after a restart."""
+        self.assertEqual(self.client.get(reverse('user-management')).status_code, 200)
+        revoke_user_tokens(self.employer.pk)
+        get_token_cache().clear()
+        self.assertEqual(self.client.get(reverse('user-management')).status_code, 401)
+
+    def test_changes_from_other_processes(self):
+        """Test deactivation, role changes and deletes made elsewhere refuse tokens once the cached state goes."""
+        users = get_user_model().objects.filter(pk=self.employer.pk)
+        changes = [
+            ({'is_active': False}, 401),
+            ({'is_active': True}, 200),
+            ({'role': 'CAN'}, 401),
+            ({'role': 'EMP'}, 200),
+        ]
+        for change, status_code in changes:
+            # a queryset update sends no signals, like a write made by another worker
+            users.update(**change)
+            get_token_cache().clear()
+            self.assertEqual(self.client.get(reverse('user-management')).status_code, status_code)
+
+        users.delete()
+        get_token_cache().clear()
+        self.assertEqual(self.client.get(reverse('user-management')).status_code, 401)
+
+
+class TokenBlacklistTests(TestCase):
+    """Test the blacklist filter, logout and token pruning."""
+
+    def setUp(self):
+        get_token_cache().clear()
+        blacklist_filter.clear()
+        self.addCleanup(blacklist_filter.clear)
+        self.user = get_user_model().objects.create_user(
+            email='employer@example.com',
+            password='testpass123',
+            role='EMP',
+            company='Test Company',
+        )
+
+    def refresh(self, token):
+        return APIClient().post(reverse('token_refresh'), {'refresh': token})
+
+    def test_bloom_filter(self):
+        """Test added keys are always found and false positives stay rare."""
+        bloom = BloomFilter(1000, error_rate=0.01)
+        for i in range(1000):
+            bloom.add(f'added-{i}')
+
+        self.assertTrue(all(f'added-{i}' in bloom for i in range(1000)))
+        false_positives = sum(f'other-{i}' in bloom for i in range(10000))
+        self.assertLess(false_positives, 300)
+
+    def test_logout_blacklists_refresh_token(self):
+        """Test a logged out refresh token can no longer be used."""
+        tokens = self.user.token
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {tokens["access"]}')
+
+        response = client.post(reverse('logout'), {'refresh_token': tokens['refresh']})
+
+        self.assertEqual(response.status_code, 205)
+        self.assertEqual(self.refresh(tokens['refresh']).status_code, 401)
+
+    def test_refresh_skips_blacklist_query(self):
+        """Test refreshing a token the filter rules out only loads the user."""
+        token = self.user.token['refresh']
+        self.refresh(token)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.refresh(token).status_code, 200)
+
+    def test_warm_builds_filter(self):
+        """Test the filter can be built before the first check."""
+        UserRefreshToken(self.user.token['refresh']).blacklist()
+        blacklist_filter.clear()
+
+        self.assertTrue(blacklist_filter.warm())
+        self.assertIsNotNone(blacklist_filter.bloom)
+        with self.assertNumQueries(0):
+            self.assertNotIn('unknown', blacklist_filter)
+
+    def test_sync_is_throttled(self):
+        """Test rows from other processes are read at most once per interval."""
+        token = self.user.token['refresh']
+        jti = AccessToken(token, verify=False)['jti']
+        self.assertNotIn(jti, blacklist_filter)
+        BlacklistedToken.objects.bulk_create([
+            BlacklistedToken(token=OutstandingToken.objects.get(jti=jti))
+        ])
+
+        with self.assertNumQueries(0):
+            self.assertNotIn(jti, blacklist_filter)
+        blacklist_filter.synced_at -= 1
+        self.assertIn(jti, blacklist_filter)
+
+    @override_settings(BLACKLIST_SYNC_INTERVAL=0)
+    def test_filter_picks_up_rows_from_other_processes(self):
+        """Test rows blacklisted elsewhere reach the filter with no cache involved."""
+        token = self.user.token['refresh']
+        self.assertEqual(self.refresh(token).status_code, 200)
+
+        outstanding = OutstandingToken.objects.get(jti=AccessToken(token, verify=False)['jti'])
+        # bulk_create sends no signals, like a write made by another worker
+        BlacklistedToken.objects.bulk_create([BlacklistedToken(token=outstanding)])
+        get_token_cache().clear()
+
+        self.assertEqual(self.refresh(token).status_code, 401)
+
+    @override_settings(BLACKLIST_SYNC_INTERVAL=0)
+    def test_filter_reads_late_commits(self):
+        """Test a row committed after a higher id was seen is still picked up."""
+        tokens = [self.user.token['refresh'] for _ in range(2)]
+        outstanding = [
+            OutstandingToken.objects.get(jti=AccessToken(token, verify=False)['jti']) for token in tokens
+        ]
+        later = BlacklistedToken.objects.create(id=10, token=outstanding[1])
+        self.assertNotIn(AccessToken(tokens[0], verify=False)['jti'], blacklist_filter)
+        # a lower id, as if its transaction committed after the one above
+        BlacklistedToken.objects.bulk_create([BlacklistedToken(id=5, token=outstanding[0])])
+        self.assertEqual(self.refresh(tokens[0]).status_code, 401)
+
+        BlacklistedToken.objects.update(blacklisted_at=timezone.now() - timedelta(seconds=SETTLE_SECONDS + 1))
+        self.assertIn(AccessToken(tokens[1], verify=False)['jti'], blacklist_filter)
+        self.assertEqual(blacklist_filter.last_id, later.id)
+        self.assertEqual(blacklist_filter.recent, set())
+
+    def test_prune_tokens(self):
+        """Test expired outstanding and blacklisted rows are deleted in batches."""
+        for _ in range(3):
+            UserRefreshToken(self.user.token['refresh']).blacklist()
+        self.user.token
+        expired = OutstandingToken.objects.order_by('id').values_list('id', flat=True)[:2]
+        OutstandingToken.objects.filter(id__in=list(expired)).update(
+            expires_at=timezone.now() - timedelta(days=1)
+        )
+        out = StringIO()
+
+        call_command('prune_tokens', '--batch-size', '1', stdout=out)
+
+        self.assertIn('Pruned 2 expired outstanding tokens and 2 blacklisted tokens', out.getvalue())
+        self.assertEqual(OutstandingToken.objects.count(), 2)
+        self.assertEqual(BlacklistedToken.objects.count(), 1)
+
+
+class PasswordHashingTests(TestCase):
+    """Test the hashing policy and the bounded hashing pool."""
+
+    def test_registration_hashes_once(self):
+        """Test signing up hashes the password a single time."""
+        with patch.object(hashing.pool, 'run', wraps=hashing.pool.run) as run:
+            response = APIClient().post(reverse('user-management'), {
+                'email': 'employer@example.com',
+                'password': 'testpass123',
+                'role': 'EMP',
+                'company': 'Test Company',
+            }, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(run.call_count, 1)
+        self.assertTrue(get_user_model().objects.get().check_password('testpass123'))
+
+    @override_settings(PASSWORD_HASHERS=[
+        'user.hashing.TunedPBKDF2PasswordHasher',
+        'django.contrib.auth.hashers.MD5PasswordHasher',
+    ])
+    def test_login_upgrades_outdated_hash(self):
+        """Test a hash from an older policy is replaced on login."""
+        user = get_user_model().objects.create_user(
+            email='employer@example.com', role='EMP', company='Test Company',
+        )
+        user.password = make_password('testpass123', hasher='md5')
+        user.save()
+
+        self.assertEqual(authenticate(email='employer@example.com', password='testpass123'), user)
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$'))
+        self.assertIsNone(authenticate(email='employer@example.com', password='wrong'))
+
+    def test_pool_rejects_beyond_queue_limit(self):
+        """Test a full pool refuses work instead of queueing it."""
+        pool = hashing.HashingPool(workers=1, max_queue=0)
+        release = threading.Event()
+        worker = threading.Thread(target=pool.run, args=(release.wait,))
+        worker.start()
+        while pool.stats()['depth'] < 1:
+            time.sleep(0.001)
+
+        with self.assertRaises(hashing.HashingBusy):
+            pool.run(lambda: None)
+        release.set()
+        worker.join()
+
+        self.assertEqual(pool.run(lambda: 'done'), 'done')
+        self.assertEqual(pool.stats()['rejected'], 1)
+        self.assertEqual(pool.stats()['peak_depth'], 1)
+
+    def test_busy_login_returns_503(self):
+        """Test logins are shed with 503 while the pool is full."""
+        get_user_model().objects.create_user(
+            email='employer@example.com', password='testpass123', role='EMP', company='Test Company',
+        )
+        with patch.object(hashing.pool, 'run', side_effect=hashing.HashingBusy):
+            response = APIClient().post(
+                reverse('login'), {'email': 'employer@example.com', 'password': 'testpass123'}
+            )
+        self.assertEqual(response.status_code, 503)
+
+
+class UserCreationTests(TestCase):
+    """Test user creation leaves uniqueness to the database."""
+
+    def create(self, email, **fields):
+        return get_user_model().objects.create_user(
+            email=email, role='EMP', company='Test Company', **fields
+        )
+
+    def test_create_user_is_a_single_insert(self):
+        """Test no lookup runs before the INSERT."""
+        with CaptureQueriesContext(connection) as captured:
+            self.create('employer@example.com')
+        statements = [query['sql'].split()[0] for query in captured]
+        self.assertEqual(statements.count('INSERT'), 1)
+        self.assertNotIn('SELECT', statements)
+
+    def test_duplicate_email_ignores_case(self):
+        """Test an email differing only in case is refused."""
+        self.create('employer@example.com')
+        with self.assertRaises(ValidationError) as context:
+            self.create('Employer@EXAMPLE.com')
+        self.assertIn('email already exists', str(context.exception).lower())
+        self.assertEqual(get_user_model().objects.count(), 1)
+
+    def test_duplicate_username_fails(self):
+        """Test a chosen username that is taken is refused."""
+        self.create('first@example.com', username='taken')
+        with self.assertRaises(ValidationError) as context:
+            self.create('second@example.com', username='taken')
+        self.assertIn('username already exists', str(context.exception).lower())
+
+    def test_unique_violation_reads_constraint_names(self):
+        """Test errors are mapped by constraint, not by words in the message."""
+        self.assertEqual(unique_violation(IntegrityError(
+            "UNIQUE constraint failed: index 'user_email_ci_unique'"
+        )), 'email')
+        self.assertEqual(unique_violation(IntegrityError(
+            'UNIQUE constraint failed: user_user.username'
+        )), 'username')
+        self.assertIsNone(unique_violation(IntegrityError(
+            "UNIQUE constraint failed: index 'username_email_digest'"
+        )))
+
+    def test_generated_username_collision_is_retried(self):
+        """Test a colliding generated username is replaced."""
+        self.create('first@example.com', username='employer_collide')
+        names = iter(['employer_collide', 'employer_fresh'])
+        with patch('user.models.generate_username_from_email', lambda email: next(names)):
+            user = self.create('employer@example.com')
+        self.assertEqual(user.username, 'employer_fresh')
+
+    def test_login_ignores_email_case(self):
+        """Test the email is normalized before authenticating."""
+        self.create('employer@example.com', password='testpass123')
+        self.assertIsNotNone(authenticate(email='Employer@Example.COM', password='testpass123'))
+
+    def test_register_duplicate_email_returns_400(self):
+        """Test registration maps the constraint to a field error."""
+        self.create('employer@example.com')
+        response = APIClient().post(reverse('user-management'), {
+            'email': 'EMPLOYER@example.com',
+            'password': 'testpass123',
+            'role': 'EMP',
+            'company': 'Another Company',
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['email'], ['user with this email already exists.'])
+
+    def test_update_duplicate_username_returns_400(self):
+        """Test changing to a taken username is a field error."""
+        self.create('first@example.com', username='taken')
+        user = self.create('second@example.com', password='testpass123')
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.patch(reverse('user-management'), {'username': 'taken'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['username'], ['user with this username already exists.'])
+
+    def test_create_users_in_bulk(self):
+        """Test create_users inserts every user with normalized fields."""
+        users = get_user_model().objects.create_users([
+            {'email': f'Employer{i}@Example.com', 'role': 'EMP', 'company': 'Test Company'}
+            for i in range(3)
+        ])
+        self.assertEqual(len(users), 3)
+        self.assertEqual(
+            sorted(get_user_model().objects.values_list('email', flat=True)),
+            ['employer0@example.com', 'employer1@example.com', 'employer2@example.com'],
+        )
+        self.assertFalse(users[0].has_usable_password())
+
+    def test_create_users_refuses_registered_email(self):
+        """Test a registered email fails the whole batch and is named."""
+        self.create('employer1@example.com')
+        with self.assertRaises(ValidationError) as context:
+            get_user_model().objects.create_users([
+                {'email': f'EMPLOYER{i}@example.com', 'role': 'EMP', 'company': 'Test Company'}
+                for i in range(3)
+            ])
+        self.assertEqual(
+            context.exception.message_dict['email'],
+            ['A user with this email already exists: employer1@example.com'],
+        )
+        self.assertEqual(get_user_model().objects.count(), 1)
+
+    def test_create_users_refuses_repeated_email(self):
+        """Test an email given twice in one batch is refused."""
+        with self.assertRaises(ValidationError) as context:
+            get_user_model().objects.create_users([
+                {'email': email, 'role': 'EMP', 'company': 'Test Company'}
+                for email in ('employer@example.com', 'Employer@example.com')
+            ])
+        self.assertIn('employer@example.com', str(context.exception))
+        self.assertFalse(get_user_model().objects.exists())
+
+
+class ResumeStorageTests(TestCase):
+    """Test resumes are streamed, content addressed and served."""
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.media_root = media_root.name
+        settings_override = override_settings(MEDIA_ROOT=self.media_root, RESUME_MAX_UPLOAD_SIZE=1024)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.client = APIClient(REMOTE_ADDR='10.0.0.1')
+
+    def register(self, email, content, name='resume.PDF'):
+        return self.client.post(reverse('user-management'), {
+            'email': email,
+            'password': 'testpass123',
+            'role': 'CAN',
+            'resume': SimpleUploadedFile(name, content, content_type='application/pdf'),
+        }, format='multipart')
+
+    def stored_files(self):
+        return sorted(
+            os.path.relpath(os.path.join(directory, name), self.media_root)
+            for directory, _, names in os.walk(self.media_root)
+            for name in names
+        )
+
+    def test_identical_resumes_are_stored_once(self):
+        """Test uploads are named by their digest and deduplicated."""
+        content = b'%PDF-1.4 the same resume'
+        first = self.register('first@example.com', content)
+        second = self.register('second@example.com', content, name='other.pdf')
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(second.status_code, 201)
+
+        digest = hashlib.sha256(content).hexdigest()
+        name = f'resumes/{digest[:2]}/{digest}.pdf'
+        self.assertEqual(
+            set(get_user_model().objects.values_list('resume', flat=True)), {name}
+        )
+        self.assertEqual(self.stored_files(), [name])
+
+    def test_oversized_resume_is_refused(self):
+        """Test uploads beyond the cap get 413 and leave no file behind."""
+        response = self.register('candidate@example.com', b'x' * 2048)
+        self.assertEqual(response.status_code, 413)
+        self.assertFalse(get_user_model().objects.exists())
+        self.assertEqual(self.stored_files(), [])
+
+    def test_saved_content_is_content_addressed(self):
+        """Test files saved outside an upload are stored the same way."""
+        user = get_user_model().objects.create_user(
+            email='candidate@example.com', role='CAN', resume=ContentFile(b'resume', name='cv.txt'),
+        )
+        digest = hashlib.sha256(b'resume').hexdigest()
+        self.assertEqual(user.resume.name, f'resumes/{digest[:2]}/{digest}.txt')
+
+    @override_settings(DEBUG=True)
+    def test_serve_media(self):
+        """Test resumes are served privately to their owner and the employers they applied to."""
+        self.register('candidate@example.com', b'%PDF-1.4 resume')
+        user = get_user_model().objects.get()
+        url = user.resume.url
+        self.assertEqual(self.client.get(url).status_code, 401)
+
+        self.client.force_authenticate(user)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'%PDF-1.4 resume')
+        self.assertEqual(response['Cache-Control'], 'private, no-store')
+        self.assertEqual(self.client.get('/media/resumes/missing.pdf').status_code, 404)
+        self.assertEqual(self.client.get('/media/../settings.py').status_code, 400)
+
+        employer = get_user_model().objects.create_user(
+            email='employer@example.com', role='EMP', company='Test Company'
+        )
+        self.client.force_authenticate(employer)
+        self.assertEqual(self.client.get(url).status_code, 404)
+        job = Job.objects.create(position='Engineer', employer=employer)
+        Application.objects.create(job=job, candidate=user)
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    @override_settings(DEBUG=True)
+    def test_serve_media_skips_unfinished_uploads(self):
+        """Test temporary upload files are never served, even when named as a resume."""
+        hashing_file = HashingFile(os.path.join(self.media_root, TEMP_DIR), 1024)
+        hashing_file.write(b'half a resume')
+        hashing_file.finish()
+        name = os.path.relpath(hashing_file.file.name, self.media_root)
+        user = get_user_model().objects.create_user(email='candidate@example.com', role='CAN', resume='x')
+        get_user_model().objects.filter(pk=user.pk).update(resume=name)
+        self.client.force_authenticate(user)
+        self.assertEqual(self.client.get(f'/media/{name}').status_code, 404)
+
+    def test_serve_media_needs_front_end_outside_debug(self):
+        """Test Django does not send files itself unless DEBUG is on."""
+        self.register('candidate@example.com', b'%PDF-1.4 resume')
+        user = get_user_model().objects.get()
+        self.client.force_authenticate(user)
+        self.assertEqual(self.client.get(user.resume.url).status_code, 404)
+
+    @override_settings(MEDIA_SENDFILE_HEADER='X-Accel-Redirect')
+    def test_serve_media_through_front_end(self):
+        """Test the front end server can be asked to send the file."""
+        self.register('candidate@example.com', b'%PDF-1.4 resume')
+        user = get_user_model().objects.get()
+        self.client.force_authenticate(user)
+
+        response = self.client.get(user.resume.url)
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected-media/{user.resume.name}')
+        self.assertEqual(response['Cache-Control'], 'private, no-store')
+        self.assertEqual(response.content, b'')
@@ -0,0 +1,106 @@
+"""JWTs carrying the user fields most views need, and their revocation.
+
+Tokens issued by UserRefreshToken hold ``role`` and ``is_active`` claims,
+so ClaimsJWTAuthentication can build request.user without a query, plus
+``auth_time``, the moment the user logged in. Access tokens minted from a
+refresh token keep the original ``auth_time``.
+
+Revoking a user's tokens stores the current time in the user's
+``tokens_valid_after`` column; tokens whose ``auth_time`` is older are
+refused. Tokens are also refused once their user is deleted, deactivated
+or given another role. The checks read the user's row through the
+AUTH_TOKEN_CACHE, where it is kept for AUTH_USER_STATE_TIMEOUT seconds:
+the process making the change drops its entry at once, other processes
+with their own cache notice within the timeout, and an evicted entry is
+read again from the database.
+
+Blacklist checks go through the filter in user.blacklist first.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+ROLE_CLAIM = 'role'
+ACTIVE_CLAIM = 'is_active'
+AUTH_TIME_CLAIM = 'auth_time'
+
+
+def get_cache():
+    return caches[getattr(settings, 'AUTH_TOKEN_CACHE', 'default')]
+
+
+def state_key(user_id):
+    return f'auth:user:{user_id}'
+
+
+def get_state_timeout():
+    return getattr(settings, 'AUTH_USER_STATE_TIMEOUT', 30)
+
+
+def set_user_claims(token, user):
+    token[ROLE_CLAIM] = user.role
+    token[ACTIVE_CLAIM] = user.is_active
+
+
+class UserRefreshToken(RefreshToken):
+    def check_blacklist(self):
+        from .blacklist import blacklist_filter
+
+        # only a possible hit is worth a query
+        if self.payload[api_settings.JTI_CLAIM] in blacklist_filter:
+            super().check_blacklist()
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token[AUTH_TIME_CLAIM] = time.time()
+        set_user_claims(token, user)
+        return token
+
+
+def revoke_user_tokens(user_id):
+    """Refuses every token issued to the user so far; returns the new tokens_valid_after."""
+    from django.contrib.auth import get_user_model
+
+    now = timezone.now()
+    get_user_model().objects.filter(pk=user_id).update(tokens_valid_after=now)
+    forget_user_state(user_id)
+    return now
+
+
+def forget_user_state(user_id):
+    get_cache().delete(state_key(user_id))
+
+
+def get_user_state(user_id):
+    """(role, is_active, tokens_valid_after timestamp) of the user, or None once deleted."""
+    from django.contrib.auth import get_user_model
+
+    key = state_key(user_id)
+    state = get_cache().get(key)
+    if state is None:
+        row = get_user_model().objects.filter(pk=user_id).values_list(
+            'role', 'is_active', 'tokens_valid_after'
+        ).first()
+        if row is None:
+            state = ()
+        else:
+            role, is_active, valid_after = row
+            state = (role, is_active, valid_after.timestamp() if valid_after else None)
+        get_cache().set(key, state, get_state_timeout())
+    return state or None
+
+
+def is_revoked(payload):
+    state = get_user_state(payload.get(api_settings.USER_ID_CLAIM))
+    if state is None:
+        return True
+    role, is_active, valid_after = state
+    if not is_active or payload.get(ROLE_CLAIM, role) != role:
+        return True
+    # tokens from before auth_time only carry iat
+    return valid_after is not None and payload.get(AUTH_TIME_CLAIM, payload.get('iat', 0)) <= valid_after
@@ -1,13 +1,22 @@
+import os
+import posixpath
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.db.models import Q
+from django.http import FileResponse, Http404, HttpResponse
 from .serializers import UserSerializer, UserLoginSerializer
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.generics import get_object_or_404
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from .permissions import IsOwner
 
-from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import authenticate
+from .resumes import TEMP_DIR, ResumeUploadHandler, resume_storage
+from .tokens import UserRefreshToken, revoke_user_tokens
 
 User = get_user_model()
 
@@ -27,11 +36,21 @@ class UserManagementView(APIView):
         elif self.request.method == 'POST':
             return [AllowAny()]
         return [AllowAny()]
+
+    def initial(self, request, *args, **kwargs):
+        # resumes stream straight into storage instead of memory or /tmp
+        request.upload_handlers.insert(0, ResumeUploadHandler(request))
+        super().initial(request, *args, **kwargs)
+
+    def get_user(self, request):
+        """Loads the full user behind the token backed request.user."""
+        user = get_object_or_404(User, pk=request.user.pk)
+        self.check_object_permissions(request, user)
+        return user
     
     def get(self, request):
         """Returns info of logged in user."""
-        user = request.user
-        self.check_object_permissions(request, user)
+        user = self.get_user(request)
         serializer = UserSerializer(user)
         return Response(serializer.data)
     
@@ -40,12 +59,10 @@ class UserManagementView(APIView):
         serializer = UserSerializer(data=request.data)
         if serializer.is_valid():
             user = serializer.save()
-            refresh = RefreshToken.for_user(user)
             return Response(
                 {
                     'message': 'User created successfully.',
-                    'refresh': str(refresh),
-                    'access': str(refresh.access_token)
+                    **user.token,
                 },
                 status=status.HTTP_201_CREATED
             )
@@ -53,8 +70,7 @@ class UserManagementView(APIView):
     
     def patch(self, request):
         """Updates user info."""
-        user = request.user
-        self.check_object_permissions(request, user)
+        user = self.get_user(request)
         serializer = UserSerializer(user, data=request.data, partial=True)
         if serializer.is_valid():
             serializer.save()
@@ -63,9 +79,9 @@ class UserManagementView(APIView):
     
     def delete(self, request):
         """Deletes an user."""
-        user = request.user
-        self.check_object_permissions(request, user)
+        user = self.get_user(request)
         if user:
+            revoke_user_tokens(user.pk)
             user.delete()
             return Response({"message": "Successfully deleted user!"}, status=status.HTTP_200_OK)
         return Response({"error": "User not found"}, status=status.HTTP_404_NOT_FOUND)
@@ -82,11 +98,9 @@ class UserLoginView(APIView):
             user = authenticate(email=email, password=password)
 
             if user:
-                refresh = RefreshToken.for_user(user)
                 return Response({
                     'user': UserSerializer(user).data,
-                    'refresh': str(refresh),
-                    'access': str(refresh.access_token),
+                    **user.token,
                 }, status=status.HTTP_200_OK)
             return Response(
                 {'error': 'Invalid credentials'}, 
@@ -107,7 +121,7 @@ class UserLogOutView(APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
-            token = RefreshToken(refresh_token)
+            token = UserRefreshToken(refresh_token)
             token.blacklist()
             return Response(
                 {"message": "Successfully logged out"}, 
@@ -117,4 +131,40 @@ class UserLogOutView(APIView):
             return Response(
                 {"error": "Invalid token"}, 
                 status=status.HTTP_400_BAD_REQUEST
-            )
\ No newline at end of file
+            )
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def serve_media(request, path):
+    """Serves a resume to its owner and to employers the candidate applied to.
+
+    With MEDIA_SENDFILE_HEADER set (e.g. X-Accel-Redirect), the front end
+    server sends the file from MEDIA_SENDFILE_PREFIX after this check.
+    Without it the file is only served under DEBUG, as a FileResponse.
+    Anything else, including uploads still being written, is a 404.
+    """
+    name = posixpath.normpath(path)
+    # raises SuspiciousFileOperation for names outside MEDIA_ROOT
+    full_path = resume_storage.path(name)
+    if name.startswith(f'{TEMP_DIR}/') or not User.objects.filter(resume=name).filter(
+        Q(pk=request.user.pk) | Q(job_applicants__job__employer_id=request.user.pk)
+    ).exists():
+        raise Http404('File not found')
+    if not os.path.isfile(full_path):
+        raise Http404('File not found')
+
+    header = getattr(settings, 'MEDIA_SENDFILE_HEADER', None)
+    if header:
+        response = HttpResponse()
+        # the front end server sets it from the file
+        del response['Content-Type']
+        prefix = getattr(settings, 'MEDIA_SENDFILE_PREFIX', '/protected-media/')
+        response[header] = prefix + os.path.relpath(full_path, resume_storage.location)
+    elif settings.DEBUG:
+        response = FileResponse(open(full_path, 'rb'))
+    else:
+        raise Http404('File not found')
+    # personal data, never kept by shared caches
+    response['Cache-Control'] = 'private, no-store'
+    return response
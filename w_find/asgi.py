@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'w_find.settings')
 
 application = get_asgi_application()
+
+# only servers load this module (runserver included), other commands do not
+from user.blacklist import blacklist_filter  # noqa: E402
+
+blacklist_filter.warm()
@@ -10,6 +10,8 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
+from importlib.util import find_spec
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -41,6 +43,7 @@ INSTALLED_APPS = [
     'rest_framework',
     'drf_spectacular',
     'rest_framework_simplejwt',
+    'rest_framework_simplejwt.token_blacklist',
     'django_extensions',
     'debug_toolbar',
     
@@ -49,12 +52,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     "debug_toolbar.middleware.DebugToolbarMiddleware",
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.replicas.ReplicaPinMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -83,17 +88,110 @@ WSGI_APPLICATION = 'w_find.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+# Pragmas run on every new SQLite connection. WAL lets readers work while
+# a write commits, and synchronous=NORMAL is durable enough with WAL (a
+# power cut may lose the last commits but never corrupts the file).
+# busy_timeout makes a writer wait for the lock instead of failing.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'busy_timeout': 5000,  # ms
+    'mmap_size': int(os.environ.get('W_FIND_SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),  # bytes
+    'cache_size': int(os.environ.get('W_FIND_SQLITE_CACHE_SIZE', -64 * 1024)),  # negative: KiB
+}
+
+# Connections are kept open between requests and checked before reuse.
+# Under ASGI each request runs its sync code in a thread of its own, so
+# persistent connections only pile up there: set CONN_MAX_AGE to 0 for
+# ASGI workers.
+# Transactions begin IMMEDIATE, taking the write lock up front: a deferred
+# transaction that reads and then writes fails with "database is locked"
+# when another writer got there first, without waiting busy_timeout.
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': 60,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'init_command': ';'.join(f'PRAGMA {name}={value}' for name, value in SQLITE_PRAGMAS.items()),
+            'transaction_mode': 'IMMEDIATE',
+        },
+    }
+}
+
+# Read replicas of 'default' (core.replicas). They need a cache shared by
+# all workers (see CACHES). W_FIND_SQLITE_REPLICAS=2 adds two SQLite copies
+# for local testing, with a FileBasedCache; `manage.py sync_replicas`
+# refreshes them. Leave it unset for the test suite: replicas cannot see the
+# uncommitted data of a TestCase (ReplicaRoutingTests sets up its own).
+for number in range(1, int(os.environ.get('W_FIND_SQLITE_REPLICAS', 0)) + 1):
+    DATABASES[f'replica_{number}'] = {
+        **DATABASES['default'],
+        'NAME': BASE_DIR / f'db.replica_{number}.sqlite3',
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['core.replicas.ReplicaRouter']
+# how long a user who wrote keeps reading from the primary; above the replica lag
+REPLICA_PIN_SECONDS = 5
+# how long a replica whose connection failed is skipped
+REPLICA_RETRY_SECONDS = 30
+
+# LocMemCache is per process. With several workers use a shared backend,
+# e.g. 'django.core.cache.backends.filebased.FileBasedCache' with a
+# directory LOCATION, or 'django.core.cache.backends.db.DatabaseCache'
+# after `manage.py createcachetable`.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
     }
 }
+if DATABASE_REPLICAS:
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    }
+
+# cache alias and lifetime (seconds) of anonymous job list/detail responses
+JOB_RESPONSE_CACHE = 'default'
+JOB_RESPONSE_CACHE_TIMEOUT = 300
+
+# cache alias holding the user state JWTs are checked against, and how
+# long (seconds) other processes may act on a stale entry (user.tokens)
+AUTH_TOKEN_CACHE = 'default'
+AUTH_USER_STATE_TIMEOUT = 30
+# how often (seconds) each process reads tokens blacklisted elsewhere (user.blacklist)
+BLACKLIST_SYNC_INTERVAL = 1
 
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
+# Password hashing policy (user.hashing). Argon2 is preferred when
+# argon2-cffi is installed; the other hashers stay listed so existing hashes
+# keep verifying and are upgraded on the next login.
+PASSWORD_HASHERS = [
+    'user.hashing.TunedPBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+if find_spec('argon2') is not None:
+    PASSWORD_HASHERS.insert(0, 'user.hashing.TunedArgon2PasswordHasher')
+
+PBKDF2_ITERATIONS = 1_000_000
+ARGON2_TIME_COST = 2
+ARGON2_MEMORY_COST = 65536  # KiB
+ARGON2_PARALLELISM = 1
+
+# hashing runs on a bounded pool, leaving the other cores to the rest of the API
+PASSWORD_HASHING_WORKERS = max(1, (os.cpu_count() or 2) // 2)
+PASSWORD_HASHING_MAX_QUEUE = 64
+
+AUTHENTICATION_BACKENDS = ['user.backends.PooledModelBackend']
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -134,10 +232,10 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'user.authentication.ClaimsJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': ( 
-        'rest_framework.permissions.IsAuthenticatedOrReadOnly'
+        'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ),
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
 }
@@ -167,15 +265,37 @@ SIMPLE_JWT = {
 
     'JTI_CLAIM': 'jti',
 
+    'TOKEN_OBTAIN_SERIALIZER': 'user.serializers.UserTokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'user.serializers.UserTokenRefreshSerializer',
+
     'SLIDING_TOKEN_REFRESH_LIFETIME': timedelta(minutes=5),
     'SLIDING_TOKEN_LIFETIME': timedelta(minutes=60),
     'SLIDING_TOKEN_REFRESH_LIFETIME_GRACE_PERIOD': timedelta(minutes=0),
 }
 
 AUTH_USER_MODEL = 'user.User'
+# User.email is unique through the case-insensitive user_email_ci_unique
+# constraint, which the auth check does not recognise
+SILENCED_SYSTEM_CHECKS = ['auth.W004']
 MEDIA_ROOT = BASE_DIR / 'media'
 MEDIA_URL = '/media/'
 
+# resume uploads are streamed to disk in chunks and refused beyond the cap
+RESUME_MAX_UPLOAD_SIZE = 10 * 1024 * 1024
+RESUME_UPLOAD_CHUNK_SIZE = 64 * 1024
+# e.g. 'X-Accel-Redirect' to let nginx send media files from an internal location;
+# without it resumes are only served under DEBUG (user.views.serve_media)
+MEDIA_SENDFILE_HEADER = None
+MEDIA_SENDFILE_PREFIX = '/protected-media/'
+
+# how long stored Idempotency-Key responses are kept (prune_idempotency_keys)
+IDEMPOTENCY_KEY_TTL = timedelta(hours=24)
+
+# the job change feed leaves writers this long to commit before serving their changes
+CHANGE_FEED_SETTLE_SECONDS = 2
+# how long deleted jobs stay in the change feed (prune_job_tombstones)
+JOB_TOMBSTONE_RETENTION = timedelta(days=30)
+
 
 INTERNAL_IPS = [
     # ...
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'w_find.settings')
 
 application = get_wsgi_application()
+
+# only servers load this module (runserver included), other commands do not
+from user.blacklist import blacklist_filter  # noqa: E402
+
+blacklist_filter.warm()